@@ -0,0 +1,789 @@
+"""
+Utilidades de dibujo para CPF Kombat.
+
+Las pantallas del menú (portada, selector de personajes y de mapas) son una
+imagen de fondo estática con unos pocos elementos encima (texto de turno que
+parpadea, marcadores de selección, botón, contornos de hover). Volver a
+pintar la imagen completa y hacer `display.flip()` en cada frame cuesta lo
+mismo que un frame de pelea aunque no cambie nada; `DirtyScreen` pinta el
+fondo una sola vez por pantalla y después sólo restaura/repinta los
+rectángulos que cambiaron, publicándolos con `display.update(rects)`.
+
+En la pelea pasa algo parecido: el fondo del mapa y la franja del suelo no
+cambian, sólo se mueven los dos luchadores y cambian de vez en cuando los
+bloques del HUD (vida, rounds, tiempo, logos). `DirtyCompositor` restaura
+desde el fondo cacheado las zonas que ocupaban los luchadores en el frame
+anterior y los bloques que cambiaron, y vuelve a dibujar encima sólo lo que
+toca esas zonas, en el mismo orden que un redibujado completo.
+`RenderPipeline` organiza ese frame en capas: una estática precompuesta
+(fondo + suelo), la de los actores (luchadores) y capas de bloques (HUD,
+logos...) que guardan sus superficies ya compuestas y se invalidan por
+separado.
+
+Todo se dibuja en una resolución lógica fija (`LogicalScreen`, 1366x768):
+en pantalla completa SDL o un único escalado por frame la llevan a la
+ventana, así que cambiar de modo no obliga a reescalar nada.
+`TextureScreen` es el backend opcional con texturas de SDL2
+(`pygame._sdl2.video`): la pelea se dibuja con copias del renderer.
+
+El texto también se cachea: `TextCache` guarda las superficies ya
+renderizadas (LRU) y las fuentes, y `DigitAtlas` tiene todos los valores del
+temporizador prerenderizados en una sola superficie. `FaceOverlay` guarda
+la cara ya escalada de cada luchador con una tabla de anclas por estado y
+dirección, así dibujarla es una consulta y un blit.
+"""
+try:
+    import pygame
+except ModuleNotFoundError:
+    print("Error: Pygame no está instalado. Instala con: pip install pygame")
+    raise
+from collections import OrderedDict
+try:
+    # Backend de texturas opcional (TextureScreen); sin él, todo sigue por software
+    from pygame._sdl2 import video as sdl2_video
+except Exception:
+    sdl2_video = None
+
+
+class LogicalScreen:
+    """Fixed logical resolution presented on a window of any size.
+
+    The game always draws on `surface`, whose size is `size` whatever the
+    window is, so positions in pixels and cached art stay valid when F11
+    switches modes. `set_mode(fullscreen)` picks, in order:
+
+    - windowed at the logical size: `surface` is the window itself and
+      presenting is a plain `display.flip()` / `display.update(rects)`;
+    - SDL2 logical size (`pygame.SCALED`): SDL scales on present and maps
+      mouse coordinates back to logical ones;
+    - otherwise the desktop-sized window plus an offscreen `surface` that
+      `flip`/`update` scale once into the letterboxed window area;
+      `to_logical(pos)` maps mouse positions back.
+
+    `flip()` and `update(rects)` mirror `pygame.display`, so it can be given
+    as the `output` of `DirtyScreen` / `RenderPipeline`.
+    """
+
+    def __init__(self, size):
+        self.size = (int(size[0]), int(size[1]))
+        self.fullscreen = False
+        self.window = None
+        self.surface = None
+        # rect (in window coords) the logical surface is scaled into; None = no scaling
+        self.dest = None
+
+    def set_mode(self, fullscreen=False):
+        """Open the window for `fullscreen` and return the logical surface to draw on."""
+        self.fullscreen = fullscreen
+        self.window = None
+        if fullscreen:
+            try:
+                self.window = pygame.display.set_mode(self.size, pygame.FULLSCREEN | pygame.SCALED)
+            except pygame.error:
+                self.window = None
+            if self.window is None or self.window.get_size() != self.size:
+                self.window = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+        else:
+            self.window = pygame.display.set_mode(self.size)
+        if self.window.get_size() == self.size:
+            self.surface = self.window
+            self.dest = None
+        else:
+            self.surface = pygame.Surface(self.size, 0, self.window)
+            ww, wh = self.window.get_size()
+            scale = min(ww / self.size[0], wh / self.size[1])
+            w = max(1, int(self.size[0] * scale))
+            h = max(1, int(self.size[1] * scale))
+            self.dest = pygame.Rect((ww - w) // 2, (wh - h) // 2, w, h)
+            self.window.fill((0, 0, 0))
+        return self.surface
+
+    def to_logical(self, pos):
+        """Window position -> logical position (identity unless the surface is scaled by hand)."""
+        if self.dest is None:
+            return pos
+        x = (pos[0] - self.dest.x) * self.size[0] // self.dest.width
+        y = (pos[1] - self.dest.y) * self.size[1] // self.dest.height
+        return (x, y)
+
+    def pipeline(self, layers=('hud', 'overlay')):
+        """The frame pipeline for this output (`RenderPipeline`, by dirty rectangles)."""
+        return RenderPipeline(layers, self)
+
+    def use_canvas(self, active):
+        """Surface the fight draws on; software output has no separate canvas."""
+        return self.surface
+
+    def _scale(self):
+        pygame.transform.scale(self.surface, self.dest.size, self.window.subsurface(self.dest))
+
+    def flip(self):
+        if self.dest is not None:
+            self._scale()
+        pygame.display.flip()
+
+    def update(self, rects=None):
+        """Present `rects` (logical coords); a scaled surface is presented whole, in one scale."""
+        if self.dest is not None:
+            self._scale()
+            pygame.display.update(self.dest)
+        elif rects is None:
+            pygame.display.update()
+        else:
+            pygame.display.update(rects)
+
+
+class DirtyScreen:
+    """Dirty-rectangle presenter for a static background plus overlays.
+
+    Per frame the caller does::
+
+        if screen.begin(surface, static_key, signature):
+            if screen.full:
+                ...draw the static layer...
+                screen.capture()
+            ...draw the overlays, passing each returned rect to screen.mark()...
+            screen.present()
+
+    `begin` returns False when neither `static_key` nor `signature` (any
+    comparable value describing what the overlays depend on) changed since
+    the last presented frame, so nothing is drawn nor pushed to the display.
+    When only the signature changed, the overlay rects of the previous frame
+    are restored from the captured background before the overlays are drawn
+    again, and `present` updates just the old and new overlay rects.
+    `output` is what frames are presented to (`pygame.display` by default,
+    or a `LogicalScreen`).
+    """
+
+    def __init__(self, output=None):
+        self.output = output or pygame.display
+        self.surface = None
+        self.static_key = None
+        self.signature = None
+        self.background = None
+        self.full = True
+        self._prev = []
+        self._rects = []
+
+    def invalidate(self):
+        """Force a full redraw on the next frame (new display surface, rescaled art, expose...)."""
+        self.static_key = None
+        self.background = None
+
+    def begin(self, surface, static_key, signature):
+        full = (self.background is None or surface is not self.surface
+                or static_key != self.static_key)
+        if not full and signature == self.signature:
+            return False
+        self.full = full
+        self._rects = []
+        if full:
+            self.surface = surface
+            self.static_key = static_key
+            self.background = None
+        else:
+            for r in self._prev:
+                surface.blit(self.background, r, r)
+        self.signature = signature
+        return True
+
+    def capture(self):
+        """Remember the static layer just drawn on the surface."""
+        try:
+            self.background = self.surface.copy()
+        except Exception:
+            self.background = None
+
+    def mark(self, rect):
+        """Register an overlay rect (the return value of blit / pygame.draw) and return it."""
+        if rect:
+            self._rects.append(pygame.Rect(rect))
+        return rect
+
+    def present(self):
+        if self.full:
+            self.output.flip()
+        else:
+            dirty = self._prev + self._rects
+            if dirty:
+                self.output.update(dirty)
+        self._prev = self._rects
+        self._rects = []
+
+
+class DirtyCompositor:
+    """Dirty-rectangle compositor: static background, moving sprites and HUD blocks.
+
+    Per frame the caller does::
+
+        if compositor.begin(surface, static_key):
+            ...draw the static layer...
+            compositor.capture()
+        compositor.compose(draw_sprites, blocks)
+        compositor.present()
+
+    `draw_sprites(mark)` draws every moving sprite in order and passes each
+    drawn rect to `mark`; it may be called again with a clip set on the
+    surface, so it must only draw. `blocks` is the list of HUD blocks, drawn
+    after the sprites and in list order, as `(name, signature, rect, draw)`:
+    `rect` must cover everything `draw()` paints (None when the block paints
+    nothing this frame) and `signature` is any comparable value describing
+    its content. A block is redrawn when its signature or rect changed or
+    when something under it was restored; everything else keeps last
+    frame's pixels, so the result is identical to a full redraw. Frames are
+    presented to `output` (`pygame.display` or a `LogicalScreen`).
+    """
+
+    def __init__(self, output=None):
+        self.output = output or pygame.display
+        self.surface = None
+        self.static_key = None
+        self.background = None
+        self.full = True
+        self._sprites = []
+        self._blocks = {}
+        self._dirty = []
+
+    def invalidate(self):
+        """Force a full redraw on the next frame."""
+        self.static_key = None
+        self.background = None
+
+    def begin(self, surface, static_key):
+        """Start a frame; True when the static layer must be drawn (then call `capture()`)."""
+        self.full = (self.background is None or surface is not self.surface
+                     or static_key != self.static_key)
+        self._dirty = []
+        if self.full:
+            self.surface = surface
+            self.static_key = static_key
+            self.background = None
+        return self.full
+
+    def capture(self):
+        """Remember the static layer just drawn on the surface."""
+        try:
+            self.background = self.surface.copy()
+        except Exception:
+            self.background = None
+
+    def paint_background(self, static):
+        """Blit the pre-composed static layer `static` and restore from it from now on."""
+        self.surface.blit(static, (0, 0))
+        self.background = static
+
+    def compose(self, draw_sprites, blocks):
+        surface = self.surface
+        bounds = surface.get_rect()
+        blocks = [(name, sig, bounds.clip(rect) if rect else None, draw) for name, sig, rect, draw in blocks]
+        sprites = []
+
+        def mark(rect):
+            if rect:
+                sprites.append(pygame.Rect(rect))
+            return rect
+
+        if self.full or self.background is None:
+            draw_sprites(mark)
+            for name, sig, rect, draw in blocks:
+                if rect:
+                    draw()
+        else:
+            restored = self._dirty
+
+            def restore(rect):
+                surface.blit(self.background, rect, rect)
+                restored.append(rect)
+
+            # lo que ocupaban los luchadores en el frame anterior
+            for r in self._sprites:
+                restore(r)
+            # bloques que cambiaron: se limpian su zona vieja y la nueva
+            redraw = set()
+            for i, (name, sig, rect, draw) in enumerate(blocks):
+                if self._blocks.get(name) != (sig, rect):
+                    redraw.add(i)
+                    old = self._blocks.get(name)
+                    if old and old[1]:
+                        restore(old[1])
+                    if rect:
+                        restore(rect)
+
+            def spread(after_sprites):
+                # cualquier bloque que toque una zona restaurada (o, ya dibujados los
+                # luchadores, a un luchador) se restaura y se redibuja entero
+                grown = True
+                while grown:
+                    grown = False
+                    for i, (name, sig, rect, draw) in enumerate(blocks):
+                        if i in redraw or not rect:
+                            continue
+                        if rect.collidelist(restored) == -1 and not (after_sprites and rect.collidelist(sprites) != -1):
+                            continue
+                        redraw.add(i)
+                        restore(rect)
+                        grown = True
+                        if after_sprites:
+                            # los luchadores ya estaban pintados ahí: volver a pintarlos recortados
+                            surface.set_clip(rect)
+                            try:
+                                draw_sprites(lambda r: r)
+                            finally:
+                                surface.set_clip(None)
+
+            spread(False)
+            draw_sprites(mark)
+            spread(True)
+            for i in sorted(redraw):
+                if blocks[i][2]:
+                    blocks[i][3]()
+        self._dirty.extend(sprites)
+        self._sprites = sprites
+        self._blocks = {name: (sig, rect) for name, sig, rect, draw in blocks}
+
+    def present(self):
+        if self.full:
+            self.output.flip()
+        elif self._dirty:
+            self.output.update(self._dirty)
+        self._dirty = []
+
+
+class SurfaceCache:
+    """Pre-composed surfaces of one layer, rebuilt only when their key changes."""
+
+    def __init__(self):
+        self._items = {}
+        # sube con cada invalidate(): forma parte de la firma de los bloques de la capa
+        self.generation = 0
+
+    def get(self, name, key, build):
+        """Surface `name` for the content described by `key` (`build()` when it changed)."""
+        item = self._items.get(name)
+        if item is None or item[0] != key:
+            item = (key, build())
+            self._items[name] = item
+        return item[1]
+
+    def invalidate(self):
+        self._items.clear()
+        self.generation += 1
+
+
+class RenderPipeline:
+    """Layered frame rendering on top of a `DirtyCompositor`.
+
+    Layers, bottom to top:
+
+    - static: one pre-composed surface (background, ground...) that the
+      caller builds once per `static_key` (map, resolution); the compositor
+      paints it on full frames and restores dirty areas from it.
+    - actors: the `draw_sprites(mark)` callable given to `render`.
+    - block layers, in `layers` order (e.g. 'hud', 'overlay'): lists of
+      `(name, signature, rect, draw)` blocks as in `DirtyCompositor.compose`.
+      Each layer has its own `SurfaceCache` for its pre-composed surfaces;
+      `invalidate(layer)` rebuilds and redraws only that layer. Effects go in
+      as one more layer.
+    """
+
+    def __init__(self, layers=('hud', 'overlay'), output=None):
+        self.compositor = DirtyCompositor(output)
+        self.layers = list(layers)
+        self.caches = {name: SurfaceCache() for name in self.layers}
+
+    def cache(self, layer):
+        return self.caches[layer]
+
+    def invalidate(self, layer=None):
+        """Invalidate one block layer, or everything (static layer included) when `layer` is None."""
+        if layer is None:
+            self.compositor.invalidate()
+            for cache in self.caches.values():
+                cache.invalidate()
+        else:
+            self.caches[layer].invalidate()
+
+    def render(self, surface, static_key, static_layer, actors, blocks):
+        """Draw and present one frame.
+
+        `static_layer()` returns the pre-composed static surface (only called
+        on full frames); `blocks` maps layer name -> list of blocks.
+        """
+        comp = self.compositor
+        if comp.begin(surface, static_key):
+            static = static_layer()
+            if static is not None:
+                comp.paint_background(static)
+            else:
+                surface.fill((0, 0, 0))
+                comp.capture()
+        flat = []
+        for layer in self.layers:
+            gen = self.caches[layer].generation
+            for name, sig, rect, draw in blocks.get(layer, ()):
+                flat.append((f'{layer}:{name}', (gen, sig), rect, draw))
+        comp.compose(actors, flat)
+        comp.present()
+
+
+class TextCache:
+    """LRU cache of rendered text keyed by (font, text, colour, antialias, background).
+
+    `font(name, size)` memoizes the `pygame.font.SysFont` objects too, so the
+    same Font instance (and therefore the same cache entries) is reused
+    across screens and matches. Returned surfaces are shared: blit them,
+    never draw on them.
+    """
+
+    def __init__(self, max_items=256):
+        self.max_items = max_items
+        self._items = OrderedDict()
+        self._fonts = {}
+        self.hits = 0
+        self.misses = 0
+
+    def font(self, name, size):
+        key = (name, size)
+        font = self._fonts.get(key)
+        if font is None:
+            font = self._fonts[key] = pygame.font.SysFont(name, size)
+        return font
+
+    def render(self, font, text, color, antialias=True, background=None):
+        """Same as `font.render(text, antialias, color, background)`, cached."""
+        key = (font, text, tuple(color), antialias, tuple(background) if background else None)
+        surf = self._items.get(key)
+        if surf is not None:
+            self._items.move_to_end(key)
+            self.hits += 1
+            return surf
+        self.misses += 1
+        if background is None:
+            surf = font.render(text, antialias, color)
+        else:
+            surf = font.render(text, antialias, color, background)
+        self._items[key] = surf
+        if len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+        return surf
+
+    def clear(self):
+        self._items.clear()
+
+
+class DigitAtlas:
+    """Every value of a zero-padded counter (the fight timer) pre-rendered in one surface.
+
+    Labels are rendered whole ("07", "45"...) and packed into a grid: drawing
+    single digits side by side does not reproduce SDL_ttf's kerning and
+    sub-pixel advances, so this keeps the timer pixel-identical to
+    `font.render`. Each label is copied into the atlas with
+    `BLEND_RGBA_ADD` on a transparent surface, i.e. its RGBA is kept as is.
+    """
+
+    def __init__(self, font, color, max_value=99, width=2, antialias=True, columns=10):
+        self.font = font
+        self.color = color
+        self.antialias = antialias
+        self.width = width
+        labels = [f"{n:0{width}}" for n in range(max_value + 1)]
+        rendered = [font.render(label, antialias, color) for label in labels]
+        cell_w = max(s.get_width() for s in rendered)
+        cell_h = max(s.get_height() for s in rendered)
+        rows = (len(rendered) + columns - 1) // columns
+        self.surface = pygame.Surface((cell_w * columns, cell_h * rows), pygame.SRCALPHA)
+        self.surface.fill((0, 0, 0, 0))
+        self._rects = {}
+        for i, (label, surf) in enumerate(zip(labels, rendered)):
+            x = (i % columns) * cell_w
+            y = (i // columns) * cell_h
+            self.surface.blit(surf, (x, y), special_flags=pygame.BLEND_RGBA_ADD)
+            self._rects[label] = pygame.Rect(x, y, surf.get_width(), surf.get_height())
+
+    def size(self, label):
+        r = self._rects.get(label)
+        return (r.width, r.height) if r else self.font.size(label)
+
+    def blit(self, surface, label, pos):
+        """Blit `label` at `pos` (top-left); labels outside the atlas are rendered on the fly."""
+        r = self._rects.get(label)
+        if r is None:
+            return surface.blit(self.font.render(label, self.antialias, self.color), pos)
+        return surface.blit(self.surface, pos, r)
+
+
+class FaceOverlay:
+    """A fighter's face drawn over its sprite: one scaled surface plus an anchor table.
+
+    `anchors[(state, facing_right)]` is `((fx, fy), (cx, cy))`: the offset from
+    the fighter's position to the face's top-left corner and, for fighters
+    without a face image, to the centre of the plain circle drawn instead.
+    Drawing is one lookup and one blit; unknown states use `default`.
+    """
+
+    def __init__(self, face, radius, anchors, default=None):
+        self.face = face
+        self.radius = radius
+        self.anchors = dict(anchors)
+        self.default = default
+        self._circles = {}
+
+    def reconvert(self, convert):
+        """Replace the face with `convert(face)` (e.g. after the display format changed)."""
+        if self.face is not None:
+            self.face = convert(self.face)
+        self._circles = {}
+
+    def anchor(self, state, facing_right):
+        a = self.anchors.get((state, facing_right))
+        if a is None:
+            a = self.anchors.get((self.default, facing_right), ((-self.radius, -self.radius), (0, 0)))
+        return a
+
+    def draw(self, surface, x, y, state, facing_right, color=(255, 255, 255)):
+        """Draw the face for `state`/`facing_right` at fighter position (x, y); returns the rect."""
+        (fx, fy), (cx, cy) = self.anchor(state, facing_right)
+        if self.face is not None:
+            return surface.blit(self.face, (x + fx, y + fy))
+        return surface.blit(self.circle(color), (x + cx - self.radius, y + cy - self.radius))
+
+    def circle(self, color):
+        """The plain head as a surface (same pixels as `pygame.draw.circle`), so it is a blit too."""
+        key = tuple(color)
+        surf = self._circles.get(key)
+        if surf is None:
+            size = self.radius * 2
+            surf = pygame.Surface((size, size), pygame.SRCALPHA)
+            surf.fill((0, 0, 0, 0))
+            pygame.draw.circle(surf, color, (self.radius, self.radius), self.radius, 0)
+            self._circles[key] = surf
+        return surf
+
+
+class TextureCache:
+    """GPU textures for the surfaces drawn through a `TextureCanvas` (LRU).
+
+    Surfaces are uploaded once; subsurfaces (atlas views) reuse the texture
+    of their root surface with an offset, so a character atlas is a single
+    upload. Entries keep a reference to their surface: cached surfaces are
+    treated as immutable, like everywhere else in the game.
+    """
+
+    def __init__(self, renderer, max_items=512):
+        self.renderer = renderer
+        self.max_items = max_items
+        self._items = OrderedDict()
+
+    def get(self, surf):
+        """`(texture, (ox, oy))`: the texture holding `surf` and where `surf` starts in it."""
+        root = surf
+        try:
+            while root.get_parent() is not None:
+                root = root.get_parent()
+            offset = surf.get_abs_offset() if root is not surf else (0, 0)
+        except Exception:
+            root, offset = surf, (0, 0)
+        key = id(root)
+        entry = self._items.get(key)
+        if entry is None or entry[0] is not root:
+            entry = (root, sdl2_video.Texture.from_surface(self.renderer, root))
+            self._items[key] = entry
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+        else:
+            self._items.move_to_end(key)
+        return entry[1], offset
+
+    def clear(self):
+        self._items.clear()
+
+
+class TextureCanvas:
+    """Surface-like target whose blits become renderer copies.
+
+    It covers what the fight frame does with its surface: `blit(source, dest,
+    area=None)` (returning the drawn rect, like `Surface.blit`), `fill`,
+    `get_size`, `get_width`, `get_height` and `get_rect`. The copies of the
+    current frame are kept until `begin()`, so something drawn later (a
+    round logo) is presented over the whole scene, as on a real surface.
+    """
+
+    def __init__(self, renderer, size, textures):
+        self.renderer = renderer
+        self.size = (int(size[0]), int(size[1]))
+        self.textures = textures
+        self._commands = []
+
+    def get_size(self):
+        return self.size
+
+    def get_width(self):
+        return self.size[0]
+
+    def get_height(self):
+        return self.size[1]
+
+    def get_rect(self, **kwargs):
+        rect = pygame.Rect((0, 0), self.size)
+        for name, value in kwargs.items():
+            setattr(rect, name, value)
+        return rect
+
+    def begin(self):
+        """Start a new frame (forget the previous frame's copies)."""
+        self._commands = []
+
+    def blit(self, source, dest, area=None, special_flags=0):
+        texture, (ox, oy) = self.textures.get(source)
+        src = source.get_rect() if area is None else pygame.Rect(area).clip(source.get_rect())
+        x, y = (dest.topleft if isinstance(dest, pygame.Rect) else (int(dest[0]), int(dest[1])))
+        dst = pygame.Rect(x, y, src.width, src.height)
+        self._commands.append((texture, src.move(ox, oy), dst))
+        return dst.clip(pygame.Rect((0, 0), self.size))
+
+    def fill(self, color, rect=None):
+        rect = pygame.Rect(rect) if rect is not None else pygame.Rect((0, 0), self.size)
+        self._commands.append((None, pygame.Color(color), rect))
+        return rect
+
+    def present(self):
+        renderer = self.renderer
+        renderer.draw_color = (0, 0, 0, 255)
+        renderer.clear()
+        for texture, src, dst in self._commands:
+            if texture is None:
+                renderer.draw_color = src
+                renderer.fill_rect(dst)
+            else:
+                texture.draw(srcrect=src, dstrect=dst)
+        renderer.present()
+
+
+class TexturePipeline:
+    """`RenderPipeline` for the texture backend: same layers and blocks, no dirty rectangles.
+
+    With a renderer the whole frame is rebuilt every time from textures that
+    are already on the GPU, so restoring rectangles would buy nothing: the
+    static layer is one copy, then the actors and the blocks that have a rect.
+    """
+
+    def __init__(self, screen, layers=('hud', 'overlay')):
+        self.screen = screen
+        self.layers = list(layers)
+        self.caches = {name: SurfaceCache() for name in self.layers}
+        self.static_key = None
+        self.static = None
+
+    def cache(self, layer):
+        return self.caches[layer]
+
+    def invalidate(self, layer=None):
+        if layer is None:
+            self.static_key = None
+            self.static = None
+            for cache in self.caches.values():
+                cache.invalidate()
+        else:
+            self.caches[layer].invalidate()
+
+    def render(self, surface, static_key, static_layer, actors, blocks):
+        canvas = self.screen.canvas
+        if self.static is None or static_key != self.static_key:
+            self.static = static_layer()
+            self.static_key = static_key
+        canvas.begin()
+        if self.static is not None:
+            canvas.blit(self.static, (0, 0))
+        else:
+            canvas.fill((0, 0, 0))
+        actors(lambda r: r)
+        for layer in self.layers:
+            for name, sig, rect, draw in blocks.get(layer, ()):
+                if rect is not None:
+                    draw()
+        canvas.present()
+
+
+class TextureScreen:
+    """SDL2 texture backend (`pygame._sdl2.video`): `Window` + `Renderer`.
+
+    Same interface as `LogicalScreen`. The menu keeps drawing in software on
+    `surface` and `flip`/`update` stream the changed area into one texture;
+    the fight draws on `canvas` (`use_canvas(True)`), where backgrounds,
+    sprite frames, faces, logos and HUD text are uploaded once as textures
+    and every blit is a renderer copy. The renderer's logical size does the
+    final scaling in fullscreen. With `software=True`, or when no
+    accelerated renderer can be created, SDL's software renderer is used,
+    so it also runs on machines without a GPU.
+    """
+
+    def __init__(self, size, title='', software=False):
+        if sdl2_video is None:
+            raise RuntimeError('pygame._sdl2.video no está disponible')
+        self.size = (int(size[0]), int(size[1]))
+        self.fullscreen = False
+        self.dest = None
+        self.window = sdl2_video.Window(title, self.size)
+        renderer = None
+        if not software:
+            try:
+                renderer = sdl2_video.Renderer(self.window, accelerated=1)
+            except Exception:
+                renderer = None
+        if renderer is None:
+            renderer = sdl2_video.Renderer(self.window, accelerated=0)
+        self.renderer = renderer
+        self.renderer.logical_size = self.size
+        self.surface = pygame.Surface(self.size, 0, 32)
+        self.frame = sdl2_video.Texture(self.renderer, self.size, streaming=True)
+        self.textures = TextureCache(self.renderer)
+        self.canvas = TextureCanvas(self.renderer, self.size, self.textures)
+        self.canvas_active = False
+
+    def set_mode(self, fullscreen=False):
+        self.fullscreen = fullscreen
+        try:
+            if fullscreen:
+                self.window.set_fullscreen(desktop=True)
+            else:
+                self.window.set_windowed()
+        except Exception:
+            pass
+        return self.canvas if self.canvas_active else self.surface
+
+    def to_logical(self, pos):
+        # SDL ya entrega el mouse en coordenadas lógicas (logical_size del renderer)
+        return pos
+
+    def pipeline(self, layers=('hud', 'overlay')):
+        return TexturePipeline(self, layers)
+
+    def use_canvas(self, active):
+        """Switch between the texture canvas (fight) and the software surface (menus)."""
+        self.canvas_active = bool(active)
+        return self.canvas if self.canvas_active else self.surface
+
+    def _present_frame(self):
+        self.renderer.draw_color = (0, 0, 0, 255)
+        self.renderer.clear()
+        self.frame.draw()
+        self.renderer.present()
+
+    def flip(self):
+        if self.canvas_active:
+            self.canvas.present()
+            return
+        self.frame.update(self.surface)
+        self._present_frame()
+
+    def update(self, rects=None):
+        if self.canvas_active or rects is None:
+            self.flip()
+            return
+        bounds = self.surface.get_rect()
+        for r in rects:
+            r = pygame.Rect(r).clip(bounds)
+            if r.width and r.height:
+                self.frame.update(self.surface.subsurface(r), area=r)
+        self._present_frame()
+
@@ -8,15 +8,40 @@ import sys
 import os
 import json
 from personaje import Personaje
+from dibujo import DigitAtlas, DirtyScreen, FaceOverlay, LogicalScreen, TextCache, TextureScreen
+from regiones import HitIndex, SelectorRegionCache, dark_projections, detect_red_frames, detect_runs, selector_row_hitboxes
+from recursos import AssetManager, BackgroundLoader, SpriteDiskCache, as_rgba, finalize_surface, fit_surface, load_image, load_sprite_file, get_asset_index, make_decode_pool, mask_bounds, open_asset_bundle, pose_files, scale_to_height, NATIVE_HEIGHT, POSE_CANDIDATES, STATE_PATTERNS
 
 class Juego:
-    def __init__(self, ancho=1366, alto=768, fps=60):
+    def __init__(self, ancho=1366, alto=768, fps=60, resolucion_logica=True, render='software'):
         # Ventana fija a 1366x768 (no fullscreen)
         self.ancho = ancho
         self.alto = alto
         self.fps = fps
         pygame.init()
-        self.pantalla = pygame.display.set_mode((self.ancho, self.alto))
+        # Resolución lógica fija (ver dibujo.LogicalScreen): todo se dibuja a
+        # ancho x alto y F11 sólo cambia cómo se lleva a la ventana. Con
+        # resolucion_logica=False, F11 pasa a la resolución del monitor y
+        # reescala portada/selectores (rescale_assets), como antes.
+        self.resolucion_logica = resolucion_logica
+        # Backend de dibujo: 'software' (Surface.blit) o 'sdl2' (texturas de
+        # pygame._sdl2.video, ver dibujo.TextureScreen; 'sdl2-software' usa el
+        # renderer por software de SDL). Si SDL2 no se puede usar, queda software.
+        self.render = render
+        self.pantalla_logica = None
+        if render in ('sdl2', 'sdl2-software'):
+            try:
+                self.pantalla_logica = TextureScreen((self.ancho, self.alto), "Demo Pelea - Fase 2",
+                                                     software=(render == 'sdl2-software'))
+                # el renderer escala solo: siempre resolución lógica
+                self.resolucion_logica = True
+            except Exception as e:
+                print(f"Backend SDL2 no disponible ({e}); se usa el de software")
+                self.pantalla_logica = None
+                self.render = 'software'
+        if self.pantalla_logica is None:
+            self.pantalla_logica = LogicalScreen((self.ancho, self.alto))
+        self.pantalla = self.pantalla_logica.set_mode(False)
         pygame.display.set_caption("Demo Pelea - Fase 2")
         self.reloj = pygame.time.Clock()
 
@@ -35,77 +60,136 @@ class Juego:
         # FPS cap settings (can be toggled in-game with F7)
         self.fps_cap_enabled = True
         self.fps_cap = 60
+        # Espera máxima (ms) del menú en reposo cuando no hay ningún cambio programado
+        self.menu_idle_ms = 1000
+        # RLEACCEL en sprites sueltos y caras (ver recursos.finalize_surface): blits
+        # mucho más rápidos, pero los bordes semitransparentes no quedan idénticos
+        self.sprite_rle = False
         # Reusable surfaces for selector hitbox drawing
         self.selector_hitbox_surf = None
+        # Paquete precompilado (cache/assets.bundle, ver tools/build_assets.py): si
+        # existe se mapea en memoria y las imágenes/sprites salen directo de ahí
+        self.asset_bundle = open_asset_bundle()
+        # Índice de carpetas de recursos (claves lógicas -> rutas), uno por proceso
+        self.asset_index = get_asset_index()
+        # Cache en disco de frames ya escalados (cache/sprites); ver recursos.py
+        self.sprite_cache = SpriteDiskCache()
+        # Hilo de carga en segundo plano (prefetch de personajes en el selector)
+        self.asset_loader = BackgroundLoader()
+        # Pool de procesos para decodificar/escalar sprites en paralelo (None con un solo núcleo);
+        # los procesos se crean recién con el primer sprite que no está en cache
+        self.decode_pool = make_decode_pool()
+        # Regiones detectadas en los selectores, normalizadas por imagen (cache/regions.json)
+        self.region_cache = SelectorRegionCache()
+        # Fuentes y textos ya renderizados (LRU), compartidos por menú y pelea
+        self.text_cache = TextCache()
+        # Recursos de la sesión: imágenes, logos, fondos y sprites sobreviven entre peleas
+        self.assets = AssetManager(self.asset_index, loader=self.asset_loader, cache=self.sprite_cache,
+                                   executor=self.decode_pool)
+        # Fondos de mapa escalados por (mapa, resolución), precargados desde el selector de mapas
+        self.map_backgrounds = self.assets.maps
+
+    def shutdown(self):
+        """Cerrar el pool de decodificación sin esperar los sprites encolados (prefetch del selector).
+
+        Sin esto, al salir el handler de `concurrent.futures` espera a que
+        terminen todas las decodificaciones pendientes antes de cerrar.
+        """
+        pool = getattr(self, 'decode_pool', None)
+        if pool is not None:
+            try:
+                pool.shutdown(wait=False, cancel_futures=True)
+            except Exception:
+                pass
+
+    def invalidate_sprites(self, character=None):
+        """Descartar los sprites cargados de `character` (o de todos) y volver a listar Sprites/.
+
+        Es la única forma de forzar que se vuelvan a decodificar: el registro de
+        sprites (self.assets) se construye una vez por sesión y ni el selector
+        (F11, H, R) ni las revanchas lo tocan. Se cargan de nuevo la próxima vez
+        que get_sprites_for los pida.
+        """
+        try:
+            self.assets.invalidate_sprites(character)
+        except Exception:
+            pass
+
+    def reconvert_surfaces(self):
+        """Volver a convertir las superficies cacheadas si cambió el formato del display.
+
+        Se llama después de cada `set_mode` (F11). Con el mismo formato no hace
+        nada; si cambió, self.assets reconvierte lo suyo (imágenes, fondos,
+        sprites, caras, logos) y también los frames genéricos de self.char_sprites*.
+        """
+        try:
+            if self.assets.reconvert(getattr(self, 'char_sprites_cache', None),
+                                     getattr(self, 'char_sprites', None)):
+                self.text_cache.clear()
+                self.selector_hitbox_surf = None
+        except Exception:
+            pass
+
+    def set_display_mode(self, fullscreen):
+        """Pasar a pantalla completa o volver a la ventana.
+
+        Devuelve True si cambió el tamaño de dibujo (self.ancho/self.alto) y
+        hay que reescalar los recursos; con resolución lógica nunca pasa: el
+        juego sigue dibujando a 1366x768 y lo cacheado sirve tal cual.
+        """
+        if self.resolucion_logica:
+            self.pantalla = self.pantalla_logica.set_mode(fullscreen)
+            self.reconvert_surfaces()
+            return False
+        if fullscreen:
+            # cambiar a fullscreen a resolución del monitor
+            info = pygame.display.Info()
+            self.ancho, self.alto = info.current_w, info.current_h
+            self.pantalla = pygame.display.set_mode((self.ancho, self.alto), pygame.FULLSCREEN)
+        else:
+            # volver a ventana
+            self.ancho, self.alto = self.pantalla_logica.size
+            self.pantalla = pygame.display.set_mode((self.ancho, self.alto))
+        # sin escalado final: se presenta directo a la ventana
+        self.pantalla_logica.window = self.pantalla_logica.surface = self.pantalla
+        self.pantalla_logica.dest = None
+        return True
 
     def ejecutar_pelea(self):
         # Mostrar menú de inicio antes de iniciar la pelea
         musica_portada = "music/portada.ogg"
 
-        # tamaño por defecto de ventana (para volver de fullscreen)
-        windowed_w, windowed_h = self.ancho, self.alto
+        # Volver a listar sólo las carpetas de recursos que cambiaron desde la última pelea
+        # (si algo cambió, la sesión descarta lo que tenía en memoria)
+        try:
+            self.assets.refresh()
+        except Exception:
+            pass
 
-        # Buscar automáticamente un archivo de portada dentro de images/
+        # Buscar automáticamente un archivo de portada dentro de images/ (ver AssetIndex: 'cover')
         portada_img = None
-        portada_path = None
         images_dir = "images"
-        if os.path.isdir(images_dir):
-            # Priorizar archivos que empiecen por 'portada.' (case-insensitive)
-            for name in os.listdir(images_dir):
-                low = name.lower()
-                if low.startswith("portada.") or low == "portada" or low.startswith("portada_"):
-                    portada_path = os.path.join(images_dir, name)
-                    break
-            # Si no se encontró, tomar cualquier imagen válida dentro de la carpeta
-            if portada_path is None:
-                for name in os.listdir(images_dir):
-                    if name.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.webp')):
-                        portada_path = os.path.join(images_dir, name)
-                        break
+        portada_path = self.asset_index.resolve('cover')
 
-        portada_original = None
-        if portada_path and os.path.exists(portada_path):
-            try:
-                # Cargamos el original y lo guardamos para poder reescalar al cambiar modo de pantalla
-                portada_original = pygame.image.load(portada_path).convert_alpha()
-            except Exception:
-                portada_original = None
-
-        # Cargar portada y escalar directamente a 1920x1080 (sin preservación especial de aspect ratio)
+        # Cargar portada (original guardado para reescalar al cambiar modo de pantalla).
+        # Original y versión escalada quedan en self.assets para las próximas peleas.
         portada_img = None
         portada_original = None
-        if portada_path and os.path.exists(portada_path):
-            try:
-                # Cargar el original con alpha si existe para preservar calidad
-                portada_original = pygame.image.load(portada_path).convert_alpha()
-            except Exception:
-                try:
-                    portada_original = pygame.image.load(portada_path).convert()
-                except Exception:
-                    portada_original = None
+        portada_alpha = True
+        if portada_path and self.asset_index.exists(portada_path):
+            # Cargar el original con alpha si existe para preservar calidad
+            portada_original = self.assets.image(portada_path)
+            if portada_original is None:
+                portada_alpha = False
+                portada_original = self.assets.image(portada_path, alpha=False)
 
         def high_quality_scale(surface, target_w, target_h):
-            if surface is None:
-                return None
-            sw, sh = surface.get_size()
-            # Preserve aspect ratio
-            scale = min(target_w / sw, target_h / sh)
-            new_w = max(1, int(sw * scale))
-            new_h = max(1, int(sh * scale))
-            try:
-                scaled = pygame.transform.smoothscale(surface, (new_w, new_h))
-            except Exception:
-                scaled = pygame.transform.scale(surface, (new_w, new_h))
-            final = pygame.Surface((target_w, target_h), pygame.SRCALPHA)
-            # Fill with black background to avoid transparent borders
-            final.fill((0, 0, 0))
-            x = (target_w - new_w) // 2
-            y = (target_h - new_h) // 2
-            final.blit(scaled, (x, y))
-            return final
+            # Preserve aspect ratio, black borders (recursos.fit_surface); el
+            # resultado es opaco y queda en el formato del display (convert())
+            return finalize_surface(fit_surface(surface, target_w, target_h), alpha=False)
 
         if portada_original:
-            portada_img = high_quality_scale(portada_original, self.ancho, self.alto)
+            portada_img = self.assets.scaled(portada_path, (self.ancho, self.alto), high_quality_scale, alpha=portada_alpha)
         else:
             portada_img = None
 
@@ -120,69 +204,57 @@ class Juego:
             except Exception:
                 pass
 
-        mostrando_menu = True
-        font_title = pygame.font.SysFont(None, 72)
-        font_sub = pygame.font.SysFont(None, 32)
-
-        # Datos para la pantalla de selección basada en imagen
-        selector_path = None
-        # Preferir archivos que indiquen claramente que son para personajes
-        for name in os.listdir(images_dir):
-            low = name.lower()
-            if low.startswith("selectordepersonajes") or "personaje" in low or "personajes" in low:
-                selector_path = os.path.join(images_dir, name)
-                break
-        # Si no hay coincidencias explícitas, buscar archivos que empiecen por 'selector' pero evitar los que indiquen 'map'/'mapas'
-        if selector_path is None:
-            for name in os.listdir(images_dir):
-                low = name.lower()
-                if low.startswith("selector") and not ("map" in low or "mapas" in low or "mapa" in low):
-                    selector_path = os.path.join(images_dir, name)
-                    break
+        # Per-character registry from Sprites/ subfolders (SpritesName). Only the
+        # folder listing happens here: a character's frames (scaled to the target
+        # heights, masks, bounds and atlas; see recursos.SpriteRegistry) are
+        # materialized the first time get_sprites_for asks for it, so a match only
+        # pays for the two fighters in play. While the selector is on screen the
+        # hovered/selected fighters are decoded ahead of time on self.asset_loader.
+        # The registry belongs to the session (self.assets): characters loaded in a
+        # previous match are still there.
+        try:
+            self.sprite_registry = self.assets.sprite_registry(STATE_PATTERNS, [360, 220])
+        except Exception:
+            # optional: ignore failures in per-character registry
+            pass
 
-        selector_img = None
-        if selector_path and os.path.exists(selector_path):
+        def prefetch_fighter(name):
             try:
-                 selector_original = pygame.image.load(selector_path).convert()
-                 selector_img = high_quality_scale(selector_original, self.ancho, self.alto)
+                self.sprite_registry.prefetch(name)
             except Exception:
-                selector_img = None
+                pass
+
+        def prefetch_map(name):
+            try:
+                self.map_backgrounds.prefetch(name, (self.ancho, self.alto))
+            except Exception:
+                pass
+
+        mostrando_menu = True
+        font_title = self.text_cache.font(None, 72)
+        font_sub = self.text_cache.font(None, 32)
+        # las etiquetas del menú (turno, botón, nombres) salen de la cache de textos
+        texto = self.text_cache.render
+
+        # Datos para la pantalla de selección basada en imagen: preferir archivos que
+        # indiquen claramente que son para personajes (ver AssetIndex: 'selector')
+        selector_path = self.asset_index.resolve('selector')
+
+        selector_img = None
+        if selector_path and self.asset_index.exists(selector_path):
+            selector_original = self.assets.image(selector_path, alpha=False)
+            selector_img = self.assets.scaled(selector_path, (self.ancho, self.alto), high_quality_scale, alpha=False)
 
         # Intentar cargar un selector de mapas (imagen donde el usuario marca regiones para elegir mapa)
         map_selector_path = None
         map_selector_original = None
         # Buscar archivos que empiecen por 'selector_map', 'SelectorDeMapas' u otras variantes, o estén en images/maps/
-        image_exts = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.webp')
-        for name in os.listdir(images_dir):
-            low = name.lower()
-            # Only consider image files (avoid matching json/other files)
-            if not low.endswith(image_exts):
-                continue
-            if ('selector_map' in low) or ('selectormap' in low) or ('map_selector' in low) or ('selectordemap' in low) or ('selectordemapas' in low):
-                map_selector_path = os.path.join(images_dir, name)
-                break
-        # fallback: buscar en images/maps/
-        maps_dir = os.path.join(images_dir, 'maps')
-        if map_selector_path is None and os.path.isdir(maps_dir):
-            # si hay una imagen llamada selector en maps, úsala; si no, tomar la primera imagen disponible
-            for name in os.listdir(maps_dir):
-                low = name.lower()
-                if low.startswith('selector') or 'selector' in low:
-                    map_selector_path = os.path.join(maps_dir, name)
-                    break
-            if map_selector_path is None:
-                for name in os.listdir(maps_dir):
-                    if name.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.webp')):
-                        map_selector_path = os.path.join(maps_dir, name)
-                        break
+        map_selector_path = self.asset_index.resolve('map_selector')
 
         map_selector_img = None
-        if map_selector_path and os.path.exists(map_selector_path):
-            try:
-                map_selector_original = pygame.image.load(map_selector_path).convert()
-                map_selector_img = high_quality_scale(map_selector_original, self.ancho, self.alto)
-            except Exception:
-                map_selector_img = None
+        if map_selector_path and self.asset_index.exists(map_selector_path):
+            map_selector_original = self.assets.image(map_selector_path, alpha=False)
+            map_selector_img = self.assets.scaled(map_selector_path, (self.ancho, self.alto), high_quality_scale, alpha=False)
 
         # Inicializar estructuras para regiones/mapping del selector de mapas (declaradas antes de rescale_assets)
         map_selector_regions = []
@@ -190,7 +262,14 @@ class Juego:
 
         # Detectar regiones (marcos) en la imagen de selector: heurística simple
         # Función para detectar regiones (marcos) en la imagen de selector: heurística simple
-        def detect_selector_regions(surf, rects_filename='selector_rects.json'):
+        def detect_selector_regions(surf, rects_filename='selector_rects.json', source_path=None, source_surf=None):
+            """Regiones de `surf` (la imagen `source_path`/`source_surf` escalada a pantalla).
+
+            Orden: archivo de rects en images/ (si existe y es válido), regiones ya
+            detectadas para esa imagen en self.region_cache (sólo se transforman a
+            la resolución actual) y, si no hay, análisis de píxeles: marcos rojos,
+            bordes oscuros o grid 4x2.
+            """
             regions = []
             if surf is None:
                 return regions
@@ -208,269 +287,58 @@ class Juego:
                         return regions
                 except Exception:
                     pass
-                # Build per-character registry from Sprites/ subfolders (SpritesName)
-                try:
-                    self.char_sprites_by_character = {}
-                    roots = []
-                    if os.path.isdir('Sprites'):
-                        roots.append('Sprites')
-                    # Try to import PIL for GIF support if available
-                    try:
-                        from PIL import Image, ImageSequence
-                        pil_available_local = True
-                    except Exception:
-                        pil_available_local = False
-
-                    if roots:
-                        for root in roots:
-                            for entry in os.listdir(root):
-                                entry_path = os.path.join(root, entry)
-                                if not os.path.isdir(entry_path):
-                                    continue
-                                # infer character name from folder name (strip common prefix 'Sprites')
-                                pd = entry
-                                try:
-                                    lowpd = pd.lower()
-                                    if lowpd.startswith('sprites'):
-                                        char = pd[len('sprites'):].lstrip('_- ') or pd
-                                    elif lowpd.startswith('sprite'):
-                                        char = pd[len('sprite'):].lstrip('_- ') or pd
-                                    else:
-                                        char = pd
-                                    # strip non-alpha ends
-                                    while char and not char[0].isalpha():
-                                        char = char[1:]
-                                    while char and not char[-1].isalpha():
-                                        char = char[:-1]
-                                except Exception:
-                                    char = pd
-                                if not char:
-                                    char = pd
-                                try:
-                                    char = char[0].upper() + char[1:]
-                                except Exception:
-                                    pass
-                                # ensure registry
-                                if char not in self.char_sprites_by_character:
-                                    self.char_sprites_by_character[char] = {}
-                                    for stt in state_patterns.keys():
-                                        self.char_sprites_by_character[char][stt] = {'derecha': [], 'izquierda': [], 'any': []}
-
-                                # scan files in this folder
-                                for fname in os.listdir(entry_path):
-                                    fpath = os.path.join(entry_path, fname)
-                                    if not os.path.isfile(fpath):
-                                        continue
-                                    low = fname.lower()
-                                    # determine direction
-                                    if ('derecha' in low or 'derech' in low or '_r' in low or 'right' in low):
-                                        dir_key = 'derecha'
-                                    elif ('izquierda' in low or 'iquierda' in low or 'izq' in low or '_l' in low or 'left' in low):
-                                        dir_key = 'izquierda'
-                                    else:
-                                        dir_key = 'any'
-                                    # determine state
-                                    matched_state = None
-                                    for st, patterns in state_patterns.items():
-                                        for p in patterns:
-                                            if p in low:
-                                                matched_state = st
-                                                break
-                                        if matched_state:
-                                            break
-                                    if not matched_state:
-                                        # Try extra heuristics: classify kick-related filenames as 'patear'
-                                        try:
-                                            if any(k in low for k in ('patad', 'pate', 'kick')):
-                                                matched_state = 'patear'
-                                        except Exception:
-                                            matched_state = None
-                                        if not matched_state:
-                                            # unknown, skip
-                                            continue
-                                    # load frames (support GIF via PIL)
-                                    frames = []
-                                    ext = os.path.splitext(fpath)[1].lower()
-                                    if ext == '.gif' and pil_available_local:
-                                        try:
-                                            img = Image.open(fpath)
-                                            for frame in ImageSequence.Iterator(img):
-                                                try:
-                                                    f = frame.convert('RGBA')
-                                                    w, h = f.size
-                                                    data = f.tobytes()
-                                                    surf = pygame.image.fromstring(data, (w, h), 'RGBA').convert_alpha()
-                                                    frames.append(surf)
-                                                except Exception:
-                                                    continue
-                                        except Exception:
-                                            frames = []
-                                    else:
-                                        try:
-                                            surf = pygame.image.load(fpath).convert_alpha()
-                                            frames = [surf]
-                                        except Exception:
-                                            frames = []
-
-                                    if frames:
-                                        try:
-                                            self.char_sprites_by_character[char][matched_state][dir_key].extend(frames)
-                                        except Exception:
-                                            pass
-                except Exception:
-                    # per-character registry optional; ignore failures
-                    pass
+            # 2. Regiones ya detectadas para esta imagen (en cualquier resolución)
+            if source_path and source_surf is not None:
+                cached = self.region_cache.get(source_path, source_surf.get_size(), rects_filename, (w, h))
+                if cached is not None:
+                    return cached
             try:
-                px = pygame.PixelArray(surf)
-                # Primera estrategia: detectar marcos rojos (bordes marcados en la imagen)
-                def detect_red_frames():
-                    visited = [[False]*h for _ in range(w)]
-                    comps = []
-                    for x in range(w):
-                        for y in range(h):
-                            if visited[x][y]:
-                                continue
-                            col = px[x, y]
-                            r = (col >> 16) & 0xFF
-                            g = (col >> 8) & 0xFF
-                            b = col & 0xFF
-                            # heurística para rojo brillante usado en tu imagen
-                            if r >= 180 and g <= 80 and b <= 80:
-                                # BFS para componente conectada (4-neighbors)
-                                stack = [(x, y)]
-                                visited[x][y] = True
-                                minx, maxx = x, x
-                                miny, maxy = y, y
-                                while stack:
-                                    cx, cy = stack.pop()
-                                    # expand bounds
-                                    if cx < minx: minx = cx
-                                    if cx > maxx: maxx = cx
-                                    if cy < miny: miny = cy
-                                    if cy > maxy: maxy = cy
-                                    for nx in (cx-1, cx+1):
-                                        if 0 <= nx < w and not visited[nx][cy]:
-                                            coln = px[nx, cy]
-                                            rn = (coln >> 16) & 0xFF
-                                            gn = (coln >> 8) & 0xFF
-                                            bn = coln & 0xFF
-                                            if rn >= 180 and gn <= 80 and bn <= 80:
-                                                visited[nx][cy] = True
-                                                stack.append((nx, cy))
-                                    for ny in (cy-1, cy+1):
-                                        if 0 <= ny < h and not visited[cx][ny]:
-                                            coln = px[cx, ny]
-                                            rn = (coln >> 16) & 0xFF
-                                            gn = (coln >> 8) & 0xFF
-                                            bn = coln & 0xFF
-                                            if rn >= 180 and gn <= 80 and bn <= 80:
-                                                visited[cx][ny] = True
-                                                stack.append((cx, ny))
-                                comps.append((minx, miny, maxx, maxy))
-                            else:
-                                visited[x][y] = True
-                    # Compactar bounding boxes y generar rects
-                    rects = []
-                    for (minx, miny, maxx, maxy) in comps:
-                        # añadir padding pequeño para incluir el interior
-                        pad = 6
-                        rx = max(0, minx - pad)
-                        ry = max(0, miny - pad)
-                        rw = min(w, maxx + pad) - rx
-                        rh = min(h, maxy + pad) - ry
-                        if rw > 20 and rh > 20:
-                            rects.append([rx, ry, rw, rh])
-                    return rects
-
-                red_rects = detect_red_frames()
+                # Primera estrategia: detectar marcos rojos (bordes marcados en la imagen).
+                # Vectorizado con NumPy, ver regiones.detect_red_frames
+                red_rects = detect_red_frames(surf)
                 if red_rects:
-                    # Guardar los rects detectados para uso futuro
-                    try:
-                        with open(rects_path, 'w', encoding='utf-8') as f:
-                            json.dump(red_rects, f, ensure_ascii=False, indent=2)
-                    except Exception:
-                        pass
-                    del px
-                    return [pygame.Rect(*r) for r in red_rects]
-                # fallback after red frames: contar columnas/filas oscuras
-                col_counts = [0] * w
-                row_counts = [0] * h
-                for x in range(w):
-                    c = 0
-                    for y in range(h):
-                        col = px[x, y]
-                        # extraer rgb
-                        r = (col >> 16) & 0xFF
-                        g = (col >> 8) & 0xFF
-                        b = col & 0xFF
-                        if (r + g + b) < (255 * 3 * 0.9):
-                            c += 1
-                    col_counts[x] = c
-                for y in range(h):
-                    c = 0
-                    for x in range(w):
-                        col = px[x, y]
-                        r = (col >> 16) & 0xFF
-                        g = (col >> 8) & 0xFF
-                        b = col & 0xFF
-                        if (r + g + b) < (255 * 3 * 0.9):
-                            c += 1
-                    row_counts[y] = c
-                del px
-
-                # detectar runs de columnas oscuras (bordes)
-                def detect_runs(counts, length, min_density=0.05):
-                    runs = []
-                    thresh = int(length * min_density)
-                    in_run = False
-                    start = 0
-                    for i, v in enumerate(counts):
-                        if v >= thresh and not in_run:
-                            in_run = True
-                            start = i
-                        elif v < thresh and in_run:
-                            in_run = False
-                            runs.append((start, i - 1))
-                    if in_run:
-                        runs.append((start, len(counts) - 1))
-                    return runs
-
-                col_runs = detect_runs(col_counts, h, min_density=0.08)
-                row_runs = detect_runs(row_counts, w, min_density=0.02)
-
-                # si encontramos bordes verticales, construir intervalos entre ellos
-                vert_edges = []
-                for s, e in col_runs:
-                    vert_edges.append((s + e) // 2)
-                horiz_edges = []
-                for s, e in row_runs:
-                    horiz_edges.append((s + e) // 2)
-
-                # si no hay edges suficientes, fallback a grid
-                if len(vert_edges) >= 2 and len(horiz_edges) >= 2:
-                    xs = sorted(vert_edges)
-                    ys = sorted(horiz_edges)
-                    # regiones entre edges adyacentes
-                    for i in range(len(xs) - 1):
-                        for j in range(len(ys) - 1):
-                            rx = xs[i]
-                            rw = xs[i + 1] - rx
-                            ry = ys[j]
-                            rh = ys[j + 1] - ry
-                            rect = pygame.Rect(rx, ry, rw, rh)
-                            # filtrar rects muy pequeños
-                            if rect.width > 40 and rect.height > 40:
-                                regions.append(rect)
+                    regions = [pygame.Rect(*r) for r in red_rects]
                 else:
-                    # Fallback: grid 4x2
-                    cols = 4
-                    rows = 2
-                    cell_w = w // cols
-                    cell_h = h // rows
-                    for j in range(rows):
-                        for i in range(cols):
-                            rect = pygame.Rect(i * cell_w + 10, j * cell_h + 10, cell_w - 20, cell_h - 20)
-                            regions.append(rect)
+                    # fallback after red frames: contar columnas/filas oscuras y detectar
+                    # runs de columnas/filas oscuras (bordes); ver regiones.dark_projections
+                    col_counts, row_counts = dark_projections(surf)
+
+                    col_runs = detect_runs(col_counts, h, min_density=0.08)
+                    row_runs = detect_runs(row_counts, w, min_density=0.02)
+
+                    # si encontramos bordes verticales, construir intervalos entre ellos
+                    vert_edges = []
+                    for s, e in col_runs:
+                        vert_edges.append((s + e) // 2)
+                    horiz_edges = []
+                    for s, e in row_runs:
+                        horiz_edges.append((s + e) // 2)
+
+                    # si no hay edges suficientes, fallback a grid
+                    if len(vert_edges) >= 2 and len(horiz_edges) >= 2:
+                        xs = sorted(vert_edges)
+                        ys = sorted(horiz_edges)
+                        # regiones entre edges adyacentes
+                        for i in range(len(xs) - 1):
+                            for j in range(len(ys) - 1):
+                                rx = xs[i]
+                                rw = xs[i + 1] - rx
+                                ry = ys[j]
+                                rh = ys[j + 1] - ry
+                                rect = pygame.Rect(rx, ry, rw, rh)
+                                # filtrar rects muy pequeños
+                                if rect.width > 40 and rect.height > 40:
+                                    regions.append(rect)
+                    else:
+                        # Fallback: grid 4x2
+                        cols = 4
+                        rows = 2
+                        cell_w = w // cols
+                        cell_h = h // rows
+                        for j in range(rows):
+                            for i in range(cols):
+                                rect = pygame.Rect(i * cell_w + 10, j * cell_h + 10, cell_w - 20, cell_h - 20)
+                                regions.append(rect)
             except Exception:
                 # en caso de fallo, usar grid 4x2
                 cols = 4
@@ -481,13 +349,22 @@ class Juego:
                     for i in range(cols):
                         rect = pygame.Rect(i * cell_w + 10, j * cell_h + 10, cell_w - 20, cell_h - 20)
                         regions.append(rect)
+            # guardar en coordenadas de la imagen (no se reescribe nada en images/)
+            if source_path and source_surf is not None:
+                self.region_cache.put(source_path, source_surf.get_size(), rects_filename, (w, h), regions)
             return regions
 
         # helper para reescalar assets y volver a detectar regiones y mapping
         is_fullscreen = False
+        # Presentación del menú por rectángulos sucios (ver dibujo.DirtyScreen)
+        menu_screen = DirtyScreen(self.pantalla_logica)
+
         def rescale_assets(target_w, target_h):
             nonlocal portada_img, selector_img, selector_regions, selector_mapping
             nonlocal map_selector_original, map_selector_img, map_selector_regions, map_selector_mapping
+            nonlocal selector_hits
+            # si el set_mode cambió el formato del display, reconvertir lo cacheado
+            self.reconvert_surfaces()
             if portada_original:
                 portada_img = high_quality_scale(portada_original, target_w, target_h)
             else:
@@ -501,7 +378,7 @@ class Juego:
             else:
                 map_selector_img = None
             # recalcular regiones y mapping
-            selector_regions = detect_selector_regions(selector_img, 'selector_rects.json')
+            selector_regions = detect_selector_regions(selector_img, 'selector_rects.json', selector_path, selector_original)
             # reasignar nombres manteniendo orden visual. Preferir el manifest `selector_map.json`
             default_nombres = ["David", "Daniel", "Santi", "Esteban", "Osu", "Mathi", "Ivan", "Park"]
             selector_mapping = []
@@ -540,16 +417,18 @@ class Juego:
                         selector_mapping.append((new_rect, "Park"))
                 except Exception:
                     pass
-                # intentar guardar manifest
+                # intentar guardar manifest (sólo si todavía no existe: el orden de
+                # nombres no depende de la resolución, no hace falta reescribirlo)
                 try:
                     manifest_path = os.path.join(images_dir, 'selector_map.json')
-                    mapa = [name for _, name in selector_mapping]
-                    with open(manifest_path, 'w', encoding='utf-8') as f:
-                        json.dump(mapa, f, ensure_ascii=False, indent=2)
+                    if not os.path.exists(manifest_path):
+                        mapa = [name for _, name in selector_mapping]
+                        with open(manifest_path, 'w', encoding='utf-8') as f:
+                            json.dump(mapa, f, ensure_ascii=False, indent=2)
                 except Exception:
                     pass
             # recalcular regiones para selector de mapas si existe (archivo de rects separado)
-            map_selector_regions = detect_selector_regions(map_selector_img, 'map_selector_rects.json')
+            map_selector_regions = detect_selector_regions(map_selector_img, 'map_selector_rects.json', map_selector_path, map_selector_original)
             map_selector_mapping = []
             if map_selector_regions:
                 def sort_key_map(r):
@@ -562,10 +441,14 @@ class Juego:
                         map_selector_mapping.append((rect, map_names[i]))
                     else:
                         map_selector_mapping.append((rect, f"Mapa {i+1}"))
+            # la fila de hitboxes pequeñas depende del mapping: reconstruir su índice
+            selector_hits = HitIndex(selector_row_hitboxes(selector_mapping))
+            # las imágenes del menú cambiaron: el próximo frame se repinta entero
+            menu_screen.invalidate()
             return selector_img, selector_regions, selector_mapping
 
         # Inicializar regiones y mapping usando el tamaño actual de la pantalla
-        selector_regions = detect_selector_regions(selector_img, 'selector_rects.json')
+        selector_regions = detect_selector_regions(selector_img, 'selector_rects.json', selector_path, selector_original)
         # asignación inicial (orden exacto según imagen suministrada)
         # incluir 'Park' (nuevo personaje) como octavo nombre
             # default order (used if no selector_map.json present)
@@ -607,6 +490,10 @@ class Juego:
             except Exception:
                 pass
 
+        # Índice de hit-test de la fila de hitboxes pequeñas (120x200) del selector:
+        # se construye una vez por mapping, no en cada evento del ratón
+        selector_hits = HitIndex(selector_row_hitboxes(selector_mapping))
+
         # Inicializar selector de mapas (regiones/mapping). Se rellenará si existe una imagen de selector de mapas
         map_selector_img = map_selector_img if 'map_selector_img' in locals() else None
         map_selector_regions = []
@@ -617,7 +504,7 @@ class Juego:
         # tamaño fijo solicitado: 90x60 (w x h)  -> aumentado al triple del ancho original (30 -> 90)
         hit_w, hit_h = 295, 170
         if map_selector_img:
-            map_selector_regions = detect_selector_regions(map_selector_img, 'map_selector_rects.json')
+            map_selector_regions = detect_selector_regions(map_selector_img, 'map_selector_rects.json', map_selector_path, map_selector_original)
             def sort_key_map(r):
                 return (r.top // 10, r.left)
             regiones_map = sorted(map_selector_regions, key=sort_key_map)
@@ -664,6 +551,7 @@ class Juego:
                         cx += 15
                     hb = pygame.Rect(int(cx - hit_w//2), int(cy - hit_h//2), hit_w, hit_h)
                     map_hitboxes.append((hb, name))
+        map_hits = HitIndex(map_hitboxes)
         # Debug flag to print hitboxes once
         _map_rects_printed = False
 
@@ -680,12 +568,33 @@ class Juego:
         hovered_region = None
         mouse_pos = (0, 0)
         menu_stage = "portada"  # 'portada' -> 'selector' -> salir
+        # True cuando el último frame no cambió nada: en vez de sondear eventos al
+        # ritmo del FPS cap, bloquear en event.wait hasta el próximo evento o cambio
+        menu_idle = False
 
         while mostrando_menu:
-            for evento in pygame.event.get():
+            eventos = pygame.event.get()
+            if not eventos and menu_idle:
+                # Modo reposo: despertar con el siguiente evento o cuando toque el
+                # próximo cambio visual programado (parpadeo de 500ms del turno)
+                if self.asset_loader.has_pending():
+                    # hay cargas en segundo plano que instalar en cuanto terminen
+                    espera = 50
+                elif menu_stage == 'selector' and seleccion_p2 is None:
+                    espera = 500 - pygame.time.get_ticks() % 500
+                else:
+                    espera = getattr(self, 'menu_idle_ms', 1000)
+                evento = pygame.event.wait(max(1, int(espera)))
+                if evento.type != pygame.NOEVENT:
+                    eventos = [evento] + pygame.event.get()
+            for evento in eventos:
                 if evento.type == pygame.QUIT:
+                    self.shutdown()
                     pygame.quit()
                     sys.exit()
+                if evento.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                    # la ventana se volvió a mostrar: repintar todo el menú
+                    menu_screen.invalidate()
                 if evento.type == pygame.KEYDOWN:
                     if evento.key == pygame.K_RETURN:
                         # Si estamos en portada, avanzar al selector; si en selector, iniciar
@@ -694,21 +603,14 @@ class Juego:
                         else:
                             mostrando_menu = False
                     elif evento.key == pygame.K_F11:
-                        # Toggle fullscreen
-                        info = pygame.display.Info()
-                        if not is_fullscreen:
-                            # cambiar a fullscreen a resolución del monitor
-                            self.ancho, self.alto = info.current_w, info.current_h
-                            self.pantalla = pygame.display.set_mode((self.ancho, self.alto), pygame.FULLSCREEN)
-                            is_fullscreen = True
+                        # Toggle fullscreen (ver set_display_mode)
+                        is_fullscreen = not is_fullscreen
+                        if self.set_display_mode(is_fullscreen):
                             rescale_assets(self.ancho, self.alto)
                         else:
-                            # volver a ventana
-                            self.ancho, self.alto = windowed_w, windowed_h
-                            self.pantalla = pygame.display.set_mode((self.ancho, self.alto))
-                            is_fullscreen = False
-                            rescale_assets(self.ancho, self.alto)
+                            menu_screen.invalidate()
                     elif evento.key == pygame.K_ESCAPE:
+                        self.shutdown()
                         pygame.quit()
                         sys.exit()
                     elif evento.key == pygame.K_h:
@@ -733,36 +635,15 @@ class Juego:
 
                 # Manejo del mouse
                 if evento.type == pygame.MOUSEBUTTONDOWN and evento.button == 1:
-                    mx, my = evento.pos
+                    mx, my = self.pantalla_logica.to_logical(evento.pos)
                     if menu_stage == "portada":
                         # Click en la portada avanza al selector
                         menu_stage = "selector"
                     elif menu_stage == "selector":
                         # Registro de selección usando los pequeños hitboxes rojos (120x200)
-                        clicked_pair = None
                         try:
-                            # Construir la misma secuencia de hitboxes que se dibuja (fila con offset)
-                            small_w, small_h = 120, 200
-                            # Keep the order from selector_mapping (which may be forced by selector_map.json)
-                            ordenadas = list(selector_mapping)
-                            if ordenadas:
-                                # construir fila de hitboxes con spacing consistente
-                                # start layout from the minimum detected left to keep boxes near the image
-                                min_left = min(r.left for r, _ in ordenadas)
-                                current_x = min_left
-                                avg_cy = int(sum(r.centery for r, _ in ordenadas) / len(ordenadas))
-                                spacing = 38
-                                small_offset_x = 40  # desplazar las hitboxes visuales/clickables 30px a la derecha
-                                small_list = []
-                                for rect, name in ordenadas:
-                                    hb = pygame.Rect(int(current_x + small_offset_x), int(avg_cy - small_h // 2), small_w, small_h)
-                                    small_list.append((hb, name))
-                                    current_x += small_w + spacing
-                                # comprobar colisión contra los hitboxes pequeños
-                                for hb, name in small_list:
-                                    if hb.collidepoint((mx, my)):
-                                        clicked_pair = (hb, name)
-                                        break
+                            # misma fila de hitboxes que se dibuja (precalculada en selector_hits)
+                            clicked_pair = selector_hits.hit((mx, my))
                         except Exception:
                             clicked_pair = None
 
@@ -772,10 +653,12 @@ class Juego:
                             cy = hb.centery
                             if seleccion_p1 is None:
                                 seleccion_p1 = {'name': name, 'pos': (cx, cy)}
+                                prefetch_fighter(name)
                             elif seleccion_p2 is None:
                                 # evitar seleccionar el mismo personaje dos veces
                                 if seleccion_p1['name'] != name:
                                     seleccion_p2 = {'name': name, 'pos': (cx, cy)}
+                                    prefetch_fighter(name)
                         else:
                             # Click fuera de regiones: comprobar si se pulsó el botón Iniciar
                             # Botón 'Iniciar' estará en la parte inferior central
@@ -792,11 +675,7 @@ class Juego:
                                         mostrando_menu = False
                     elif menu_stage == 'map_selector':
                         # seleccionar mapa por hitboxes (solo uno)
-                        clicked_pair = None
-                        for hb, name in map_hitboxes:
-                            if hb.collidepoint((mx, my)):
-                                clicked_pair = (hb, name)
-                                break
+                        clicked_pair = map_hits.hit((mx, my))
                         if clicked_pair:
                             hb, name = clicked_pair
                             cx = hb.centerx
@@ -804,6 +683,7 @@ class Juego:
                             # seleccionar sólo uno (reemplaza selección anterior)
                             selected_map = {'name': name, 'pos': (cx, cy)}
                             selected_map_name = name
+                            prefetch_map(name)
                         else:
                             # Click fuera de hitboxes: comprobar si se pulsó el botón Iniciar
                             btn_w, btn_h = 220, 56
@@ -814,94 +694,106 @@ class Juego:
                                     mostrando_menu = False
 
                 if evento.type == pygame.MOUSEMOTION:
-                    mouse_pos = evento.pos
+                    mouse_pos = self.pantalla_logica.to_logical(evento.pos)
                     # actualizar hovered_region según la etapa actual
                     hovered_region = None
                     mx, my = mouse_pos
                     if menu_stage == 'selector':
                         try:
-                            # Hover based on the same small hitboxes used for selection (centered on rect.centerx)
-                            small_w, small_h = 120, 200
-                            # Keep the order from selector_mapping for hover detection
-                            ordenadas = list(selector_mapping)
-                            if ordenadas:
-                                # construir fila de hitboxes con spacing consistente para hover
-                                min_left = min(r.left for r, _ in ordenadas)
-                                current_x = min_left
-                                avg_cy = int(sum(r.centery for r, _ in ordenadas) / len(ordenadas))
-                                spacing = 38
-                                small_offset_x = 40
-                                for rect, name in ordenadas:
-                                    hb = pygame.Rect(int(current_x + small_offset_x), int(avg_cy - small_h // 2), small_w, small_h)
-                                    if hb.collidepoint((mx, my)):
-                                        hovered_region = (hb, name)
-                                        break
-                                    current_x += small_w + spacing
+                            # Hover based on the same small hitboxes used for selection
+                            hovered_region = selector_hits.hit((mx, my))
                         except Exception:
                             hovered_region = None
+                        # empezar a cargar en segundo plano el personaje bajo el cursor
+                        if hovered_region:
+                            prefetch_fighter(hovered_region[1])
                     elif menu_stage == 'map_selector':
-                        for hb, name in map_hitboxes:
-                            if hb.collidepoint((mx, my)):
-                                hovered_region = (hb, name)
-                                break
+                        hovered_region = map_hits.hit((mx, my))
+                        # preparar en segundo plano el fondo del mapa bajo el cursor
+                        if hovered_region:
+                            prefetch_map(hovered_region[1])
                     # No seleccionar automáticamente por hover; hovered_region ya se actualizó arriba
                 # (La detección de maximizar se realiza más abajo comparando el tamaño de la ventana con la resolución del monitor.)
 
-            # Dibujar menú (ventana fija)
-            if menu_stage == "portada":
+            # Instalar (en el hilo principal) lo que el cargador en segundo plano ya terminó
+            try:
+                self.asset_loader.drain()
+            except Exception:
+                pass
+
+            # Dibujar menú (ventana fija) con rectángulos sucios: el fondo de cada
+            # etapa se pinta una vez y sólo se repintan/publican los elementos que
+            # cambian (texto de turno, marcadores, botón, hover). La firma recoge
+            # todo lo que afecta a esos elementos; si no cambió no se dibuja nada.
+            show_turno = ((pygame.time.get_ticks() // 500) % 2) == 0
+            if menu_stage == "selector":
+                firma = (show_turno if seleccion_p2 is None else None, seleccion_p1, seleccion_p2,
+                         getattr(self, 'mostrar_hitbox', False))
+            elif menu_stage == 'map_selector':
+                mostrar_map_hb = getattr(self, 'mostrar_map_hitbox', False)
+                firma = (selected_map, mostrar_map_hb, hovered_region if mostrar_map_hb else None)
+            else:
+                firma = None
+            menu_dirty = menu_screen.begin(self.pantalla, (menu_stage, self.pantalla.get_size()), firma)
+            if not menu_dirty:
+                pass
+            elif menu_stage == "portada":
                 if portada_img:
                     # Mostrar la portada centrada/escala con la máxima calidad posible
                     self.pantalla.blit(portada_img, (0, 0))
                 else:
                     self.pantalla.fill((10, 10, 40))
-                    title = font_title.render("CPF Kombat", True, (255, 220, 0))
+                    title = texto(font_title, "CPF Kombat", (255, 220, 0))
                     self.pantalla.blit(title, ((self.ancho - title.get_width()) // 2, 120))
                 # No mostrar texto encima de la portada según tu instrucción
+                menu_screen.capture()
 
             elif menu_stage == "selector":
-                # Mostrar la imagen del selector (si existe) y permitir seleccionar dos posiciones
-                if selector_img:
-                    self.pantalla.blit(selector_img, (0, 0))
-                else:
-                    self.pantalla.fill((30, 30, 30))
-                    info_text = font_sub.render("No hay imagen de selector en images/", True, (255, 255, 255))
-                    self.pantalla.blit(info_text, info_text.get_rect(center=(self.ancho//2, self.alto//2)))
+                marcar = menu_screen.mark
+                if menu_screen.full:
+                    # Mostrar la imagen del selector (si existe) y permitir seleccionar dos posiciones
+                    if selector_img:
+                        self.pantalla.blit(selector_img, (0, 0))
+                    else:
+                        self.pantalla.fill((30, 30, 30))
+                        info_text = texto(font_sub, "No hay imagen de selector en images/", (255, 255, 255))
+                        self.pantalla.blit(info_text, info_text.get_rect(center=(self.ancho//2, self.alto//2)))
+                    menu_screen.capture()
 
                 # No dibujar outline de regiones
 
                 # Mostrar texto de turno de selección (Jugador 1/Jugador 2)
                 # Parpadeo: mostrar texto solo si el tiempo es par (cada ~500ms)
-                show_turno = ((pygame.time.get_ticks() // 500) % 2) == 0
                 if seleccion_p1 is None:
                     turno_txt = "Jugador 1: selecciona tu personaje"
                     if show_turno:
-                        turno_surf = font_sub.render(turno_txt, True, (255, 255, 255))
+                        turno_surf = texto(font_sub, turno_txt, (255, 255, 255))
                         sx = (self.pantalla.get_width() - turno_surf.get_width()) // 2
                         sy = 30
-                        self.pantalla.blit(turno_surf, (sx, sy))
+                        marcar(self.pantalla.blit(turno_surf, (sx, sy)))
                 elif seleccion_p2 is None:
                     turno_txt = "Jugador 2: selecciona tu personaje"
                     if show_turno:
-                        turno_surf = font_sub.render(turno_txt, True, (255, 255, 255))
+                        turno_surf = texto(font_sub, turno_txt, (255, 255, 255))
                         sx = (self.pantalla.get_width() - turno_surf.get_width()) // 2
                         sy = 30
-                        self.pantalla.blit(turno_surf, (sx, sy))
+                        marcar(self.pantalla.blit(turno_surf, (sx, sy)))
                 else:
                     turno_txt = "Personajes seleccionados"
-                    turno_surf = font_sub.render(turno_txt, True, (255, 255, 255))
+                    turno_surf = texto(font_sub, turno_txt, (255, 255, 255))
                     sx = (self.pantalla.get_width() - turno_surf.get_width()) // 2
                     sy = 30
-                    self.pantalla.blit(turno_surf, (sx, sy))
+                    marcar(self.pantalla.blit(turno_surf, (sx, sy)))
 
                 # Mostrar marcadores para selecciones si existen (con nombre)
                 if seleccion_p1:
-                    pygame.draw.circle(self.pantalla, (0, 200, 0), seleccion_p1['pos'], 20, 4)
-                    l = font_sub.render(seleccion_p1['name'], True, (200, 255, 200))
-                    self.pantalla.blit(l, (seleccion_p1['pos'][0] - l.get_width()//2, seleccion_p1['pos'][1] + 24))
+                    marcar(pygame.draw.circle(self.pantalla, (0, 200, 0), seleccion_p1['pos'], 20, 4))
+                    l = texto(font_sub, seleccion_p1['name'], (200, 255, 200))
+                    marcar(self.pantalla.blit(l, (seleccion_p1['pos'][0] - l.get_width()//2, seleccion_p1['pos'][1] + 24)))
                 if seleccion_p2:
-                    pygame.draw.circle(self.pantalla, (200, 0, 0), seleccion_p2['pos'], 20, 4)
-                    l2 = font_sub.render(seleccion_p2['name'], True, (255, 200, 200))
-                    self.pantalla.blit(l2, (seleccion_p2['pos'][0] - l2.get_width()//2, seleccion_p2['pos'][1] + 24))
+                    marcar(pygame.draw.circle(self.pantalla, (200, 0, 0), seleccion_p2['pos'], 20, 4))
+                    l2 = texto(font_sub, seleccion_p2['name'], (255, 200, 200))
+                    marcar(self.pantalla.blit(l2, (seleccion_p2['pos'][0] - l2.get_width()//2, seleccion_p2['pos'][1] + 24)))
 
                 # Botón Iniciar en la parte inferior
                 btn_w, btn_h = 220, 56
@@ -909,27 +801,18 @@ class Juego:
                 btn_y = self.alto - 120
                 btn_rect = pygame.Rect(btn_x, btn_y, btn_w, btn_h)
                 ok = (seleccion_p1 is not None and seleccion_p2 is not None)
-                pygame.draw.rect(self.pantalla, (30, 120, 30) if ok else (80, 80, 80), btn_rect, 0, border_radius=8)
+                marcar(pygame.draw.rect(self.pantalla, (30, 120, 30) if ok else (80, 80, 80), btn_rect, 0, border_radius=8))
                 pygame.draw.rect(self.pantalla, (0,0,0), btn_rect, 2, border_radius=8)
-                btn_text = font_sub.render("Iniciar pelea" if ok else "Selecciona personajes", True, (255,255,255))
-                self.pantalla.blit(btn_text, (btn_x + (btn_w - btn_text.get_width())//2, btn_y + (btn_h - btn_text.get_height())//2))
+                btn_text = texto(font_sub, "Iniciar pelea" if ok else "Selecciona personajes", (255,255,255))
+                marcar(self.pantalla.blit(btn_text, (btn_x + (btn_w - btn_text.get_width())//2, btn_y + (btn_h - btn_text.get_height())//2)))
 
                 # Dibujar hitboxes pequeñas del selector si están activadas (toggle con H)
                 # Se dibujan cajas pequeñas colocadas en fila horizontal con 10px de separación
                 if getattr(self, 'mostrar_hitbox', False):
                     try:
-                        # ajustar tamaño de las hitboxes visuales a 120x200 px según petición
+                        # hitboxes visuales de 120x200 px, las mismas del hit-test (orden de selector_mapping)
                         small_w, small_h = 120, 200
-                        # Use the mapping order (which prefers selector_map.json) to label and place boxes
-                        ordenadas = list(selector_mapping)
-                        if ordenadas:
-                            # punto de inicio: la mínima izquierda entre rects
-                            min_left = min(r.left for r, _ in ordenadas)
-                            current_x = min_left
-                            # calcular una Y común (media de los centros) para alinear todas las cajas en la misma línea
-                            avg_cy = int(sum(r.centery for r, _ in ordenadas) / len(ordenadas))
-                            spacing = 38
-                            small_offset_x = 40
+                        if len(selector_hits):
                             # reuse a single semi-transparent surface for all small hitboxes
                             if not getattr(self, 'selector_hitbox_surf', None):
                                 try:
@@ -938,39 +821,43 @@ class Juego:
                                     self.selector_hitbox_surf = s_surf
                                 except Exception:
                                     self.selector_hitbox_surf = None
-                            for idx, (rect, name) in enumerate(ordenadas):
-                                # crear cada caja en fila, empezando en current_x y desplazada small_offset_x
-                                hb = pygame.Rect(int(current_x + small_offset_x), int(avg_cy - small_h // 2), small_w, small_h)
+                            for idx, (hb, name) in enumerate(selector_hits):
                                 # relleno semi-transparente para visualizar el área pequeña (reutilizar superficie)
                                 if getattr(self, 'selector_hitbox_surf', None):
                                     try:
-                                        self.pantalla.blit(self.selector_hitbox_surf, (hb.left, hb.top))
+                                        marcar(self.pantalla.blit(self.selector_hitbox_surf, (hb.left, hb.top)))
                                     except Exception:
                                         pass
                                 else:
                                     try:
                                         surf = pygame.Surface((hb.width, hb.height), pygame.SRCALPHA)
                                         surf.fill((255, 0, 0, 40))
-                                        self.pantalla.blit(surf, (hb.left, hb.top))
+                                        marcar(self.pantalla.blit(surf, (hb.left, hb.top)))
                                     except Exception:
                                         pass
                                 # contorno del hitbox pequeño
-                                pygame.draw.rect(self.pantalla, (255, 0, 0), hb, 2)
+                                marcar(pygame.draw.rect(self.pantalla, (255, 0, 0), hb, 2))
                                 # etiqueta con índice y nombre encima de la caja pequeña
                                 try:
-                                    lbl = font_sub.render(f"{idx+1}: {name}", True, (255,255,255))
-                                    self.pantalla.blit(lbl, (hb.left + 4, hb.top - lbl.get_height() - 2))
+                                    lbl = texto(font_sub, f"{idx+1}: {name}", (255,255,255))
+                                    marcar(self.pantalla.blit(lbl, (hb.left + 4, hb.top - lbl.get_height() - 2)))
                                 except Exception:
                                     pass
-                                # avanzar X para la siguiente caja dejando spacing px de separación
-                                current_x += small_w + spacing
                     except Exception:
                         pass
 
             elif menu_stage == 'map_selector':
-                # Mostrar la imagen del selector de mapas y permitir seleccionar un mapa (solo uno)
+                marcar = menu_screen.mark
+                if menu_screen.full:
+                    # Mostrar la imagen del selector de mapas y permitir seleccionar un mapa (solo uno)
+                    if map_selector_img:
+                        self.pantalla.blit(map_selector_img, (0, 0))
+                    else:
+                        self.pantalla.fill((30, 30, 30))
+                        info_text = texto(font_sub, "No hay imagen de selector de mapas (images/maps/)", (255, 255, 255))
+                        self.pantalla.blit(info_text, info_text.get_rect(center=(self.ancho//2, self.alto//2)))
+                    menu_screen.capture()
                 if map_selector_img:
-                    self.pantalla.blit(map_selector_img, (0, 0))
                     # Dibujar hitboxes fijas (30x60) y etiquetas ONLY if mostrar_map_hitbox is True
                     try:
                         if getattr(self, 'mostrar_map_hitbox', False):
@@ -980,29 +867,25 @@ class Juego:
                                     col = (0, 200, 0)
                                 else:
                                     col = (255, 160, 40)
-                                pygame.draw.rect(self.pantalla, col, hb, 2)
-                                lbl = font_sub.render(f"{idx+1}: {name}", True, (255,255,255))
+                                marcar(pygame.draw.rect(self.pantalla, col, hb, 2))
+                                lbl = texto(font_sub, f"{idx+1}: {name}", (255,255,255))
                                 # colocar etiqueta encima del hitbox
-                                self.pantalla.blit(lbl, (hb.left + 4, hb.top - lbl.get_height() - 2))
+                                marcar(self.pantalla.blit(lbl, (hb.left + 4, hb.top - lbl.get_height() - 2)))
                     except Exception:
                         pass
-                else:
-                    self.pantalla.fill((30, 30, 30))
-                    info_text = font_sub.render("No hay imagen de selector de mapas (images/maps/)", True, (255, 255, 255))
-                    self.pantalla.blit(info_text, info_text.get_rect(center=(self.ancho//2, self.alto//2)))
 
                 # Texto instructivo
                 turno_txt = "Selecciona un mapa"
-                turno_surf = font_sub.render(turno_txt, True, (255, 255, 255))
+                turno_surf = texto(font_sub, turno_txt, (255, 255, 255))
                 sx = (self.pantalla.get_width() - turno_surf.get_width()) // 2
                 sy = 30
-                self.pantalla.blit(turno_surf, (sx, sy))
+                marcar(self.pantalla.blit(turno_surf, (sx, sy)))
 
                 # Mostrar marcador del mapa seleccionado (si existe)
                 if selected_map:
-                    pygame.draw.circle(self.pantalla, (255, 200, 0), selected_map['pos'], 24, 4)
-                    l = font_sub.render(selected_map['name'], True, (255, 220, 180))
-                    self.pantalla.blit(l, (selected_map['pos'][0] - l.get_width()//2, selected_map['pos'][1] + 28))
+                    marcar(pygame.draw.circle(self.pantalla, (255, 200, 0), selected_map['pos'], 24, 4))
+                    l = texto(font_sub, selected_map['name'], (255, 220, 180))
+                    marcar(self.pantalla.blit(l, (selected_map['pos'][0] - l.get_width()//2, selected_map['pos'][1] + 28)))
 
                 # Print hitboxes una sola vez para debugging en consola
                 if not _map_rects_printed:
@@ -1018,7 +901,7 @@ class Juego:
                 # Only show hover outline if map hitboxes are visible
                 if getattr(self, 'mostrar_map_hitbox', False) and hovered_region:
                     rect, name = hovered_region
-                    pygame.draw.rect(self.pantalla, (255,255,255), rect, 3)
+                    marcar(pygame.draw.rect(self.pantalla, (255,255,255), rect, 3))
 
                 # Botón Iniciar en la parte inferior: activo cuando hay selección
                 btn_w, btn_h = 220, 56
@@ -1026,12 +909,15 @@ class Juego:
                 btn_y = self.alto - 120
                 btn_rect = pygame.Rect(btn_x, btn_y, btn_w, btn_h)
                 ok = (selected_map is not None)
-                pygame.draw.rect(self.pantalla, (30, 120, 30) if ok else (80, 80, 80), btn_rect, 0, border_radius=8)
+                marcar(pygame.draw.rect(self.pantalla, (30, 120, 30) if ok else (80, 80, 80), btn_rect, 0, border_radius=8))
                 pygame.draw.rect(self.pantalla, (0,0,0), btn_rect, 2, border_radius=8)
-                btn_text = font_sub.render("Iniciar pelea" if ok else "Selecciona un mapa", True, (255,255,255))
-                self.pantalla.blit(btn_text, (btn_x + (btn_w - btn_text.get_width())//2, btn_y + (btn_h - btn_text.get_height())//2))
+                btn_text = texto(font_sub, "Iniciar pelea" if ok else "Selecciona un mapa", (255,255,255))
+                marcar(self.pantalla.blit(btn_text, (btn_x + (btn_w - btn_text.get_width())//2, btn_y + (btn_h - btn_text.get_height())//2)))
 
-            pygame.display.flip()
+            if menu_dirty:
+                menu_screen.present()
+            # sin cambios en este frame: el siguiente espera eventos en lugar de sondear
+            menu_idle = not menu_dirty
             # respect runtime FPS cap toggle: when enabled, throttle to self.fps_cap;
             # when disabled, let tick() run uncapped (no arg). Fallback to self.fps.
             try:
@@ -1111,70 +997,41 @@ class Juego:
         logo_w, logo_h = 900, 300  # tamaño mucho más grande
         logo_x = (self.ancho - logo_w) // 2 + 25  # desplazado 25 px a la derecha
         logo_y = (self.alto - logo_h) // 2
-        if os.path.exists(fight_logo_path):
-            fight_logo = pygame.image.load(fight_logo_path).convert_alpha()
-            fight_logo_scaled = pygame.transform.smoothscale(fight_logo, (logo_w, logo_h))
+        if self.asset_index.exists(fight_logo_path):
+            fight_logo_scaled = self.assets.get(('logo', fight_logo_path, (logo_w, logo_h)),
+                                                lambda: finalize_surface(pygame.transform.smoothscale(self.assets.image(fight_logo_path), (logo_w, logo_h)), alpha=True))
         pelea_start_time = pygame.time.get_ticks()
         # Duración en pantalla para el logo de Fight y para las imágenes de round (ms)
         fight_logo_duration = 1500
         # Pequeña pausa extra entre el round-logo y la aparición de Fight.png (ms)
         fight_logo_delay_after_round = 100
 
+        def scale_logo(path):
+            surf = self.assets.image(path)
+            try:
+                scaled = pygame.transform.smoothscale(surf, (logo_w, logo_h))
+            except Exception:
+                scaled = pygame.transform.scale(surf, (logo_w, logo_h))
+            return finalize_surface(scaled, alpha=True)
+
         # Cargar imágenes de Round1, Round2 y FinalRound desde images/logos/ si existen
         def load_logo_variant(base_name):
-            logos_dir = os.path.join('images', 'logos')
-            exts = ['.png', '.jpg', '.jpeg', '.bmp', '.gif', '.webp']
-            if not os.path.isdir(logos_dir):
-                return None
             # Buscar fichero que empiece con base_name (case-insensitive)
-            for fname in os.listdir(logos_dir):
-                low = fname.lower()
-                if low.startswith(base_name.lower()) and any(low.endswith(ext) for ext in exts):
-                    try:
-                        surf = pygame.image.load(os.path.join(logos_dir, fname)).convert_alpha()
-                        try:
-                            return pygame.transform.smoothscale(surf, (logo_w, logo_h))
-                        except Exception:
-                            return pygame.transform.scale(surf, (logo_w, logo_h))
-                    except Exception:
-                        return None
-            return None
+            path = self.asset_index.resolve(f'logo:{base_name}')
+            if not path:
+                return None
+            return self.assets.get(('logo', path, (logo_w, logo_h)), lambda: scale_logo(path))
 
         round1_logo_scaled = load_logo_variant('Round1')
         round2_logo_scaled = load_logo_variant('Round2')
         finalround_logo_scaled = load_logo_variant('FinalRound')
         # Helper to load a winner logo: flexible matching for filenames like 'DavidWins.png' or containing 'win'
         def load_winner_logo(name):
-            logos_dir = os.path.join('images', 'logos')
-            exts = ['.png', '.jpg', '.jpeg', '.bmp', '.gif', '.webp']
-            if not os.path.isdir(logos_dir):
+            # Prefer files that start with '<name>win'; fallback: any file containing the name and 'win'
+            path = self.asset_index.resolve(f'winner:{name or ""}')
+            if not path:
                 return None
-            lname = name.lower() if name else ''
-            # Prefer files that start with '<name>win' or '<name>wins'
-            for fname in os.listdir(logos_dir):
-                low = fname.lower()
-                if (low.startswith(lname) and ('win' in low)) and any(low.endswith(ext) for ext in exts):
-                    try:
-                        surf = pygame.image.load(os.path.join(logos_dir, fname)).convert_alpha()
-                        try:
-                            return pygame.transform.smoothscale(surf, (logo_w, logo_h))
-                        except Exception:
-                            return pygame.transform.scale(surf, (logo_w, logo_h))
-                    except Exception:
-                        return None
-            # Fallback: any file that contains the name and 'win'
-            for fname in os.listdir(logos_dir):
-                low = fname.lower()
-                if lname in low and 'win' in low and any(low.endswith(ext) for ext in exts):
-                    try:
-                        surf = pygame.image.load(os.path.join(logos_dir, fname)).convert_alpha()
-                        try:
-                            return pygame.transform.smoothscale(surf, (logo_w, logo_h))
-                        except Exception:
-                            return pygame.transform.scale(surf, (logo_w, logo_h))
-                    except Exception:
-                        return None
-            return None
+            return self.assets.get(('logo', path, (logo_w, logo_h)), lambda: scale_logo(path))
         # Helper: mostrar primero el logo de Round (según número/estado) y luego el logo Fight
         # NOTE: this function now PRESERVES the already-drawn scene (does not clear or redraw background).
         def show_pre_round_sequence(rnum):
@@ -1192,413 +1049,72 @@ class Juego:
                         use_surf = round2_logo_scaled
 
                 # No redibujar el fondo ni los luchadores: asumimos la escena ya está dibujada debajo.
+                drawn = None
                 if use_surf:
-                    self.pantalla.blit(use_surf, (logo_x, logo_y))
-                    pygame.display.flip()
+                    drawn = self.pantalla.blit(use_surf, (logo_x, logo_y))
+                    self.pantalla_logica.flip()
                 # esperar la misma duración que Fight.png
                 pygame.time.wait(fight_logo_duration)
 
                 # Después de mostrar el round-logo, marcar el tiempo de inicio de la pelea
                 # para que el bucle principal muestre Fight.png tras una pequeña pausa.
                 pelea_start_time = pygame.time.get_ticks() + fight_logo_delay_after_round
+                return drawn
             except Exception:
                 # en caso de fallo, simplemente esperar la duración total
                 pygame.time.wait(fight_logo_duration * 2)
     
-        # Cargar fondo del mapa seleccionado (si existe)
+        # Cargar fondo del mapa seleccionado (si existe). Normalmente ya quedó
+        # preparado en segundo plano desde el selector de mapas (ver recursos.MapBackgroundCache).
         fight_bg = None
         if hasattr(self, 'selected_map') and self.selected_map:
-            maps_dir = os.path.join('images', 'maps')
-            name = self.selected_map
-            # posibles extensiones
-            exts = ['.jpg', '.jpeg', '.png', '.bmp']
-            found = None
-            # Especial: buscar en la carpeta top-level 'mapas' primero (case-insensitive, varias extensiones)
             try:
-                mapas_dir = 'mapas'
-                if os.path.isdir(mapas_dir):
-                    for fname in os.listdir(mapas_dir):
-                        low = fname.lower()
-                        if low.startswith(name.lower()) and any(low.endswith(e) for e in exts):
-                            found = os.path.join(mapas_dir, fname)
-                            break
+                fight_bg = self.map_backgrounds.get(self.selected_map, (self.ancho, self.alto))
             except Exception:
-                pass
-            # buscar en images/maps/<name>.* (case-insensitive)
-            if os.path.isdir(maps_dir):
-                for ext in exts:
-                    candidate = os.path.join(maps_dir, f"{name}{ext}")
-                    if os.path.exists(candidate):
-                        found = candidate
-                        break
-                # intentar versiones con mayúsculas/minúsculas si no se encontró
-                if not found:
-                    for fname in os.listdir(maps_dir):
-                        if fname.lower().startswith(name.lower()):
-                            if any(fname.lower().endswith(e) for e in exts):
-                                found = os.path.join(maps_dir, fname)
-                                break
-            # fallback: buscar en images/
-            if not found:
-                for ext in exts:
-                    candidate = os.path.join('images', f"{name}{ext}")
-                    if os.path.exists(candidate):
-                        found = candidate
-                        break
-            if found:
-                try:
-                    bg_orig = pygame.image.load(found).convert()
-                    # Si el mapa seleccionado es Citec, estiramos a toda la pantalla (llenar sin preservar aspect ratio)
-                    if name.lower() == 'citec':
-                        try:
-                            fight_bg = pygame.transform.smoothscale(bg_orig, (self.ancho, self.alto))
-                        except Exception:
-                            fight_bg = pygame.transform.scale(bg_orig, (self.ancho, self.alto))
-                    else:
-                        fight_bg = high_quality_scale(bg_orig, self.ancho, self.alto)
-                except Exception:
-                    fight_bg = None
+                fight_bg = None
         # Preparar conteo de rounds: mejor de 3 (primero a 2 wins)
         # Cargar sprites genéricos (si existen) para usar en lugar de dibujar stickmen
-        try:
-            # Build a mapping: char_sprites[state] = {'derecha': frames, 'izquierda': frames, 'any': frames}
-            self.char_sprites = {}
-            # Define patterns for states to match filenames
-            state_patterns = {
-                'idle': ['idle', 'stand'],
-                # include a broad 'camin' substring to catch typos like 'caminataz'
-                'caminar': ['camin', 'camina', 'caminar', 'caminata', 'walk'],
-                'pegar': ['puñet', 'pegar', 'punch', 'hit'],
-                'patear': ['pate', 'patear', 'patad', 'patada', 'kick'],
-                'agacharse': ['agach', 'agacharse', 'crouch'],
-                'saltar': ['salt', 'saltar', 'jump']
-            }
-            # Try to import PIL for GIF frame extraction; fall back if not available
-            try:
-                from PIL import Image, ImageSequence
-                pil_available = True
-            except Exception:
-                pil_available = False
-
-            # Initialize empty dicts and a record of filenames assigned
-            loaded_files = {}
-            for st in state_patterns.keys():
-                self.char_sprites[st] = {'derecha': [], 'izquierda': [], 'any': []}
-                loaded_files[st] = {'derecha': [], 'izquierda': [], 'any': []}
-
-            if os.path.isdir('sprites'):
-                for fname in os.listdir('sprites'):
-                    low = fname.lower()
-                    fpath = os.path.join('sprites', fname)
-                    # detect direction tag in filename (robust to common typos)
-                    dir_key = None
-                    if ('derecha' in low or 'derech' in low or '_r' in low or 'right' in low):
-                        dir_key = 'derecha'
-                    elif ('izquierda' in low or 'iquierda' in low or 'izq' in low or '_l' in low or 'left' in low):
-                        dir_key = 'izquierda'
-                    else:
-                        # fallback: if filename contains hints of left/right despite not matching exactly
-                        if any(k in low for k in ('iquierda','izquierda','izq','left')):
-                            dir_key = 'izquierda'
-                        elif any(k in low for k in ('derech','derecha','right','_r')):
-                            dir_key = 'derecha'
-                        else:
-                            dir_key = 'any'
-
-                    # find state by pattern
-                    matched_state = None
-                    for st, patterns in state_patterns.items():
-                        for p in patterns:
-                            if p in low:
-                                matched_state = st
-                                break
-                        if matched_state:
-                            break
-
-                    if not matched_state:
-                        # unknown file, skip
-                        continue
-
-                    frames = []
-                    ext = os.path.splitext(fpath)[1].lower()
-                    if ext == '.gif' and pil_available:
-                        try:
-                            img = Image.open(fpath)
-                            for frame in ImageSequence.Iterator(img):
-                                try:
-                                    f = frame.convert('RGBA')
-                                    w, h = f.size
-                                    data = f.tobytes()
-                                    surf = pygame.image.fromstring(data, (w, h), 'RGBA').convert_alpha()
-                                    frames.append(surf)
-                                except Exception:
-                                    continue
-                        except Exception:
-                            frames = []
-                    else:
-                        try:
-                            surf = pygame.image.load(fpath).convert_alpha()
-                            frames = [surf]
-                        except Exception:
-                            frames = []
-
-                    if frames:
-                        self.char_sprites[matched_state][dir_key].extend(frames)
-                        loaded_files[matched_state][dir_key].append(fname)
-
-            # If no direction-specific frames, but 'any' exists, keep as-is. We'll fallback to flipping when needed.
-            # Build scaled+flipped cache for common target heights to avoid per-frame scaling
+        # (una sola vez por sesión: en las revanchas self.char_sprites* ya están cargados
+        # y no se reescribe logs/sprites_debug.txt)
+        # Define patterns for states to match filenames
+        state_patterns = STATE_PATTERNS
+        if not self.assets.has('global_sprites'):
             try:
-                self.char_sprites_cache = {}
+                # Build a mapping: char_sprites[state] = {'derecha': frames, 'izquierda': frames, 'any': frames}
+                self.char_sprites = {}
+                # Target heights pre-escaladas (las mismas que usa draw_stickman)
                 target_heights = [360, 220]
-                for st in state_patterns.keys():
-                    self.char_sprites_cache[st] = {'derecha': {}, 'izquierda': {}, 'any': {}}
-                    for dk in ('derecha','izquierda','any'):
-                        frames = self.char_sprites[st].get(dk, [])
-                        for h_t in target_heights:
-                            scaled_list = []
-                            for f in frames:
-                                try:
-                                    fh = f.get_height()
-                                    fw = f.get_width()
-                                    if fh > 0:
-                                        scale = h_t / float(fh)
-                                        s2 = pygame.transform.smoothscale(f, (int(fw * scale), int(fh * scale)))
-                                    else:
-                                        s2 = f
-                                except Exception:
-                                    s2 = f
-                                scaled_list.append(s2)
-                            self.char_sprites_cache[st][dk][h_t] = scaled_list
+                sprite_cache = getattr(self, 'sprite_cache', None)
 
-                # Precompute masks and bounding rects for cached scaled frames to
-                # avoid creating masks every frame (expensive). Store parallel
-                # structures: char_sprites_masks_cache and char_sprites_bounds_cache.
-                try:
-                    self.char_sprites_masks_cache = {}
-                    self.char_sprites_bounds_cache = {}
-                    for stt in list(self.char_sprites_cache.keys()):
-                        self.char_sprites_masks_cache[stt] = {'derecha': {}, 'izquierda': {}, 'any': {}}
-                        self.char_sprites_bounds_cache[stt] = {'derecha': {}, 'izquierda': {}, 'any': {}}
-                        for dk in ('derecha','izquierda','any'):
-                            for h_t, frames_list in (self.char_sprites_cache.get(stt, {}).get(dk, {}) or {}).items():
-                                masks = []
-                                rects = []
-                                for surf in frames_list:
-                                    try:
-                                        m = pygame.mask.from_surface(surf)
-                                        masks.append(m)
-                                        try:
-                                            br = m.get_bounding_rect()
-                                        except Exception:
-                                            # older pygame may have get_bounding_rects
-                                            try:
-                                                brs = m.get_bounding_rects()
-                                                if brs:
-                                                    btemp = brs[0].copy()
-                                                    for r in brs[1:]:
-                                                        btemp.union_ip(r)
-                                                    br = btemp
-                                                else:
-                                                    br = surf.get_rect()
-                                            except Exception:
-                                                br = surf.get_rect()
-                                    except Exception:
-                                        masks.append(None)
-                                        br = surf.get_rect()
-                                    try:
-                                        rects.append(pygame.Rect(int(br.left), int(br.top), int(br.width), int(br.height)))
-                                    except Exception:
-                                        rects.append(surf.get_rect())
-                                self.char_sprites_masks_cache[stt][dk][h_t] = masks
-                                self.char_sprites_bounds_cache[stt][dk][h_t] = rects
-                except Exception:
-                    # if mask precompute fails, leave caches absent and fall back to runtime masks
-                    if hasattr(self, 'char_sprites_masks_cache'):
-                        try:
-                            del self.char_sprites_masks_cache
-                        except Exception:
-                            pass
-                    if hasattr(self, 'char_sprites_bounds_cache'):
-                        try:
-                            del self.char_sprites_bounds_cache
-                        except Exception:
-                            pass
-
-                    # Fill missing direction caches from 'any' only.
-                    # IMPORTANT: do NOT auto-generate flipped frames from the opposite
-                    # direction. This preserves directional intent: when 'izquierda' is
-                    # requested we will only use true left-facing frames (or 'any').
-                    for h_t in target_heights:
-                        any_list = self.char_sprites_cache[st]['any'].get(h_t, [])
-                        right_list = self.char_sprites_cache[st]['derecha'].get(h_t, [])
-                        left_list = self.char_sprites_cache[st]['izquierda'].get(h_t, [])
-                        # if derecha missing but any exists -> use any (no flipping)
-                        if not right_list and any_list:
-                            self.char_sprites_cache[st]['derecha'][h_t] = list(any_list)
-                        # if izquierda missing but any exists -> use any (no flipping)
-                        if not left_list and any_list:
-                            self.char_sprites_cache[st]['izquierda'][h_t] = list(any_list)
-                        # Do NOT populate missing direction from the opposite side by flipping.
-                        # This ensures left-key uses left sprites only.
-
-                # Detailed debug: list global sprites, per-character sprites (Sprites/), and cache summary
-                try:
-                    lines = []
-                    print("DEBUG: sprite mapping (global 'sprites' folder):")
-                    lines.append("DEBUG: sprite mapping (global 'sprites' folder):")
-                    for st in state_patterns.keys():
-                        for dk in ('derecha','izquierda','any'):
-                            files = loaded_files.get(st, {}).get(dk, [])
-                            if files:
-                                msg = f"  {st:<12} {dk:<9}: {files}"
-                                print(msg)
-                                lines.append(msg)
-
-                    # Also list sprites found per-character under 'Sprites/'
-                    sprites_root = 'Sprites'
-                    if os.path.isdir(sprites_root):
-                        print("DEBUG: sprites por personaje (carpeta 'Sprites'):")
-                        lines.append("DEBUG: sprites por personaje (carpeta 'Sprites'):")
-                        sprites_by_char = {}
-                        for sub in sorted(os.listdir(sprites_root)):
-                            subp = os.path.join(sprites_root, sub)
-                            if not os.path.isdir(subp):
-                                continue
-                            # infer character name by stripping 'sprites' prefix if present
-                            pname = sub
-                            low = pname.lower()
-                            if low.startswith('sprites'):
-                                pname = pname[len('sprites'):].strip('_- ') or sub
-                            pname = pname.strip('_- ')
-                            pname = pname.capitalize() if pname else sub
-                            sprites_by_char[pname] = {}
-                            for fname in sorted(os.listdir(subp)):
-                                lowf = fname.lower()
-                                # detect state
-                                matched_state = None
-                                for st, patterns in state_patterns.items():
-                                    if any(p in lowf for p in patterns):
-                                        matched_state = st
-                                        break
-                                dir_key = 'any'
-                                if ('derecha' in lowf or 'derech' in lowf or '_r' in lowf or 'right' in lowf):
-                                    dir_key = 'derecha'
-                                elif ('izquierda' in lowf or 'iquierda' in lowf or 'izq' in lowf or '_l' in lowf or 'left' in lowf):
-                                    dir_key = 'izquierda'
-                                key_state = matched_state or 'unknown'
-                                sprites_by_char[pname].setdefault(key_state, {}).setdefault(dir_key, []).append(fname)
-                        for pname, mapping in sprites_by_char.items():
-                            header = f"  Personaje: {pname}"
-                            print(header)
-                            lines.append(header)
-                            for st, dirs in mapping.items():
-                                for dk, files in dirs.items():
-                                    msg = f"    {st:<12} {dk:<9}: {files}"
-                                    print(msg)
-                                    lines.append(msg)
-                    else:
-                        msg = "DEBUG: no existe la carpeta 'Sprites' para sprites por personaje."
-                        print(msg)
-                        lines.append(msg)
-
-                    # Summary of scaled cache
-                    if hasattr(self, 'char_sprites_cache'):
-                        print("DEBUG: char_sprites_cache summary (states -> dir -> heights with frames):")
-                        lines.append("DEBUG: char_sprites_cache summary (states -> dir -> heights with frames):")
-                        for st in sorted(self.char_sprites_cache.keys()):
-                            try:
-                                entries = []
-                                for dk in ('derecha','izquierda','any'):
-                                    heights = [str(h) for h, lst in (self.char_sprites_cache.get(st, {}).get(dk, {}) or {}).items() if lst]
-                                    if heights:
-                                        entries.append(f"{dk}({', '.join(heights)})")
-                                if entries:
-                                    msg = f"  {st}: " + "; ".join(entries)
-                                else:
-                                    msg = f"  {st}: (no frames cached)"
-                                print(msg)
-                                lines.append(msg)
-                            except Exception:
-                                msg = f"  {st}: (error reading cache)"
-                                print(msg)
-                                lines.append(msg)
-
-                    # Write debug log to file for easier inspection
-                    try:
-                        logs_dir = 'logs'
-                        os.makedirs(logs_dir, exist_ok=True)
-                        log_path = os.path.join(logs_dir, 'sprites_debug.txt')
-                        with open(log_path, 'w', encoding='utf-8') as lf:
-                            lf.write('\n'.join(lines))
-                        print(f"DEBUG: sprite log saved to {log_path}")
-                    except Exception:
-                        pass
-                except Exception:
-                    pass
-            except Exception:
-                self.char_sprites_cache = {}
-        except Exception:
-            self.char_sprites = {}
-        # Build per-character registry from Sprites/ subfolders (SpritesName)
-        try:
-            self.char_sprites_by_character = {}
-            # Try to import PIL for GIF support if available
-            try:
-                from PIL import Image, ImageSequence
-                pil_available_local = True
-            except Exception:
-                pil_available_local = False
+                # Initialize empty dicts and a record of filenames assigned
+                loaded_files = {}
+                # scaled_parts[state][dir][height] = (frames, masks, bounds) acumulados por archivo
+                scaled_parts = {}
+                for st in state_patterns.keys():
+                    self.char_sprites[st] = {'derecha': [], 'izquierda': [], 'any': []}
+                    loaded_files[st] = {'derecha': [], 'izquierda': [], 'any': []}
+                    scaled_parts[st] = {dk: {h_t: ([], [], []) for h_t in target_heights} for dk in ('derecha', 'izquierda', 'any')}
 
-            sprites_root = 'Sprites'
-            if os.path.isdir(sprites_root):
-                for entry in sorted(os.listdir(sprites_root)):
-                    entry_path = os.path.join(sprites_root, entry)
-                    if not os.path.isdir(entry_path):
-                        continue
-                    # infer character name from folder name (strip common prefix 'Sprites')
-                    pd = entry
-                    try:
-                        lowpd = pd.lower()
-                        if lowpd.startswith('sprites'):
-                            char = pd[len('sprites'):].lstrip('_- ') or pd
-                        elif lowpd.startswith('sprite'):
-                            char = pd[len('sprite'):].lstrip('_- ') or pd
-                        else:
-                            char = pd
-                        # strip non-alpha ends
-                        while char and not char[0].isalpha():
-                            char = char[1:]
-                        while char and not char[-1].isalpha():
-                            char = char[:-1]
-                    except Exception:
-                        char = pd
-                    if not char:
-                        char = pd
-                    try:
-                        char = char[0].upper() + char[1:]
-                    except Exception:
-                        pass
-                    # ensure registry
-                    if char not in self.char_sprites_by_character:
-                        self.char_sprites_by_character[char] = {}
-                        for stt in state_patterns.keys():
-                            self.char_sprites_by_character[char][stt] = {'derecha': [], 'izquierda': [], 'any': []}
-
-                    # scan files in this folder
-                    for fname in sorted(os.listdir(entry_path)):
-                        fpath = os.path.join(entry_path, fname)
-                        if not os.path.isfile(fpath):
-                            continue
+                if self.asset_index.isdir('sprites'):
+                    for fname in self.asset_index.listdir('sprites'):
                         low = fname.lower()
-                        # determine direction
+                        fpath = os.path.join('sprites', fname)
+                        # detect direction tag in filename (robust to common typos)
+                        dir_key = None
                         if ('derecha' in low or 'derech' in low or '_r' in low or 'right' in low):
                             dir_key = 'derecha'
                         elif ('izquierda' in low or 'iquierda' in low or 'izq' in low or '_l' in low or 'left' in low):
                             dir_key = 'izquierda'
                         else:
-                            dir_key = 'any'
-                        # determine state
+                            # fallback: if filename contains hints of left/right despite not matching exactly
+                            if any(k in low for k in ('iquierda','izquierda','izq','left')):
+                                dir_key = 'izquierda'
+                            elif any(k in low for k in ('derech','derecha','right','_r')):
+                                dir_key = 'derecha'
+                            else:
+                                dir_key = 'any'
+
+                        # find state by pattern
                         matched_state = None
                         for st, patterns in state_patterns.items():
                             for p in patterns:
@@ -1607,106 +1123,200 @@ class Juego:
                                     break
                             if matched_state:
                                 break
+
                         if not matched_state:
+                            # unknown file, skip
                             continue
-                        # load frames (support GIF via PIL)
-                        frames = []
-                        ext = os.path.splitext(fpath)[1].lower()
-                        if ext == '.gif' and pil_available_local:
-                            try:
-                                img = Image.open(fpath)
-                                for frame in ImageSequence.Iterator(img):
-                                    try:
-                                        f = frame.convert('RGBA')
-                                        w, h = f.size
-                                        data = f.tobytes()
-                                        surf = pygame.image.fromstring(data, (w, h), 'RGBA').convert_alpha()
-                                        frames.append(surf)
-                                    except Exception:
-                                        continue
-                            except Exception:
-                                frames = []
-                        else:
-                            try:
-                                surf = pygame.image.load(fpath).convert_alpha()
-                                frames = [surf]
-                            except Exception:
-                                frames = []
+
+                        # Decode + scale + masks, or restore them from the disk cache
+                        try:
+                            loaded = load_sprite_file(fpath, [NATIVE_HEIGHT] + target_heights, cache=sprite_cache, bounds_fn=mask_bounds)
+                        except Exception:
+                            loaded = {}
+                        frames = loaded.get(NATIVE_HEIGHT, ([], [], []))[0]
 
                         if frames:
+                            self.char_sprites[matched_state][dir_key].extend(frames)
+                            loaded_files[matched_state][dir_key].append(fname)
+                            for h_t in target_heights:
+                                part = scaled_parts[matched_state][dir_key][h_t]
+                                l_frames, l_masks, l_bounds = loaded.get(h_t, ([], [], []))
+                                part[0].extend(l_frames)
+                                part[1].extend(l_masks)
+                                part[2].extend(l_bounds)
+
+                # If no direction-specific frames, but 'any' exists, keep as-is. We'll fallback to flipping when needed.
+                # Build scaled+flipped cache for common target heights to avoid per-frame scaling
+                try:
+                    self.char_sprites_cache = {}
+                    for st in state_patterns.keys():
+                        self.char_sprites_cache[st] = {'derecha': {}, 'izquierda': {}, 'any': {}}
+                        for dk in ('derecha','izquierda','any'):
+                            for h_t in target_heights:
+                                self.char_sprites_cache[st][dk][h_t] = list(scaled_parts[st][dk][h_t][0])
+
+                    # Masks and bounding rects were computed (or restored from disk)
+                    # together with the scaled frames; store them in the parallel
+                    # structures char_sprites_masks_cache and char_sprites_bounds_cache.
+                    try:
+                        self.char_sprites_masks_cache = {}
+                        self.char_sprites_bounds_cache = {}
+                        for stt in list(self.char_sprites_cache.keys()):
+                            self.char_sprites_masks_cache[stt] = {'derecha': {}, 'izquierda': {}, 'any': {}}
+                            self.char_sprites_bounds_cache[stt] = {'derecha': {}, 'izquierda': {}, 'any': {}}
+                            for dk in ('derecha','izquierda','any'):
+                                for h_t in target_heights:
+                                    _frames, masks, rects = scaled_parts[stt][dk][h_t]
+                                    self.char_sprites_masks_cache[stt][dk][h_t] = list(masks)
+                                    self.char_sprites_bounds_cache[stt][dk][h_t] = list(rects)
+                    except Exception:
+                        # if mask precompute fails, leave caches absent and fall back to runtime masks
+                        if hasattr(self, 'char_sprites_masks_cache'):
                             try:
-                                self.char_sprites_by_character[char][matched_state][dir_key].extend(frames)
+                                del self.char_sprites_masks_cache
+                            except Exception:
+                                pass
+                        if hasattr(self, 'char_sprites_bounds_cache'):
+                            try:
+                                del self.char_sprites_bounds_cache
                             except Exception:
                                 pass
-        except Exception:
-            # optional: ignore failures in per-character registry
-            self.char_sprites_by_character = {}
 
-        # Pre-scale per-character frames (if any) and precompute masks/bounds to avoid runtime scaling
-        try:
-            if hasattr(self, 'char_sprites_by_character') and self.char_sprites_by_character:
-                self.char_sprites_cache_by_character = {}
-                self.char_sprites_masks_by_character = {}
-                self.char_sprites_bounds_by_character = {}
-                ths = target_heights if 'target_heights' in locals() else [360, 220]
-                for cname, cmap in (self.char_sprites_by_character or {}).items():
+                        # Fill missing direction caches from 'any' only.
+                        # IMPORTANT: do NOT auto-generate flipped frames from the opposite
+                        # direction. This preserves directional intent: when 'izquierda' is
+                        # requested we will only use true left-facing frames (or 'any').
+                        for h_t in target_heights:
+                            any_list = self.char_sprites_cache[st]['any'].get(h_t, [])
+                            right_list = self.char_sprites_cache[st]['derecha'].get(h_t, [])
+                            left_list = self.char_sprites_cache[st]['izquierda'].get(h_t, [])
+                            # if derecha missing but any exists -> use any (no flipping)
+                            if not right_list and any_list:
+                                self.char_sprites_cache[st]['derecha'][h_t] = list(any_list)
+                            # if izquierda missing but any exists -> use any (no flipping)
+                            if not left_list and any_list:
+                                self.char_sprites_cache[st]['izquierda'][h_t] = list(any_list)
+                            # Do NOT populate missing direction from the opposite side by flipping.
+                            # This ensures left-key uses left sprites only.
+
+                    # Detailed debug: list global sprites, per-character sprites (Sprites/), and cache summary
                     try:
-                        self.char_sprites_cache_by_character[cname] = {}
-                        self.char_sprites_masks_by_character[cname] = {}
-                        self.char_sprites_bounds_by_character[cname] = {}
-                        for stt, dirs in cmap.items():
-                            self.char_sprites_cache_by_character[cname].setdefault(stt, {'derecha': {}, 'izquierda': {}, 'any': {}})
-                            self.char_sprites_masks_by_character[cname].setdefault(stt, {'derecha': {}, 'izquierda': {}, 'any': {}})
-                            self.char_sprites_bounds_by_character[cname].setdefault(stt, {'derecha': {}, 'izquierda': {}, 'any': {}})
+                        lines = []
+                        print("DEBUG: sprite mapping (global 'sprites' folder):")
+                        lines.append("DEBUG: sprite mapping (global 'sprites' folder):")
+                        for st in state_patterns.keys():
                             for dk in ('derecha','izquierda','any'):
-                                frames = dirs.get(dk, []) or []
-                                for h_t in ths:
-                                    scaled_list = []
-                                    masks = []
-                                    rects = []
-                                    for f in frames:
-                                        try:
-                                            fh = f.get_height()
-                                            fw = f.get_width()
-                                            if fh > 0 and fh != h_t:
-                                                scale = h_t / float(fh)
-                                                f2 = pygame.transform.smoothscale(f, (int(fw * scale), int(fh * scale)))
-                                            else:
-                                                f2 = f
-                                            scaled_list.append(f2)
-                                            try:
-                                                m = pygame.mask.from_surface(f2)
-                                                masks.append(m)
-                                                try:
-                                                    br = m.get_bounding_rect()
-                                                except Exception:
-                                                    br = f2.get_rect()
-                                            except Exception:
-                                                masks.append(None)
-                                                br = f2.get_rect()
-                                            rects.append(pygame.Rect(int(br.left), int(br.top), int(br.width), int(br.height)))
-                                        except Exception:
-                                            continue
-                                    self.char_sprites_cache_by_character[cname][stt][dk][h_t] = scaled_list
-                                    self.char_sprites_masks_by_character[cname][stt][dk][h_t] = masks
-                                    self.char_sprites_bounds_by_character[cname][stt][dk][h_t] = rects
+                                files = loaded_files.get(st, {}).get(dk, [])
+                                if files:
+                                    msg = f"  {st:<12} {dk:<9}: {files}"
+                                    print(msg)
+                                    lines.append(msg)
+
+                        # Also list sprites found per-character under 'Sprites/'
+                        sprites_root = 'Sprites'
+                        if self.asset_index.isdir(sprites_root):
+                            print("DEBUG: sprites por personaje (carpeta 'Sprites'):")
+                            lines.append("DEBUG: sprites por personaje (carpeta 'Sprites'):")
+                            sprites_by_char = {}
+                            for sub in sorted(self.asset_index.listdir(sprites_root)):
+                                subp = os.path.join(sprites_root, sub)
+                                if not self.asset_index.isdir(subp):
+                                    continue
+                                # infer character name by stripping 'sprites' prefix if present
+                                pname = sub
+                                low = pname.lower()
+                                if low.startswith('sprites'):
+                                    pname = pname[len('sprites'):].strip('_- ') or sub
+                                pname = pname.strip('_- ')
+                                pname = pname.capitalize() if pname else sub
+                                sprites_by_char[pname] = {}
+                                for fname in sorted(self.asset_index.listdir(subp)):
+                                    lowf = fname.lower()
+                                    # detect state
+                                    matched_state = None
+                                    for st, patterns in state_patterns.items():
+                                        if any(p in lowf for p in patterns):
+                                            matched_state = st
+                                            break
+                                    dir_key = 'any'
+                                    if ('derecha' in lowf or 'derech' in lowf or '_r' in lowf or 'right' in lowf):
+                                        dir_key = 'derecha'
+                                    elif ('izquierda' in lowf or 'iquierda' in lowf or 'izq' in lowf or '_l' in lowf or 'left' in lowf):
+                                        dir_key = 'izquierda'
+                                    key_state = matched_state or 'unknown'
+                                    sprites_by_char[pname].setdefault(key_state, {}).setdefault(dir_key, []).append(fname)
+                            for pname, mapping in sprites_by_char.items():
+                                header = f"  Personaje: {pname}"
+                                print(header)
+                                lines.append(header)
+                                for st, dirs in mapping.items():
+                                    for dk, files in dirs.items():
+                                        msg = f"    {st:<12} {dk:<9}: {files}"
+                                        print(msg)
+                                        lines.append(msg)
+                        else:
+                            msg = "DEBUG: no existe la carpeta 'Sprites' para sprites por personaje."
+                            print(msg)
+                            lines.append(msg)
+
+                        # Summary of scaled cache
+                        if hasattr(self, 'char_sprites_cache'):
+                            print("DEBUG: char_sprites_cache summary (states -> dir -> heights with frames):")
+                            lines.append("DEBUG: char_sprites_cache summary (states -> dir -> heights with frames):")
+                            for st in sorted(self.char_sprites_cache.keys()):
+                                try:
+                                    entries = []
+                                    for dk in ('derecha','izquierda','any'):
+                                        heights = [str(h) for h, lst in (self.char_sprites_cache.get(st, {}).get(dk, {}) or {}).items() if lst]
+                                        if heights:
+                                            entries.append(f"{dk}({', '.join(heights)})")
+                                    if entries:
+                                        msg = f"  {st}: " + "; ".join(entries)
+                                    else:
+                                        msg = f"  {st}: (no frames cached)"
+                                    print(msg)
+                                    lines.append(msg)
+                                except Exception:
+                                    msg = f"  {st}: (error reading cache)"
+                                    print(msg)
+                                    lines.append(msg)
+
+                        # Write debug log to file for easier inspection
+                        try:
+                            logs_dir = 'logs'
+                            os.makedirs(logs_dir, exist_ok=True)
+                            log_path = os.path.join(logs_dir, 'sprites_debug.txt')
+                            with open(log_path, 'w', encoding='utf-8') as lf:
+                                lf.write('\n'.join(lines))
+                            print(f"DEBUG: sprite log saved to {log_path}")
+                        except Exception:
+                            pass
                     except Exception:
-                        # skip this character on error
-                        continue
-        except Exception:
-            # leave per-character caches absent on failure
-            if hasattr(self, 'char_sprites_cache_by_character'):
-                try:
-                    del self.char_sprites_cache_by_character
+                        pass
                 except Exception:
-                    pass
+                    self.char_sprites_cache = {}
+            except Exception:
+                self.char_sprites = {}
+            self.assets.put('global_sprites', True)
+        # Per-character registry (created before the menu so the selector can
+        # prefetch the hovered/selected fighters in the background)
+        try:
+            self.asset_loader.drain()
+        except Exception:
+            pass
+        self.char_sprites_by_character = self.sprite_registry.by_character
+        self.char_sprites_cache_by_character = self.sprite_registry.cache_by_character
+        self.char_sprites_masks_by_character = self.sprite_registry.masks_by_character
+        self.char_sprites_bounds_by_character = self.sprite_registry.bounds_by_character
+        self.char_sprites_atlas_by_character = self.sprite_registry.atlas_by_character
 
         # Helper: provide sprites for a specific character/state/direction/height
         def get_sprites_for(character, state, direction='derecha', height=360):
             """Return a list of surfaces for the requested character/state/direction at the target height.
 
             Priority:
-              1. If `self.char_sprites_by_character` has frames for that character, use those.
+              1. If `self.char_sprites_by_character` has frames for that character, use those
+                 (the character is loaded through `self.sprite_registry` on first request).
               2. Otherwise, fall back to the global `self.char_sprites_cache`.
             """
             try:
@@ -1717,6 +1327,13 @@ class Juego:
                     cname = cname[0].upper() + cname[1:]
                 else:
                     cname = cname.upper()
+                # Lazy load: materialize this character's frames the first time they are needed
+                try:
+                    registry = getattr(self, 'sprite_registry', None)
+                    if registry is not None and cname not in self.char_sprites_by_character:
+                        registry.ensure(cname)
+                except Exception:
+                    pass
                 # Try per-character registry first
                 if hasattr(self, 'char_sprites_by_character') and cname in self.char_sprites_by_character:
                     # Prefer precomputed per-character cache if available
@@ -1744,6 +1361,12 @@ class Juego:
                             except Exception:
                                 s2 = s
                             out.append(s2)
+                        # guardarlos: la próxima vez salen del cache sin escalar
+                        try:
+                            by_state = self.char_sprites_cache_by_character.setdefault(cname, {}).setdefault(state, {})
+                            by_state.setdefault(direction, {})[height] = list(out)
+                        except Exception:
+                            pass
                         return out
                 # Fallback to global cache
                 try:
@@ -1755,18 +1378,157 @@ class Juego:
 
         # Attach helper to self for external access
         self.get_sprites_for = get_sprites_for
+        # Load the two selected fighters now so the first fight frame doesn't stall
+        for fighter in (self.luchador_p1, self.luchador_p2):
+            try:
+                get_sprites_for(getattr(fighter, 'nombre', None), 'idle')
+            except Exception:
+                pass
+
+        # Almacén de frames de draw_stickman: las poses sueltas de sprites/
+        # (agacharse x1.12, patear) y los frames genéricos que no tenían versión
+        # escalada se resuelven, cargan y escalan aquí, una vez por sesión. En el
+        # bucle de la pelea draw_stickman sólo consulta este dict: ni disco ni escalado.
+        def build_pose_frames():
+            store = {}
+            scale_factor_agach = 1.12
+            pose_heights = {'agacharse': 220, 'patear': 360}
+            cache = getattr(self, 'char_sprites_cache', None)
+            if not isinstance(cache, dict):
+                cache = self.char_sprites_cache = {}
+            if not isinstance(getattr(self, 'char_sprites', None), dict):
+                self.char_sprites = {}
+
+            def punch_size(dir_key, target_h):
+                # tamaño del puñetazo ('pegar') a esa altura: misma dirección, si no la opuesta
+                pegar_dict = cache.get('pegar', {})
+                opp = 'izquierda' if dir_key == 'derecha' else 'derecha'
+                p_list = pegar_dict.get(dir_key, {}).get(target_h, []) or pegar_dict.get(opp, {}).get(target_h, [])
+                return p_list[0].get_size() if p_list else None
+
+            for (state, dir_key) in POSE_CANDIDATES:
+                target_h = pose_heights[state]
+                factor = scale_factor_agach if state == 'agacharse' else 1.0
+                found_surf = None
+                for fp in pose_files(state, dir_key, 'sprites', self.asset_index):
+                    try:
+                        tmp = as_rgba(load_image(fp))
+                        h = tmp.get_height()
+                        if h > 0:
+                            scale = (target_h * factor) / float(h)
+                            tmp = pygame.transform.smoothscale(tmp, (int(tmp.get_width() * scale), int(tmp.get_height() * scale)))
+                        found_surf = tmp
+                        break
+                    except Exception:
+                        found_surf = None
+                if found_surf is None:
+                    continue
+                # Igualar el tamaño del puñetazo (el agachado, un poco más grande)
+                try:
+                    desired = punch_size(dir_key, target_h)
+                    if desired:
+                        desired = (int(desired[0] * factor), int(desired[1] * factor))
+                        found_surf = pygame.transform.smoothscale(found_surf, desired)
+                except Exception:
+                    pass
+                # convertir al formato del display recién después de escalar
+                found_surf = finalize_surface(found_surf, alpha=True, rle=self.sprite_rle)
+                store[(state, dir_key, target_h)] = found_surf
+                # Registrar la pose como un estado normal (hitboxes, visual_rect_for)
+                try:
+                    cache.setdefault(state, {'derecha': {}, 'izquierda': {}, 'any': {}})[dir_key][target_h] = [found_surf]
+                    entry = self.char_sprites.setdefault(state, {'derecha': [], 'izquierda': [], 'any': []})
+                    lst = entry.get(dir_key, []) or []
+                    if found_surf.get_size() not in [s.get_size() for s in lst if hasattr(s, 'get_size')]:
+                        lst.append(found_surf)
+                    entry[dir_key] = lst
+                except Exception:
+                    pass
+
+            # Frames genéricos sin versión escalada en char_sprites_cache (estados
+            # que sólo tienen 'any', o una dirección): escalarlos ya, con el mismo
+            # orden de elección que usa draw_stickman.
+            for state, entry in (self.char_sprites or {}).items():
+                if not isinstance(entry, dict):
+                    continue
+                for dir_key in ('derecha', 'izquierda'):
+                    if state == 'caminar':
+                        frames = entry.get(dir_key) or entry.get('any') or entry.get('derecha') or entry.get('izquierda') or []
+                    else:
+                        frames = entry.get(dir_key) or entry.get('any') or []
+                    if not frames:
+                        continue
+                    for target_h in (360, 220):
+                        if cache.get(state, {}).get(dir_key, {}).get(target_h):
+                            continue
+                        store[('global', state, dir_key, target_h)] = [finalize_surface(scale_to_height(s, target_h), alpha=True, rle=self.sprite_rle)
+                                                                       for s in frames]
+            return store
+        try:
+            self.pose_frames = self.assets.get('pose_frames', build_pose_frames) or {}
+        except Exception:
+            self.pose_frames = {}
+
+        # Caras superpuestas a los sprites (ver dibujo.FaceOverlay): la cara escalada
+        # y una tabla de anclas por (estado, dirección), armadas al cargar cada
+        # luchador y guardadas en self.assets para las revanchas.
+        def build_face_overlay(nombre, head_dx, cabeza_radio=110):
+            cara = None
+            try:
+                img_path = self.asset_index.resolve(f'face:{nombre}')
+                if img_path:
+                    # keep full face image (do not multiply by mask) so it's always visible
+                    cara = pygame.transform.smoothscale(as_rgba(load_image(img_path)), (cabeza_radio * 2, cabeza_radio * 2))
+                    cara = finalize_surface(cara, alpha=True, rle=self.sprite_rle)
+            except Exception:
+                cara = None
+            anchors = {}
+            for state in STATE_PATTERNS:
+                # la cara sigue al borde superior del sprite: y - radio + offset vertical
+                # (los mismos de draw_stickman: 90, y 200 para el agachado), 60 px más arriba
+                head_top = -cabeza_radio + (200 if state == 'agacharse' else 90)
+                for facing_right in (True, False):
+                    # al patear la cara se corre 110 px hacia el lado contrario al que mira
+                    kick_dx = (-110 if facing_right else 110) if state == 'patear' else 0
+                    anchors[(state, facing_right)] = ((-cabeza_radio + head_dx + kick_dx, head_top - 60),
+                                                      (0, head_top + cabeza_radio))
+            return FaceOverlay(cara, cabeza_radio, anchors, default='idle')
+
+        face_overlays = {}
+
+        def face_overlay_for(nombre):
+            overlay = face_overlays.get(nombre)
+            if overlay is None:
+                # ajuste horizontal por jugador (p1 a la izquierda, p2 a la derecha)
+                if nombre == getattr(getattr(self, 'luchador_p1', None), 'nombre', None):
+                    head_dx = -12
+                elif nombre == getattr(getattr(self, 'luchador_p2', None), 'nombre', None):
+                    head_dx = 12
+                else:
+                    head_dx = 0
+                overlay = self.assets.get(('face_overlay', nombre, head_dx),
+                                          lambda: build_face_overlay(nombre, head_dx))
+                face_overlays[nombre] = overlay
+            return overlay
+
+        for fighter in (self.luchador_p1, self.luchador_p2):
+            face_overlay_for(getattr(fighter, 'nombre', None))
         # Precreate common fonts and caches to avoid recreating per-frame (performance)
         try:
-            font_small = pygame.font.SysFont(None, 32)
-            font_round = pygame.font.SysFont(None, 72)
-            font_timer = pygame.font.SysFont(None, 64)
+            font_small = self.text_cache.font(None, 32)
+            font_round = self.text_cache.font(None, 72)
+            font_timer = self.text_cache.font(None, 64)
         except Exception:
             font_small = None
             font_round = None
             font_timer = None
-        # Cache for masked/scaled head images: key = (name, radius)
-        if not hasattr(self, 'head_cache'):
-            self.head_cache = {}
+        texto = self.text_cache.render
+        # Todos los valores del temporizador prerenderizados en un atlas (uno por sesión)
+        try:
+            timer_atlas = self.assets.get(('timer_atlas', font_timer),
+                                          lambda: DigitAtlas(font_timer, (255, 255, 0), max_value=max(99, tiempo_total)))
+        except Exception:
+            timer_atlas = None
 
         rounds_to_win = 2
         rounds_won = {'p1': 0, 'p2': 0}
@@ -1778,6 +1540,33 @@ class Juego:
         
         # Flag para mostrar la secuencia de inicio de round (se mostrará sobre la escena ya dibujada)
         round_start_pending = True
+        # Render por capas (ver dibujo.RenderPipeline): capa estática (fondo del mapa +
+        # suelo) compuesta una vez por mapa y resolución, actores (luchadores) y las
+        # capas 'hud' y 'overlay' (logos) con sus superficies ya compuestas. Por
+        # debajo, rectángulos sucios: cada frame sólo se restaura/redibuja lo que cambia.
+        # Con el backend de texturas (dibujo.TextureScreen) la pelea se dibuja en su
+        # canvas: las mismas capas, pero cada blit es una copia del renderer.
+        self.pantalla = self.pantalla_logica.use_canvas(True)
+        fight_render = self.pantalla_logica.pipeline(('hud', 'overlay'))
+        hud_cache = fight_render.cache('hud')
+
+        def fight_static_layer():
+            size = self.pantalla.get_size()
+            mapa = (self.selected_map or '').lower() if getattr(self, 'selected_map', None) else ''
+
+            def build():
+                capa = pygame.Surface(size, 0, self.pantalla_logica.surface)
+                # fondo del mapa si existe
+                if fight_bg:
+                    capa.blit(fight_bg, (0, 0))
+                else:
+                    capa.fill((30, 30, 30))
+                # Dibujar la franja del suelo solo si el mapa seleccionado NO es Citec
+                if mapa != 'citec':
+                    pygame.draw.rect(capa, (80, 80, 80), (0, self.limite_suelo, self.ancho, self.alto - self.limite_suelo))
+                return capa
+            # se conserva en la sesión: la revancha en el mismo mapa no la recompone
+            return self.assets.get(('fight_static', mapa, size, self.limite_suelo, fight_bg is not None), build)
         # rounds_won, round_number y match_winner fueron inicializados arriba
         while corriendo:
             # Actualizar temporizador
@@ -1812,11 +1601,11 @@ class Juego:
                     corriendo = False
                 else:
                     # Mostrar mensaje de fin de round breve
-                    font_round = pygame.font.SysFont(None, 72)
+                    font_round = self.text_cache.font(None, 72)
                     if round_winner is None:
                         msg_round = None
                     else:
-                        msg_round = font_round.render(f"¡{round_winner_name} gana el round!", True, (255, 255, 0))
+                        msg_round = texto(font_round, f"¡{round_winner_name} gana el round!", (255, 255, 0))
                     # Mostrar resultado textual brevemente (si se desea)
                     # ahora prepararnos para el siguiente round y mostrar la secuencia de logos antes del inicio
                     # NOTA: se mostrará la secuencia (RoundX -> Fight) antes de que comience el siguiente round
@@ -1874,17 +1663,10 @@ class Juego:
                         except Exception:
                             pass
                     elif evento.key == pygame.K_F11:
-                        info = pygame.display.Info()
-                        if not is_fullscreen:
-                            self.ancho, self.alto = info.current_w, info.current_h
-                            self.pantalla = pygame.display.set_mode((self.ancho, self.alto), pygame.FULLSCREEN)
-                            is_fullscreen = True
-                            rescale_assets(self.ancho, self.alto)
-                        else:
-                            self.ancho, self.alto = windowed_w, windowed_h
-                            self.pantalla = pygame.display.set_mode((self.ancho, self.alto))
-                            is_fullscreen = False
+                        is_fullscreen = not is_fullscreen
+                        if self.set_display_mode(is_fullscreen):
                             rescale_assets(self.ancho, self.alto)
+                        fight_render.invalidate()
                 # (La detección de maximizar/restaurar se realiza por comparación de tamaño de ventana con la resolución del monitor.)
 
             teclas = pygame.key.get_pressed()
@@ -1896,14 +1678,8 @@ class Juego:
             # Actualizar
             self.grupo_sprites.update(self.ancho, self.limite_suelo)
 
-            # Dibujo (fondo del mapa si existe)
-            if fight_bg:
-                self.pantalla.blit(fight_bg, (0, 0))
-            else:
-                self.pantalla.fill((30, 30, 30))
-            # Dibujar la franja del suelo solo si el mapa seleccionado NO es Citec
-            if not (hasattr(self, 'selected_map') and self.selected_map and self.selected_map.lower() == 'citec'):
-                pygame.draw.rect(self.pantalla, (80, 80, 80), (0, self.limite_suelo, self.ancho, self.alto - self.limite_suelo))
+            # Dibujo: el fondo del mapa y el suelo forman la capa estática
+            # (fight_static_layer), el pipeline la pinta sólo en frames completos
 
             # OCULTAR/ELIMINAR RECTÁNGULOS VERTICALES AMARILLOS
             # (No dibujar ningún rectángulo amarillo junto a los stickman)
@@ -1916,7 +1692,10 @@ class Juego:
             # NO dibujar self.grupo_sprites.draw(self.pantalla) para evitar las barras amarillas
 
             # Dibujar stickman para cada luchador
-            def draw_stickman(surface, x, y, color, nombre, estado, mirando_derecha, cabeza_radio=110, anim_frame=0):
+            def draw_stickman(surface, x, y, color, nombre, estado, mirando_derecha, cabeza_radio=110, anim_frame=0, marca=None):
+                # marca(rect) recibe cada rect dibujado (ver dibujo.DirtyCompositor)
+                if marca is None:
+                    marca = lambda r: r
                 # Si hay sprites cargadas para este estado, usarlas en lugar de dibujar el stickman
                 try:
                         sprites = getattr(self, 'char_sprites', None)
@@ -1932,140 +1711,15 @@ class Juego:
                             vertical_sprite_offset_agach = 200
                         # map 'saltar' to 'idle' frames (use idleRight/idleLeft for jump)
                         lookup_state = 'idle' if estado == 'saltar' else estado
-                        # Per-player horizontal adjustment for face images only (player1: left -10, player2: right +10)
-                        try:
-                            head_dx = 0
-                            if hasattr(self, 'luchador_p1') and nombre == getattr(self.luchador_p1, 'nombre', None):
-                                head_dx = -12
-                            elif hasattr(self, 'luchador_p2') and nombre == getattr(self.luchador_p2, 'nombre', None):
-                                head_dx = 12
-                            # Additional temporary shift when performing a kick: move face further left/right by 30px
-                            try:
-                                head_kick_dx = 0
-                                if estado == 'patear':
-                                    # Move the head offset depending on facing direction
-                                    # so kicking left produces the opposite head shift
-                                    # than kicking right. This applies equally to both players.
-                                    kick_amt = 110
-                                    try:
-                                        # head should shift opposite to facing direction
-                                        # so invert the sign: when facing right, move left (-);
-                                        # when facing left, move right (+).
-                                        if mirando_derecha:
-                                            head_kick_dx = -kick_amt
-                                        else:
-                                            head_kick_dx = kick_amt
-                                    except Exception:
-                                        head_kick_dx = 0
-                            except Exception:
-                                head_kick_dx = 0
-                        except Exception:
-                            head_dx = 0
-                            head_kick_dx = 0
+                        # cara superpuesta: superficie y anclas ya calculadas (face_overlay_for)
+                        overlay = face_overlay_for(nombre)
                         # Special-case: when crouching, prefer explicit agacharse images if present
                         if lookup_state == 'agacharse':
                             target_h = 220
-                            # Make crouch images a bit bigger than normal: scale factor > 1.0
-                            # Only affects 'agacharse' images — other states keep their sizes
-                            try:
-                                scale_factor_agach = 1.12
-                            except Exception:
-                                scale_factor_agach = 1.12
-                            # pick candidates depending on facing direction
-                            if mirando_derecha:
-                                candidates = ['agacharseDerecha.png','agacharse_derecha.png','agachDerecha.png','agach_right.png','crouchRight.png','crouch_right.png']
-                            else:
-                                candidates = ['agacharseIzquierda.png','agacharse_izquierda.png','agachIzquierda.png','agach_left.png','crouchLeft.png','crouch_left.png']
-                            found_surf = None
-                            sprites_dir = os.path.join('sprites')
-                            # Try explicit candidate filenames first
-                            for cf in candidates:
-                                fp = os.path.join(sprites_dir, cf)
-                                if os.path.exists(fp):
-                                    try:
-                                        tmp = pygame.image.load(fp).convert_alpha()
-                                        h = tmp.get_height()
-                                        if h > 0:
-                                            scale = (target_h * scale_factor_agach) / float(h)
-                                            tmp = pygame.transform.smoothscale(tmp, (int(tmp.get_width() * scale), int(tmp.get_height() * scale)))
-                                        found_surf = tmp
-                                        break
-                                    except Exception:
-                                        found_surf = None
-                            # Fallback: search for any "agach"/"crouch" file and use/flip as needed
-                            if found_surf is None and os.path.isdir(sprites_dir):
-                                for fname in os.listdir(sprites_dir):
-                                    low = fname.lower()
-                                    if ('agach' in low) or ('crouch' in low):
-                                        fp = os.path.join(sprites_dir, fname)
-                                        try:
-                                            tmp = pygame.image.load(fp).convert_alpha()
-                                            h = tmp.get_height()
-                                            if h > 0:
-                                                scale = (target_h * scale_factor_agach) / float(h)
-                                                tmp = pygame.transform.smoothscale(tmp, (int(tmp.get_width() * scale), int(tmp.get_height() * scale)))
-                                            # Do not auto-flip loaded images. We expect separate
-                                            # left/right assets; keep the image as-is.
-                                            found_surf = tmp
-                                            break
-                                        except Exception:
-                                            pass
-                            # If we found a crouch surface, scale to match punch size if possible, cache and register it, then draw and return
+                            # pose ya resuelta y escalada al cargar la pelea (ver build_pose_frames)
+                            dir_key = 'derecha' if mirando_derecha else 'izquierda'
+                            found_surf = self.pose_frames.get(('agacharse', dir_key, target_h))
                             if found_surf is not None:
-                                try:
-                                    dir_key = 'derecha' if mirando_derecha else 'izquierda'
-                                    # Attempt to match punch ('pegar') size for consistency
-                                    try:
-                                        punch_surf = None
-                                        pegar_dict = self.char_sprites_cache.get('pegar', {}) if hasattr(self, 'char_sprites_cache') else {}
-                                        p_list = pegar_dict.get(dir_key, {}).get(target_h, []) if pegar_dict else []
-                                        if not p_list:
-                                            opp = 'izquierda' if dir_key == 'derecha' else 'derecha'
-                                            p_list = pegar_dict.get(opp, {}).get(target_h, []) if pegar_dict else []
-                                        if p_list:
-                                            punch_surf = p_list[0]
-                                        if punch_surf is not None:
-                                            desired = punch_surf.get_size()
-                                            # Make crouch slightly larger than punch for visual separation
-                                            try:
-                                                if desired and hasattr(found_surf, 'get_size'):
-                                                    desired_w = int(desired[0] * scale_factor_agach)
-                                                    desired_h = int(desired[1] * scale_factor_agach)
-                                                    found_surf = pygame.transform.smoothscale(found_surf, (desired_w, desired_h))
-                                            except Exception:
-                                                # fallback to exact size if anything fails
-                                                if desired and hasattr(found_surf, 'get_size'):
-                                                    found_surf = pygame.transform.smoothscale(found_surf, desired)
-                                    except Exception:
-                                        pass
-                                    # store in cache
-                                    try:
-                                        if not hasattr(self, 'char_sprites_cache') or not isinstance(self.char_sprites_cache, dict):
-                                            self.char_sprites_cache = {}
-                                        if 'agacharse' not in self.char_sprites_cache:
-                                            self.char_sprites_cache['agacharse'] = {'derecha': {}, 'izquierda': {}, 'any': {}}
-                                        self.char_sprites_cache['agacharse'][dir_key][target_h] = [found_surf]
-                                    except Exception:
-                                        pass
-                                    # register in self.char_sprites
-                                    try:
-                                        if not hasattr(self, 'char_sprites') or not isinstance(self.char_sprites, dict):
-                                            self.char_sprites = {}
-                                        if 'agacharse' not in self.char_sprites:
-                                            self.char_sprites['agacharse'] = {'derecha': [], 'izquierda': [], 'any': []}
-                                        lst = self.char_sprites['agacharse'].get(dir_key, []) or []
-                                        try:
-                                            sizes = [s.get_size() for s in lst if hasattr(s, 'get_size')]
-                                            if not hasattr(found_surf, 'get_size') or found_surf.get_size() not in sizes:
-                                                lst.append(found_surf)
-                                        except Exception:
-                                            if found_surf not in lst:
-                                                lst.append(found_surf)
-                                        self.char_sprites['agacharse'][dir_key] = lst
-                                    except Exception:
-                                        pass
-                                except Exception:
-                                    pass
                                 try:
                                     rect = found_surf.get_rect()
                                     rect.centerx = x
@@ -2082,154 +1736,23 @@ class Juego:
                                         rect.top = y - cabeza_radio
                                         rect.top += vertical_sprite_offset_agach if lookup_state == 'agacharse' else vertical_sprite_offset
                                     try:
-                                        surface.blit(found_surf, rect)
+                                        marca(surface.blit(found_surf, rect))
                                     except Exception:
                                         pass
                                 except Exception:
                                     pass
-                                # overlay head (position relative to rendered rect.top when possible)
+                                # superponer la cara (una consulta a la tabla de anclas y un blit)
                                 try:
-                                    # head_scale reduces the visual radius of face overlays
-                                    try:
-                                        head_scale = 1
-                                    except Exception:
-                                        head_scale = 1
-                                    reduced_radius = int(cabeza_radio * head_scale)
-                                    reduced_size = reduced_radius * 2
-                                    img_key = (nombre, cabeza_radio, head_scale)
-                                    cara = self.head_cache.get(img_key)
-                                    if cara is None:
-                                        img_path = os.path.join('images', 'caras', f'{nombre}.png')
-                                        if os.path.exists(img_path):
-                                            tmp = pygame.image.load(img_path).convert_alpha()
-                                            tmp = pygame.transform.smoothscale(tmp, (reduced_size, reduced_size))
-                                            # keep full face image (do not multiply by mask) so it's always visible
-                                            self.head_cache[img_key] = tmp
-                                            cara = tmp
-                                    try:
-                                        # prefer rect.top as head y position (keeps head aligned to sprite)
-                                        head_y = rect.top
-                                    except Exception:
-                                        head_y = y + 100 if estado == 'agacharse' else y
-                                        head_y += vertical_sprite_offset_agach if lookup_state == 'agacharse' else vertical_sprite_offset
-                                    if cara:
-                                        surface.blit(cara, (x-reduced_radius + head_dx + (head_kick_dx if 'head_kick_dx' in locals() else 0), head_y - 60))
-                                    else:
-                                        pygame.draw.circle(surface, color, (x, head_y + reduced_radius), reduced_radius, 0)
+                                    marca(overlay.draw(surface, x, y, lookup_state, mirando_derecha, color))
                                 except Exception:
                                     pass
                                 return
                         # Special-case: when kicking, prefer explicit patada images if present
                         if lookup_state == 'patear':
                             target_h = 220 if estado == 'agacharse' else 360
-                            # pick candidates depending on facing direction
-                            if mirando_derecha:
-                                candidates = ['patadaDerecha.png','patada_derecha.png','patearDerecha.png','patear_derecha.png','kickRight.png','kick_right.png']
-                            else:
-                                candidates = ['patadaIzquierda.png','patada_izquierda.png','patearIzquierda.png','patear_izquierda.png','kickLeft.png','kick_left.png']
-                            found_surf = None
-                            sprites_dir = os.path.join('sprites')
-                            # Try explicit candidate filenames first
-                            for cf in candidates:
-                                fp = os.path.join(sprites_dir, cf)
-                                if os.path.exists(fp):
-                                    try:
-                                        tmp = pygame.image.load(fp).convert_alpha()
-                                        h = tmp.get_height()
-                                        if h > 0:
-                                            scale = target_h / float(h)
-                                            tmp = pygame.transform.smoothscale(tmp, (int(tmp.get_width() * scale), int(tmp.get_height() * scale)))
-                                        found_surf = tmp
-                                        break
-                                    except Exception:
-                                        found_surf = None
-                            # Fallback: search for any "patad"/"pate"/"kick" file and use/flip as needed
-                            if found_surf is None and os.path.isdir(sprites_dir):
-                                for fname in os.listdir(sprites_dir):
-                                    low = fname.lower()
-                                    if ('patad' in low) or ('pate' in low) or ('kick' in low):
-                                        fp = os.path.join(sprites_dir, fname)
-                                        try:
-                                            tmp = pygame.image.load(fp).convert_alpha()
-                                            h = tmp.get_height()
-                                            if h > 0:
-                                                scale = target_h / float(h)
-                                                tmp = pygame.transform.smoothscale(tmp, (int(tmp.get_width() * scale), int(tmp.get_height() * scale)))
-                                            # Do not auto-flip loaded images. We expect separate
-                                            # left/right assets; keep the image as-is.
-                                            found_surf = tmp
-                                            break
-                                        except Exception:
-                                            pass
-                            # If we found a kick surface, cache it (for reuse) then draw it and overlay head, then return
+                            dir_key = 'derecha' if mirando_derecha else 'izquierda'
+                            found_surf = self.pose_frames.get(('patear', dir_key, target_h))
                             if found_surf is not None:
-                                try:
-                                    # Insert into char_sprites_cache for 'patear' to reuse elsewhere
-                                    try:
-                                        dir_key = 'derecha' if mirando_derecha else 'izquierda'
-                                        target_h = 220 if estado == 'agacharse' else 360
-                                        if not hasattr(self, 'char_sprites_cache') or not isinstance(self.char_sprites_cache, dict):
-                                            self.char_sprites_cache = {}
-                                        # ensure structure for 'patear'
-                                        if 'patear' not in self.char_sprites_cache:
-                                            self.char_sprites_cache['patear'] = {'derecha': {}, 'izquierda': {}, 'any': {}}
-
-                                        # Try to match the size of existing punch ('pegar') frames so kicks look consistent
-                                        punch_surf = None
-                                        try:
-                                            pegar_dict = self.char_sprites_cache.get('pegar', {})
-                                            # prefer same direction, fallback to opposite
-                                            p_list = pegar_dict.get(dir_key, {}).get(target_h, []) if pegar_dict else []
-                                            if not p_list:
-                                                opp = 'izquierda' if dir_key == 'derecha' else 'derecha'
-                                                p_list = pegar_dict.get(opp, {}).get(target_h, []) if pegar_dict else []
-                                            if p_list:
-                                                punch_surf = p_list[0]
-                                        except Exception:
-                                            punch_surf = None
-
-                                        # If we found a punch surface, scale kick to that exact size
-                                        try:
-                                            if punch_surf is not None:
-                                                desired = punch_surf.get_size()
-                                                if desired and hasattr(found_surf, 'get_size'):
-                                                    found_surf = pygame.transform.smoothscale(found_surf, desired)
-                                            else:
-                                                # fallback: keep target_h scaling already applied earlier
-                                                pass
-                                        except Exception:
-                                            pass
-
-                                        # store single-frame list for the target height
-                                        try:
-                                            self.char_sprites_cache['patear'][dir_key][target_h] = [found_surf]
-                                        except Exception:
-                                            # defensive: recreate inner dict if needed
-                                            self.char_sprites_cache['patear'][dir_key] = {target_h: [found_surf]}
-
-                                        # Also register the found kick surface in self.char_sprites so 'patear' is treated as a normal state
-                                        try:
-                                            if not hasattr(self, 'char_sprites') or not isinstance(self.char_sprites, dict):
-                                                self.char_sprites = {}
-                                            if 'patear' not in self.char_sprites:
-                                                self.char_sprites['patear'] = {'derecha': [], 'izquierda': [], 'any': []}
-                                            lst = self.char_sprites['patear'].get(dir_key, []) or []
-                                            # avoid adding duplicates by size
-                                            try:
-                                                sizes = [s.get_size() for s in lst if hasattr(s, 'get_size')]
-                                                if not hasattr(found_surf, 'get_size') or found_surf.get_size() not in sizes:
-                                                    lst.append(found_surf)
-                                            except Exception:
-                                                # if any problem, just append once
-                                                if found_surf not in lst:
-                                                    lst.append(found_surf)
-                                            self.char_sprites['patear'][dir_key] = lst
-                                        except Exception:
-                                            pass
-                                    except Exception:
-                                        pass
-                                except Exception:
-                                    pass
                                 try:
                                     rect = found_surf.get_rect()
                                     rect.centerx = x
@@ -2245,38 +1768,14 @@ class Juego:
                                         rect.top = y - cabeza_radio
                                         rect.top += vertical_sprite_offset
                                     try:
-                                        surface.blit(found_surf, rect)
+                                        marca(surface.blit(found_surf, rect))
                                     except Exception:
                                         pass
                                 except Exception:
                                     pass
-                                # superponer cabeza personalizada si existe (cached)
+                                # superponer la cara (una consulta a la tabla de anclas y un blit)
                                 try:
-                                    try:
-                                        head_scale = 1
-                                    except Exception:
-                                        head_scale = 1
-                                    reduced_radius = int(cabeza_radio * head_scale)
-                                    reduced_size = reduced_radius * 2
-                                    img_key = (nombre, cabeza_radio, head_scale)
-                                    cara = self.head_cache.get(img_key)
-                                    if cara is None:
-                                        img_path = os.path.join('images', 'caras', f'{nombre}.png')
-                                        if os.path.exists(img_path):
-                                            tmp = pygame.image.load(img_path).convert_alpha()
-                                            tmp = pygame.transform.smoothscale(tmp, (reduced_size, reduced_size))
-                                            # keep full face image (do not multiply by mask) so it's always visible
-                                            self.head_cache[img_key] = tmp
-                                            cara = tmp
-                                    try:
-                                        head_y = rect.top
-                                    except Exception:
-                                        head_y = y
-                                        head_y += vertical_sprite_offset
-                                    if cara:
-                                        surface.blit(cara, (x-reduced_radius + head_dx + (head_kick_dx if 'head_kick_dx' in locals() else 0), head_y - 60))
-                                    else:
-                                        pygame.draw.circle(surface, color, (x, head_y + reduced_radius), reduced_radius, 0)
+                                    marca(overlay.draw(surface, x, y, lookup_state, mirando_derecha, color))
                                 except Exception:
                                     pass
                                 return
@@ -2303,7 +1802,8 @@ class Juego:
                                     except Exception:
                                         idx = 0
                                     frame_surf = frames[idx]
-                                    # already scaled by helper to target_h; do NOT flip —
+                                    # already scaled by helper to target_h (a view over the
+                                    # character atlas); do NOT flip —
                                     # assets for left/right must be provided separately.
                                     s2 = frame_surf
                                     try:
@@ -2320,37 +1820,14 @@ class Juego:
                                             rect.top = y - cabeza_radio
                                             rect.top += vertical_sprite_offset_agach if lookup_state == 'agacharse' else vertical_sprite_offset
                                         try:
-                                            surface.blit(s2, rect)
+                                            marca(surface.blit(s2, rect))
                                         except Exception:
                                             pass
                                     except Exception:
                                         pass
-                                    # superponer cabeza personalizada si existe (cached)
+                                    # superponer la cara (una consulta a la tabla de anclas y un blit)
                                     try:
-                                        try:
-                                            head_scale = 1
-                                        except Exception:
-                                            head_scale = 1
-                                        reduced_radius = int(cabeza_radio * head_scale)
-                                        reduced_size = reduced_radius * 2
-                                        img_key = (nombre, cabeza_radio, head_scale)
-                                        cara = self.head_cache.get(img_key)
-                                        if cara is None:
-                                            img_path = os.path.join('images', 'caras', f'{nombre}.png')
-                                            if os.path.exists(img_path):
-                                                tmp = pygame.image.load(img_path).convert_alpha()
-                                                tmp = pygame.transform.smoothscale(tmp, (reduced_size, reduced_size))
-                                                self.head_cache[img_key] = tmp
-                                                cara = tmp
-                                        try:
-                                            head_y = rect.top
-                                        except Exception:
-                                            head_y = y
-                                            head_y += vertical_sprite_offset_agach if lookup_state == 'agacharse' else vertical_sprite_offset
-                                        if cara:
-                                            surface.blit(cara, (x-reduced_radius + head_dx + (head_kick_dx if 'head_kick_dx' in locals() else 0), head_y - 60))
-                                        else:
-                                            pygame.draw.circle(surface, color, (x, head_y + reduced_radius), reduced_radius, 0)
+                                        marca(overlay.draw(surface, x, y, lookup_state, mirando_derecha, color))
                                     except Exception:
                                         pass
                                         # If we successfully drew per-character sprite + head, stop here to avoid drawing fallback stickman
@@ -2408,6 +1885,9 @@ class Juego:
                                         frames_cached = self.char_sprites_cache.get(lookup_state, {}).get(dir_key, {}).get(target_h, [])
                                     except Exception:
                                         frames_cached = None
+                                if not frames_cached:
+                                    # frames sin versión escalada: escalados al cargar (build_pose_frames)
+                                    frames_cached = self.pose_frames.get(('global', lookup_state, dir_key, target_h))
                                 if frames_cached:
                                     idx = 0
                                     try:
@@ -2416,17 +1896,11 @@ class Juego:
                                         idx = 0
                                     s2 = frames_cached[idx]
                                 else:
-                                    # fallback: scale the single frame_surf
-                                    h = frame_surf.get_height()
-                                    w = frame_surf.get_width()
-                                    if h > 0:
-                                        scale = target_h / float(h)
-                                        s2 = pygame.transform.smoothscale(frame_surf, (int(w * scale), int(h * scale)))
-                                    else:
-                                        s2 = frame_surf
+                                    # Nunca se escala aquí: sin frames preparados se usa tal cual.
                                     # Do NOT perform any flipping here. If only 'any' frames
                                     # exist they will be used as provided; left/right assets
                                     # must be distinct files.
+                                    s2 = frame_surf
                             except Exception:
                                 s2 = frame_surf
 
@@ -2445,37 +1919,12 @@ class Juego:
                                 rect.top = y - cabeza_radio
                                 rect.top += vertical_sprite_offset_agach if lookup_state == 'agacharse' else vertical_sprite_offset
                             try:
-                                surface.blit(s2, rect)
+                                marca(surface.blit(s2, rect))
                             except Exception:
                                 pass
-                            # superponer cabeza personalizada si existe (cached)
+                            # superponer la cara (una consulta a la tabla de anclas y un blit)
                             try:
-                                try:
-                                    head_scale = 1
-                                except Exception:
-                                    head_scale = 1
-                                reduced_radius = int(cabeza_radio * head_scale)
-                                reduced_size = reduced_radius * 2
-                                img_key = (nombre, cabeza_radio, head_scale)
-                                cara = self.head_cache.get(img_key)
-                                if cara is None:
-                                    img_path = os.path.join('images', 'caras', f'{nombre}.png')
-                                    if os.path.exists(img_path):
-                                            tmp = pygame.image.load(img_path).convert_alpha()
-                                            tmp = pygame.transform.smoothscale(tmp, (reduced_size, reduced_size))
-                                            # keep full face image (do not multiply by mask) so it's always visible
-                                            self.head_cache[img_key] = tmp
-                                            cara = tmp
-                                # Position head according to sprite rect.top so it follows the visual image
-                                try:
-                                    head_y = rect.top
-                                except Exception:
-                                    head_y = y + 100 if estado == 'agacharse' else y
-                                    head_y += vertical_sprite_offset_agach if lookup_state == 'agacharse' else vertical_sprite_offset
-                                if cara:
-                                    surface.blit(cara, (x-reduced_radius + head_dx + (head_kick_dx if 'head_kick_dx' in locals() else 0), head_y - 60))
-                                else:
-                                    pygame.draw.circle(surface, color, (x, head_y + reduced_radius), reduced_radius, 0)
+                                marca(overlay.draw(surface, x, y, lookup_state, mirando_derecha, color))
                             except Exception:
                                 pass
                             return
@@ -2969,8 +2418,9 @@ class Juego:
             color1 = (200, 40, 40)
             color2 = (40, 40, 200)
             # Dibujar ambos stickman (la lógica de "destruido" ya no aplica)
-            draw_stickman(self.pantalla, s1['x'], s1['y'], color1, self.luchador_p1.nombre, s1['estado'], s1['mirando_derecha'], 110, s1['anim'])
-            draw_stickman(self.pantalla, s2['x'], s2['y'], color2, self.luchador_p2.nombre, s2['estado'], s2['mirando_derecha'], 110, s2['anim'])
+            def draw_fighters(marca):
+                draw_stickman(self.pantalla, s1['x'], s1['y'], color1, self.luchador_p1.nombre, s1['estado'], s1['mirando_derecha'], 110, s1['anim'], marca)
+                draw_stickman(self.pantalla, s2['x'], s2['y'], color2, self.luchador_p2.nombre, s2['estado'], s2['mirando_derecha'], 110, s2['anim'], marca)
 
             # Hitboxes desactivadas en pantalla (se eliminaron los rectángulos amarillos de depuración)
 
@@ -2980,58 +2430,110 @@ class Juego:
             barra_w = 400
             barra_h = 32
             margen = 20
+            font = font_small if font_small else pygame.font.SysFont(None, 32)
+
+            # Capa HUD: las barras (con su relleno) se componen una vez en hud_cache y
+            # sólo se rehacen cuando cambia la vida; nombres y rounds salen de la cache
+            # de textos y el tiempo del atlas de dígitos: dibujar el HUD es blitear. Los rects se declaran antes
+            # de dibujar (font.size no renderiza) para que el compositor sepa qué restaurar.
+            def hud_bar(name, vida, color, fill_right):
+                def build():
+                    barra = pygame.Surface((barra_w, barra_h), pygame.SRCALPHA)
+                    pygame.draw.rect(barra, (60,60,60), (0, 0, barra_w, barra_h), 0, border_radius=8)
+                    ancho_vida = int(barra_w * vida / max_vida)
+                    fill_x = barra_w - ancho_vida if fill_right else 0
+                    pygame.draw.rect(barra, color, (fill_x, 0, ancho_vida, barra_h), 0, border_radius=8)
+                    return barra
+                return hud_cache.get(name, vida, build)
+
+            def text_rect(fnt, text, x, y):
+                w, h = fnt.size(text)
+                return pygame.Rect(x, y, w, h)
+
             # P1 (izquierda)
             vida_p1 = max(0, min(self.luchador_p1.vida, max_vida))
             x1, y1 = margen, margen
-            pygame.draw.rect(self.pantalla, (60,60,60), (x1, y1, barra_w, barra_h), 0, border_radius=8)
-            ancho_vida1 = int(barra_w * vida_p1 / max_vida)
-            pygame.draw.rect(self.pantalla, (200,40,40), (x1, y1, ancho_vida1, barra_h), 0, border_radius=8)
-            font = font_small if font_small else pygame.font.SysFont(None, 32)
-            nombre1 = font.render(self.luchador_p1.nombre, True, (255,255,255))
-            self.pantalla.blit(nombre1, (x1 + 8, y1 + barra_h//2 - nombre1.get_height()//2))
-            # Mostrar contador de rounds para P1
-            try:
-                rounds_surf1 = font.render(f"Rounds: {rounds_won['p1']}", True, (255,255,255))
-                self.pantalla.blit(rounds_surf1, (x1, y1 + barra_h + 6))
-            except Exception:
-                pass
+            rounds_txt1 = f"Rounds: {rounds_won['p1']}"
+            nw1, nh1 = font.size(self.luchador_p1.nombre)
+            hud_rect1 = pygame.Rect(x1, y1, barra_w, barra_h).union(text_rect(font, rounds_txt1, x1, y1 + barra_h + 6))
+            hud_rect1.union_ip(pygame.Rect(x1 + 8, y1 + barra_h//2 - nh1//2, nw1, nh1))
+            def draw_hud_p1():
+                self.pantalla.blit(hud_bar('bar_p1', vida_p1, (200,40,40), False), (x1, y1))
+                nombre1 = texto(font, self.luchador_p1.nombre, (255,255,255))
+                self.pantalla.blit(nombre1, (x1 + 8, y1 + barra_h//2 - nombre1.get_height()//2))
+                # Mostrar contador de rounds para P1
+                try:
+                    rounds_surf1 = texto(font, rounds_txt1, (255,255,255))
+                    self.pantalla.blit(rounds_surf1, (x1, y1 + barra_h + 6))
+                except Exception:
+                    pass
             # P2 (derecha)
             vida_p2 = max(0, min(self.luchador_p2.vida, max_vida))
             x2, y2 = self.ancho - barra_w - margen, margen
-            pygame.draw.rect(self.pantalla, (60,60,60), (x2, y2, barra_w, barra_h), 0, border_radius=8)
-            ancho_vida2 = int(barra_w * vida_p2 / max_vida)
-            pygame.draw.rect(self.pantalla, (40,40,200), (x2 + barra_w - ancho_vida2, y2, ancho_vida2, barra_h), 0, border_radius=8)
-            nombre2 = font.render(self.luchador_p2.nombre, True, (255,255,255))
-            self.pantalla.blit(nombre2, (x2 + barra_w - nombre2.get_width() - 8, y2 + barra_h//2 - nombre2.get_height()//2))
-            # Mostrar contador de rounds para P2
-            try:
-                rounds_surf2 = font.render(f"Rounds: {rounds_won['p2']}", True, (255,255,255))
-                self.pantalla.blit(rounds_surf2, (x2 + barra_w - rounds_surf2.get_width(), y2 + barra_h + 6))
-            except Exception:
-                pass
+            rounds_txt2 = f"Rounds: {rounds_won['p2']}"
+            nw2, nh2 = font.size(self.luchador_p2.nombre)
+            rw2, rh2 = font.size(rounds_txt2)
+            hud_rect2 = pygame.Rect(x2, y2, barra_w, barra_h).union(pygame.Rect(x2 + barra_w - rw2, y2 + barra_h + 6, rw2, rh2))
+            hud_rect2.union_ip(pygame.Rect(x2 + barra_w - nw2 - 8, y2 + barra_h//2 - nh2//2, nw2, nh2))
+            def draw_hud_p2():
+                self.pantalla.blit(hud_bar('bar_p2', vida_p2, (40,40,200), True), (x2, y2))
+                nombre2 = texto(font, self.luchador_p2.nombre, (255,255,255))
+                self.pantalla.blit(nombre2, (x2 + barra_w - nombre2.get_width() - 8, y2 + barra_h//2 - nombre2.get_height()//2))
+                # Mostrar contador de rounds para P2
+                try:
+                    rounds_surf2 = texto(font, rounds_txt2, (255,255,255))
+                    self.pantalla.blit(rounds_surf2, (x2 + barra_w - rounds_surf2.get_width(), y2 + barra_h + 6))
+                except Exception:
+                    pass
 
 
             # Dibujar temporizador centrado arriba
             # use precreated font_timer to avoid allocating per-frame
             # font_timer was created before the main loop
-            timer_text = font_timer.render(f"{tiempo_restante:02}", True, (255,255,0))
-            self.pantalla.blit(timer_text, (self.ancho//2 - timer_text.get_width()//2, 20))
+            timer_txt = f"{tiempo_restante:02}"
+            tw, th = timer_atlas.size(timer_txt) if timer_atlas else font_timer.size(timer_txt)
+            timer_rect = pygame.Rect(self.ancho//2 - tw//2, 20, tw, th)
+            def draw_timer():
+                if timer_atlas:
+                    timer_atlas.blit(self.pantalla, timer_txt, (self.ancho//2 - tw//2, 20))
+                else:
+                    timer_text = texto(font_timer, timer_txt, (255,255,0))
+                    self.pantalla.blit(timer_text, (self.ancho//2 - timer_text.get_width()//2, 20))
 
-            # Antes de volcar el frame, si está pendiente la secuencia de inicio de round,
-            # mostrarla (esto pintará RoundX -> Fight sobre la escena ya dibujada)
-            if 'round_start_pending' in locals() and round_start_pending:
+            # Capa overlay: antes de volcar el frame, si está pendiente la secuencia de
+            # inicio de round, mostrarla (esto pintará RoundX -> Fight sobre la escena ya dibujada)
+            pre_round = ('round_start_pending' in locals() and round_start_pending)
+            def draw_pre_round():
                 try:
                     show_pre_round_sequence(round_number)
                 except Exception:
                     pass
-                round_start_pending = False
 
             # Mostrar logo Fight sobre el escenario durante los primeros 1.5 segundos
-            if fight_logo_scaled:
+            # (la secuencia de inicio de round lo deja siempre visible)
+            show_fight_logo = bool(fight_logo_scaled) and (pre_round or pygame.time.get_ticks() - pelea_start_time < fight_logo_duration)
+            def draw_fight_logo():
                 if pygame.time.get_ticks() - pelea_start_time < fight_logo_duration:
                     self.pantalla.blit(fight_logo_scaled, (logo_x, logo_y))
 
-            pygame.display.flip()
+            logo_rect = pygame.Rect(logo_x, logo_y, logo_w, logo_h)
+            fight_render.render(
+                self.pantalla,
+                ((self.selected_map or '').lower() if getattr(self, 'selected_map', None) else '', self.pantalla.get_size(), self.limite_suelo),
+                fight_static_layer,
+                draw_fighters,
+                {
+                    'hud': [
+                        ('p1', (self.luchador_p1.nombre, vida_p1, rounds_txt1), hud_rect1, draw_hud_p1),
+                        ('p2', (self.luchador_p2.nombre, vida_p2, rounds_txt2), hud_rect2, draw_hud_p2),
+                        ('timer', timer_txt, timer_rect, draw_timer),
+                    ],
+                    'overlay': [
+                        ('pre_round', round_number if pre_round else None, logo_rect if pre_round else None, draw_pre_round),
+                        ('fight_logo', show_fight_logo, logo_rect if show_fight_logo else None, draw_fight_logo),
+                    ],
+                })
+            round_start_pending = False
             try:
                 if getattr(self, 'fps_cap_enabled', True):
                     self.reloj.tick(getattr(self, 'fps_cap', self.fps))
@@ -3044,7 +2546,7 @@ class Juego:
                     pass
 
         # Mostrar mensaje de victoria del MATCH (primero en 2 rounds)
-        font_win = pygame.font.SysFont(None, 80)
+        font_win = self.text_cache.font(None, 80)
         final_winner = None
         if match_winner:
             final_winner = match_winner
@@ -3070,18 +2572,20 @@ class Juego:
                 # Mostrar el logo del ganador SUPERPUESTO a la escena actual (como hace Fight.png)
                 # No reescribimos el fondo para preservar los personajes y HUD debajo.
                 self.pantalla.blit(winner_logo, (logo_x, logo_y))
-                pygame.display.flip()
+                self.pantalla_logica.flip()
             else:
                 # Fallback: mostrar texto genérico (sin la palabra 'Empate')
                 if final_winner:
-                    msg = font_win.render(f"¡{final_winner} gana el match!", True, (0,255,0))
+                    msg = texto(font_win, f"¡{final_winner} gana el match!", (0,255,0))
                 else:
-                    msg = font_win.render("¡Match terminado!", True, (255,255,0))
+                    msg = texto(font_win, "¡Match terminado!", (255,255,0))
                 self.pantalla.blit(msg, (self.ancho//2 - msg.get_width()//2, self.alto//2 - msg.get_height()//2))
-                pygame.display.flip()
+                self.pantalla_logica.flip()
         except Exception:
             pass
         pygame.time.wait(3500)
+        # los menús vuelven a dibujarse por software
+        self.pantalla = self.pantalla_logica.use_canvas(False)
 
         # After showing the match result, return to caller so the caller can
         # re-open the character selection menu. Do not quit the whole program
@@ -3094,7 +2598,13 @@ class Juego:
 
 
 if __name__ == '__main__':
-    juego = Juego()
+    # --sdl2: backend de texturas (--sdl2-software: con el renderer por software de SDL)
+    render = 'software'
+    if '--sdl2-software' in sys.argv:
+        render = 'sdl2-software'
+    elif '--sdl2' in sys.argv:
+        render = 'sdl2'
+    juego = Juego(render=render)
     # Run the game loop repeatedly: after each match `ejecutar_pelea` will
     # return here and we call it again to show the character selection screen.
     try:
@@ -3103,3 +2613,5 @@ if __name__ == '__main__':
     except SystemExit:
         # Allow clean exit when the code calls sys.exit()
         pass
+    finally:
+        juego.shutdown()
@@ -0,0 +1,1707 @@
+"""
+Carga y cache de recursos gráficos (sprites) para CPF Kombat.
+
+Decodificar los GIF de `Sprites/` con PIL, reescalarlos con smoothscale y
+calcular sus máscaras es lo que más tarda al abrir una pelea, y el resultado
+es idéntico en cada ejecución. Este módulo guarda en disco (carpeta `cache/`)
+los frames ya escalados junto con sus bounds, de modo que un arranque "en
+caliente" sólo tiene que leer los píxeles RGBA y subirlos a una Surface; las
+máscaras se construyen recién cuando una colisión las necesita.
+"""
+try:
+    import pygame
+except ModuleNotFoundError:
+    print("Error: Pygame no está instalado. Instala con: pip install pygame")
+    raise
+import os
+import hashlib
+import json
+import mmap
+import pickle
+import queue
+import struct
+import threading
+
+# Incrementar cuando cambie el formato de las entradas o la forma de escalar/
+# calcular bounds: las entradas con otra versión se ignoran y se regeneran.
+SPRITE_CACHE_VERSION = 1
+SPRITE_CACHE_DIR = os.path.join('cache', 'sprites')
+
+# Altura "nativa": frames tal cual salen del archivo, sin reescalar
+NATIVE_HEIGHT = 0
+
+# Paquete de recursos precompilado (ver tools/build_assets.py)
+ASSET_BUNDLE_PATH = os.path.join('cache', 'assets.bundle')
+ASSET_BUNDLE_MAGIC = b'CPFASSET'
+ASSET_BUNDLE_VERSION = 1
+
+# Patrones (en minúsculas) para reconocer el estado en el nombre de cada archivo
+STATE_PATTERNS = {
+    'idle': ['idle', 'stand'],
+    # include a broad 'camin' substring to catch typos like 'caminataz'
+    'caminar': ['camin', 'camina', 'caminar', 'caminata', 'walk'],
+    'pegar': ['puñet', 'pegar', 'punch', 'hit'],
+    'patear': ['pate', 'patear', 'patad', 'patada', 'kick'],
+    'agacharse': ['agach', 'agacharse', 'crouch'],
+    'saltar': ['salt', 'saltar', 'jump']
+}
+
+
+def decode_frames(path):
+    """Decode every frame of an image file into 32-bit RGBA surfaces.
+
+    The surfaces are *not* converted to the display format, so this is safe to
+    call from a worker thread; `finalize_sprite_file` does the conversion on
+    the main thread. Images go through PIL when available (GIFs frame by
+    frame); otherwise `pygame.image.load` is used. Returns [] on failure.
+
+    PIL frames are wrapped with `frombuffer` over the bytes PIL hands out, so
+    the only copies of a frame are PIL's `tobytes()` and the final
+    `convert_alpha()` (PIL images do not expose their memory directly).
+    """
+    frames = []
+    try:
+        from PIL import Image, ImageSequence
+    except Exception:
+        Image = None
+    if Image is not None:
+        try:
+            img = Image.open(path)
+            for frame in ImageSequence.Iterator(img):
+                try:
+                    f = frame if frame.mode == 'RGBA' else frame.convert('RGBA')
+                    # the surface keeps a reference to `data`: no extra copy
+                    frames.append(pygame.image.frombuffer(f.tobytes(), f.size, 'RGBA'))
+                except Exception:
+                    continue
+        except Exception:
+            frames = []
+        return frames
+    try:
+        frames = [as_rgba(pygame.image.load(path))]
+    except Exception:
+        frames = []
+    return frames
+
+
+def as_rgba(surf):
+    """`surf` as a 32-bit per-pixel-alpha surface, without touching the display format."""
+    if surf.get_bitsize() != 32 or not (surf.get_flags() & pygame.SRCALPHA):
+        rgba = pygame.Surface(surf.get_size(), pygame.SRCALPHA, 32)
+        rgba.blit(surf, (0, 0))
+        surf = rgba
+    return surf
+
+
+def scale_to_height(surf, height):
+    """Return `surf` smoothscaled so its height is `height` (aspect preserved)."""
+    try:
+        fh = surf.get_height()
+        fw = surf.get_width()
+        if fh > 0 and fh != height:
+            scale = height / float(fh)
+            return pygame.transform.smoothscale(surf, (int(fw * scale), int(fh * scale)))
+    except Exception:
+        pass
+    return surf
+
+
+def frame_bounds(mask, surf):
+    """Bounding rect used for per-character frames (falls back to the full frame)."""
+    try:
+        br = mask.get_bounding_rect()
+    except Exception:
+        br = surf.get_rect()
+    return pygame.Rect(int(br.left), int(br.top), int(br.width), int(br.height))
+
+
+def mask_bounds(mask, surf):
+    """Tight bounding rect of the visible pixels of `mask` (union of its components)."""
+    try:
+        br = mask.get_bounding_rect()
+    except Exception:
+        # older/newer pygame only offer get_bounding_rects
+        try:
+            brs = mask.get_bounding_rects()
+            if brs:
+                br = brs[0].copy()
+                for r in brs[1:]:
+                    br.union_ip(r)
+            else:
+                br = surf.get_rect()
+        except Exception:
+            br = surf.get_rect()
+    return pygame.Rect(int(br.left), int(br.top), int(br.width), int(br.height))
+
+
+class LazyMask:
+    """Stand-in for a pygame.Mask that is only built the first time it is used.
+
+    pygame.Mask objects cannot be serialised, so frames restored from the disk
+    cache carry one of these instead: attribute access (`overlap`,
+    `get_bounding_rects`, ...) builds the real mask from the frame surface once
+    and forwards to it. Only pass real masks as *arguments* to Mask methods.
+    """
+    __slots__ = ('_surface', '_mask')
+
+    def __init__(self, surface):
+        self._surface = surface
+        self._mask = None
+
+    def get(self):
+        if self._mask is None:
+            self._mask = pygame.mask.from_surface(self._surface)
+        return self._mask
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+
+class SpriteDiskCache:
+    """Versioned on-disk store of decoded, scaled sprite frames.
+
+    One entry per (source file, target height). The key includes the absolute
+    path, mtime and size of the source, so editing or replacing a sprite
+    invalidates its entries automatically. Each entry keeps the raw RGBA pixels
+    and the bounds of every frame; pixels are stored uncompressed because
+    inflating them costs about as much as decoding the original GIF.
+    """
+
+    def __init__(self, root=SPRITE_CACHE_DIR, enabled=True):
+        self.root = root
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, path, height):
+        st = os.stat(path)
+        return (SPRITE_CACHE_VERSION, os.path.abspath(path), st.st_mtime_ns, st.st_size, int(height))
+
+    def _entry_path(self, key):
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.root, digest + '.bin')
+
+    def load(self, path, height):
+        """Return `[(surface, None, bounds), ...]` for a cached entry, or None on a miss.
+
+        Surfaces wrap the stored RGBA bytes and are not converted to the display
+        format yet (thread-safe); masks are left for `finalize_sprite_file`.
+        """
+        if not self.enabled:
+            return None
+        try:
+            key = self._key(path, height)
+            entry_path = self._entry_path(key)
+            if not os.path.exists(entry_path):
+                self.misses += 1
+                return None
+            with open(entry_path, 'rb') as f:
+                entry = pickle.load(f)
+            if entry.get('version') != SPRITE_CACHE_VERSION or entry.get('key') != key:
+                self.misses += 1
+                return None
+            out = []
+            for (w, h, data, bounds) in entry['frames']:
+                surf = pygame.image.frombuffer(data, (w, h), 'RGBA')
+                out.append((surf, None, pygame.Rect(*bounds)))
+            self.hits += 1
+            return out
+        except Exception:
+            self.misses += 1
+            return None
+
+    def store(self, path, height, frames):
+        """Persist `[(surface, bounds), ...]` for (path, height). Failures are ignored."""
+        if not self.enabled:
+            return
+        try:
+            key = self._key(path, height)
+            packed = []
+            for surf, bounds in frames:
+                w, h = surf.get_size()
+                packed.append((w, h, pygame.image.tobytes(surf, 'RGBA'), tuple(bounds)))
+            os.makedirs(self.root, exist_ok=True)
+            entry_path = self._entry_path(key)
+            tmp_path = entry_path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                pickle.dump({'version': SPRITE_CACHE_VERSION, 'key': key, 'frames': packed}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, entry_path)
+        except Exception:
+            pass
+
+    def clear(self):
+        """Delete every cached entry."""
+        try:
+            for name in os.listdir(self.root):
+                if name.endswith('.bin') or name.endswith('.tmp'):
+                    os.remove(os.path.join(self.root, name))
+        except Exception:
+            pass
+
+
+def _restore_cached(path, heights, cache=None, bounds_fn=frame_bounds):
+    """Heights of `path` available in the asset bundle or `cache`, and the ones still missing."""
+    result = {}
+    missing = []
+    bundle = get_asset_bundle()
+    for h_t in heights:
+        cached = bundle.sprite_frames(path, h_t, bounds_fn) if bundle is not None else None
+        if cached is None and cache is not None:
+            cached = cache.load(path, h_t)
+        if cached is None:
+            missing.append(h_t)
+            continue
+        result[h_t] = cached
+    return result, missing
+
+
+def _decode_sprite_heights(path, heights, cache=None, bounds_fn=frame_bounds):
+    """Decode `path` once and build `{height: [(surface, mask, bounds), ...]}` for `heights`.
+
+    New results are written back to `cache`.
+    """
+    result = {}
+    native = decode_frames(path)
+    for h_t in heights:
+        out = []
+        for f in native:
+            f2 = f if h_t == NATIVE_HEIGHT else scale_to_height(f, h_t)
+            try:
+                m = pygame.mask.from_surface(f2)
+                br = bounds_fn(m, f2)
+            except Exception:
+                m = None
+                br = f2.get_rect()
+            out.append((f2, m, br))
+        result[h_t] = out
+        if cache is not None and out:
+            cache.store(path, h_t, [(f2, br) for f2, _, br in out])
+    return result
+
+
+def prepare_sprite_file(path, heights, cache=None, bounds_fn=frame_bounds):
+    """Thread-safe half of `load_sprite_file`: decode, scale and measure.
+
+    Returns `{height: [(surface, mask_or_None, bounds), ...]}` with surfaces
+    still in plain RGBA format. Heights found in the asset bundle or in `cache`
+    are restored from there; the source file is only decoded when at least one height is
+    missing, and the new results are written back to the cache.
+    """
+    result, missing = _restore_cached(path, heights, cache=cache, bounds_fn=bounds_fn)
+    if missing:
+        result.update(_decode_sprite_heights(path, missing, cache=cache, bounds_fn=bounds_fn))
+    return result
+
+
+def _decode_sprite_packed(path, heights, cache=None, bounds_fn=frame_bounds):
+    """Process-pool job: decode/scale `path` and return picklable raw RGBA frames.
+
+    Surfaces and masks cannot cross the process boundary, so every frame comes
+    back as `(w, h, rgba_bytes, bounds_tuple)`; `unpack_sprite_frames` wraps
+    them again in the parent process.
+    """
+    packed = {}
+    for h_t, entries in _decode_sprite_heights(path, heights, cache=cache, bounds_fn=bounds_fn).items():
+        rows = []
+        for surf, _m, br in entries:
+            w, h = surf.get_size()
+            rows.append((w, h, pygame.image.tobytes(surf, 'RGBA'), (br.left, br.top, br.width, br.height)))
+        packed[h_t] = rows
+    return packed
+
+
+def unpack_sprite_frames(packed):
+    """Inverse of `_decode_sprite_packed`: `{height: [(surface, None, bounds), ...]}`."""
+    result = {}
+    for h_t, rows in packed.items():
+        result[h_t] = [(pygame.image.frombuffer(data, (w, h), 'RGBA'), None, pygame.Rect(*bounds))
+                       for (w, h, data, bounds) in rows]
+    return result
+
+
+class DecodePool:
+    """ProcessPoolExecutor for sprite decoding, started on the first `submit`.
+
+    With a warm bundle or disk cache nothing is ever submitted, so no worker
+    processes are spawned. `submit` is thread-safe (the BackgroundLoader
+    thread decodes prefetches through it) and raises if the pool cannot be
+    started or was shut down; `prepare_sprite_files` then decodes serially.
+    """
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self._pool = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('decode pool is shut down')
+            if self._pool is None:
+                from concurrent.futures import ProcessPoolExecutor
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            pool = self._pool
+        return pool.submit(fn, *args, **kwargs)
+
+    def shutdown(self, wait=False, cancel_futures=True):
+        """Stop the workers without waiting for queued decodes (safe to call twice)."""
+        with self._lock:
+            self._closed = True
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+
+def make_decode_pool(max_workers=None):
+    """`DecodePool` for sprite decoding, or None on single-core machines."""
+    workers = max_workers or (os.cpu_count() or 1)
+    if workers < 2:
+        return None
+    return DecodePool(workers)
+
+
+def prepare_sprite_files(paths, heights, cache=None, bounds_fn=frame_bounds, executor=None):
+    """`prepare_sprite_file` for several files, decoding the cache misses in parallel.
+
+    Returns `{path: prepared}`. Bundle/cache hits are restored in this process;
+    files with missing heights are decoded on `executor` (a process pool) and
+    only the `frombuffer` of the returned pixels happens here. Without an
+    executor, or if the pool breaks, files are decoded serially as before.
+    """
+    results = {}
+    futures = {}
+    for path in paths:
+        if path in results:
+            continue
+        try:
+            restored, missing = _restore_cached(path, heights, cache=cache, bounds_fn=bounds_fn)
+        except Exception:
+            restored, missing = {}, list(heights)
+        results[path] = restored
+        if not missing:
+            continue
+        if executor is not None:
+            try:
+                futures[path] = (executor.submit(_decode_sprite_packed, path, missing, cache, bounds_fn), missing)
+                continue
+            except Exception:
+                pass
+        try:
+            restored.update(_decode_sprite_heights(path, missing, cache=cache, bounds_fn=bounds_fn))
+        except Exception:
+            pass
+    for path, (future, missing) in futures.items():
+        try:
+            results[path].update(unpack_sprite_frames(future.result()))
+        except Exception:
+            # broken pool / worker error: decode here instead
+            try:
+                results[path].update(_decode_sprite_heights(path, missing, cache=cache, bounds_fn=bounds_fn))
+            except Exception:
+                pass
+    return results
+
+
+def finalize_sprite_file(prepared):
+    """Main-thread half of `load_sprite_file`: convert prepared frames to the display format.
+
+    Returns `{height: (frames, masks, bounds)}`. Frames that came back without
+    a mask (restored from disk) get a `LazyMask`.
+    """
+    result = {}
+    for h_t, entries in prepared.items():
+        frames = []
+        masks = []
+        bounds = []
+        for surf, m, br in entries:
+            try:
+                surf = surf.convert_alpha()
+            except Exception:
+                pass
+            frames.append(surf)
+            masks.append(m if m is not None else LazyMask(surf))
+            bounds.append(br)
+        result[h_t] = (frames, masks, bounds)
+    return result
+
+
+def load_sprite_file(path, heights, cache=None, bounds_fn=frame_bounds):
+    """Load one sprite file at every height in `heights`.
+
+    Returns `{height: (frames, masks, bounds)}`; use `NATIVE_HEIGHT` in
+    `heights` to also get the unscaled frames.
+    """
+    return finalize_sprite_file(prepare_sprite_file(path, heights, cache=cache, bounds_fn=bounds_fn))
+
+
+class SpriteAtlas:
+    """All scaled frames of one character packed into a single surface.
+
+    `rects[key]` holds the source rect of every frame registered under `key`
+    (for the fighters, `key = (state, direction, height)`), and `frames(key)`
+    returns subsurface views over the atlas, so blitting a frame reads straight
+    from the shared atlas pixels. One surface plus a rect table is also what a
+    cache or bundle needs to store a whole character as one blob.
+    """
+
+    def __init__(self, surface, rects):
+        self.surface = surface
+        self.rects = rects
+        self._views = {}
+
+    def frames(self, key):
+        """Return the frames stored under `key` as subsurfaces of the atlas."""
+        views = self._views.get(key)
+        if views is None:
+            views = [self.surface.subsurface(r) for r in self.rects.get(key, [])]
+            self._views[key] = views
+        return views
+
+    def keys(self):
+        return self.rects.keys()
+
+    def reconvert(self, convert=None):
+        """Convert the atlas to the current display format; views handed out before are stale."""
+        self.surface = (convert or reconvert_surface)(self.surface)
+        self._views = {}
+
+
+def pack_atlas(frames_by_key, padding=1, max_width=4096):
+    """Pack `{key: [surface, ...]}` into one `SpriteAtlas` (simple shelf packer).
+
+    Frames are placed tallest first, left to right, opening a new shelf when
+    the row is full. Pixels are copied exactly (no alpha blending against the
+    empty atlas). Returns None when there is nothing to pack.
+    """
+    items = []
+    for key, frames in frames_by_key.items():
+        for idx, surf in enumerate(frames):
+            items.append((key, idx, surf))
+    if not items:
+        return None
+
+    widest = max(s.get_width() for _, _, s in items)
+    area = sum((s.get_width() + padding) * (s.get_height() + padding) for _, _, s in items)
+    atlas_w = min(max_width, max(widest + padding, int(area ** 0.5) + 1))
+
+    # place tallest frames first so shelves waste less vertical space
+    order = sorted(range(len(items)), key=lambda i: (-items[i][2].get_height(), -items[i][2].get_width()))
+    positions = [None] * len(items)
+    x = y = shelf_h = 0
+    used_w = 0
+    for i in order:
+        w, h = items[i][2].get_size()
+        if x > 0 and x + w > atlas_w:
+            y += shelf_h + padding
+            x = 0
+            shelf_h = 0
+        positions[i] = pygame.Rect(x, y, w, h)
+        x += w + padding
+        used_w = max(used_w, x)
+        shelf_h = max(shelf_h, h)
+    atlas_h = y + shelf_h
+
+    surface = pygame.Surface((max(1, used_w), max(1, atlas_h)), pygame.SRCALPHA)
+    try:
+        surface = surface.convert_alpha()
+    except Exception:
+        pass
+    surface.fill((0, 0, 0, 0))
+    rects = {}
+    for (key, idx, surf), rect in zip(items, positions):
+        # BLEND_RGBA_MAX over a fully transparent area copies the pixels as-is
+        surface.blit(surf, rect.topleft, special_flags=pygame.BLEND_RGBA_MAX)
+        rects.setdefault(key, [])
+        lst = rects[key]
+        while len(lst) <= idx:
+            lst.append(None)
+        lst[idx] = rect
+    return SpriteAtlas(surface, rects)
+
+
+def pack_character_atlas(frames_map, masks_map=None):
+    """Pack a character's `{state: {dir: {height: [frames]}}}` map into an atlas.
+
+    The frame lists in `frames_map` are replaced in place by subsurface views
+    over the new atlas, and any not-yet-built `LazyMask` in `masks_map` is
+    re-pointed at its view so the standalone surfaces can be freed.
+    Returns the `SpriteAtlas` (or None if the character has no frames).
+    """
+    frames_by_key = {}
+    for stt, dirs in frames_map.items():
+        for dk, by_h in dirs.items():
+            for h_t, lst in by_h.items():
+                if lst:
+                    frames_by_key[(stt, dk, h_t)] = lst
+    atlas = pack_atlas(frames_by_key)
+    if atlas is None:
+        return None
+    for (stt, dk, h_t) in atlas.keys():
+        views = atlas.frames((stt, dk, h_t))
+        frames_map[stt][dk][h_t] = views
+        try:
+            masks = masks_map[stt][dk][h_t] if masks_map is not None else []
+        except Exception:
+            masks = []
+        for i, m in enumerate(masks):
+            if isinstance(m, LazyMask) and m._mask is None and i < len(views):
+                masks[i] = LazyMask(views[i])
+    return atlas
+
+
+def character_from_folder(folder):
+    """Infer the character name from a `Sprites/` subfolder (e.g. 'SpritesDavid' -> 'David')."""
+    pd = folder
+    try:
+        lowpd = pd.lower()
+        if lowpd.startswith('sprites'):
+            char = pd[len('sprites'):].lstrip('_- ') or pd
+        elif lowpd.startswith('sprite'):
+            char = pd[len('sprite'):].lstrip('_- ') or pd
+        else:
+            char = pd
+        # strip non-alpha ends
+        while char and not char[0].isalpha():
+            char = char[1:]
+        while char and not char[-1].isalpha():
+            char = char[:-1]
+    except Exception:
+        char = pd
+    if not char:
+        char = pd
+    try:
+        char = char[0].upper() + char[1:]
+    except Exception:
+        pass
+    return char
+
+
+def classify_sprite_file(fname, state_patterns):
+    """Return `(state, direction)` for a per-character sprite file name, or None if unknown."""
+    low = fname.lower()
+    # determine direction
+    if ('derecha' in low or 'derech' in low or '_r' in low or 'right' in low):
+        dir_key = 'derecha'
+    elif ('izquierda' in low or 'iquierda' in low or 'izq' in low or '_l' in low or 'left' in low):
+        dir_key = 'izquierda'
+    else:
+        dir_key = 'any'
+    # determine state
+    for st, patterns in state_patterns.items():
+        for p in patterns:
+            if p in low:
+                return st, dir_key
+    return None
+
+
+# Poses sueltas (carpeta sprites/) que draw_stickman prefiere a los frames
+# genéricos: nombres explícitos por dirección y, si ninguno existe, cualquier
+# archivo que contenga una de las palabras clave.
+POSE_CANDIDATES = {
+    ('agacharse', 'derecha'): ['agacharseDerecha.png', 'agacharse_derecha.png', 'agachDerecha.png',
+                               'agach_right.png', 'crouchRight.png', 'crouch_right.png'],
+    ('agacharse', 'izquierda'): ['agacharseIzquierda.png', 'agacharse_izquierda.png', 'agachIzquierda.png',
+                                 'agach_left.png', 'crouchLeft.png', 'crouch_left.png'],
+    ('patear', 'derecha'): ['patadaDerecha.png', 'patada_derecha.png', 'patearDerecha.png',
+                            'patear_derecha.png', 'kickRight.png', 'kick_right.png'],
+    ('patear', 'izquierda'): ['patadaIzquierda.png', 'patada_izquierda.png', 'patearIzquierda.png',
+                              'patear_izquierda.png', 'kickLeft.png', 'kick_left.png'],
+}
+POSE_KEYWORDS = {
+    'agacharse': ('agach', 'crouch'),
+    'patear': ('patad', 'pate', 'kick'),
+}
+
+
+def pose_files(state, direction, root='sprites', index=None):
+    """Candidate paths for the `state`/`direction` pose under `root`, in preference order.
+
+    Explicit names that exist come first, then every listed file matching one
+    of the state's keywords (the caller keeps the first one that decodes).
+    """
+    index = index or get_asset_index()
+    out = []
+    for name in POSE_CANDIDATES.get((state, direction), []):
+        fp = os.path.join(root, name)
+        if index.exists(fp):
+            out.append(fp)
+    keywords = POSE_KEYWORDS.get(state, ())
+    if keywords and index.isdir(root):
+        for fname in index.listdir(root):
+            low = fname.lower()
+            if any(k in low for k in keywords):
+                out.append(os.path.join(root, fname))
+    return out
+
+
+class SpriteRegistry:
+    """Per-character sprite store that only loads a character when it is asked for.
+
+    `scan()` just lists `Sprites/<SpritesName>/` to learn which files belong to
+    which character/state/direction; nothing is decoded until `ensure(name)`
+    materializes that character: native frames, frames scaled to every target
+    height, masks, bounds and the packed atlas (files missing from the caches
+    are decoded on `executor` when one is given). `prefetch(name)` does the
+    decoding on a `BackgroundLoader` thread instead, and the result is
+    installed on the main thread when the loader is drained. The public dicts below are the
+    same objects exposed by `Juego` as `char_sprites_by_character`,
+    `char_sprites_cache_by_character`, etc., and only ever contain loaded
+    characters.
+    """
+
+    def __init__(self, state_patterns, root='Sprites', heights=(360, 220), cache=None, loader=None, executor=None):
+        self.state_patterns = state_patterns
+        self.root = root
+        self.heights = list(heights)
+        self.cache = cache
+        # optional BackgroundLoader used by prefetch()
+        self.loader = loader
+        # optional process pool: a character's files are decoded in parallel
+        self.executor = executor
+        # name -> [(state, dir, path), ...] (filled by scan, no decoding)
+        self.files = {}
+        # bumped by invalidate(): prefetches started before it are discarded
+        self.generation = 0
+        self.by_character = {}
+        self.cache_by_character = {}
+        self.masks_by_character = {}
+        self.bounds_by_character = {}
+        self.atlas_by_character = {}
+
+    def scan(self):
+        """List the sprite folders without decoding anything."""
+        self.files = {}
+        index = get_asset_index()
+        if os.path.normpath(index.sprites_root) == os.path.normpath(self.root):
+            # listing already in memory (AssetIndex)
+            self.files = index.sprite_files(self.state_patterns)
+            return self.files
+        if not os.path.isdir(self.root):
+            return self.files
+        for entry in sorted(os.listdir(self.root)):
+            entry_path = os.path.join(self.root, entry)
+            if not os.path.isdir(entry_path):
+                continue
+            char = character_from_folder(entry)
+            lst = self.files.setdefault(char, [])
+            for fname in sorted(os.listdir(entry_path)):
+                fpath = os.path.join(entry_path, fname)
+                if not os.path.isfile(fpath):
+                    continue
+                found = classify_sprite_file(fname, self.state_patterns)
+                if found:
+                    lst.append((found[0], found[1], fpath))
+        return self.files
+
+    def characters(self):
+        return list(self.files.keys())
+
+    def normalize(self, character):
+        cname = str(character)
+        if len(cname) > 1:
+            return cname[0].upper() + cname[1:]
+        return cname.upper()
+
+    def is_loaded(self, character):
+        return self.normalize(character) in self.by_character
+
+    def ensure(self, character):
+        """Materialize `character` if it is known and not loaded yet. Returns True if available.
+
+        If a background prefetch of the character is in flight, wait for it
+        instead of decoding the same files twice.
+        """
+        if not character:
+            return False
+        cname = self.normalize(character)
+        if cname in self.by_character:
+            return True
+        if cname not in self.files:
+            return False
+        loader = self.loader
+        if loader is not None and loader.is_pending(('sprites', cname)):
+            loader.wait(('sprites', cname))
+            if cname in self.by_character:
+                return True
+        self.install(cname, self.prepare(cname))
+        return True
+
+    def prefetch(self, character):
+        """Start loading `character` on the background loader (no-op if loaded, unknown or queued)."""
+        loader = self.loader
+        if loader is None or not character:
+            return False
+        cname = self.normalize(character)
+        if cname in self.by_character or cname not in self.files:
+            return False
+        generation = self.generation
+
+        def on_ready(prepared):
+            if generation == self.generation:
+                self.install(cname, prepared)
+        return loader.submit(('sprites', cname), lambda: self.prepare(cname), on_ready)
+
+    def _empty_maps(self):
+        return {dk: {h_t: [] for h_t in self.heights} for dk in ('derecha', 'izquierda', 'any')}
+
+    def prepare(self, cname):
+        """Decode and scale every file of `cname` (thread-safe, touches no shared state)."""
+        files = self.files.get(cname, [])
+        try:
+            by_path = prepare_sprite_files([fpath for _, _, fpath in files], [NATIVE_HEIGHT] + self.heights,
+                                           cache=self.cache, executor=self.executor)
+        except Exception:
+            by_path = {}
+        return [(stt, dir_key, by_path.get(fpath, {})) for stt, dir_key, fpath in files]
+
+    def install(self, cname, prepared):
+        """Convert prepared frames on the main thread and register the character."""
+        if cname in self.by_character:
+            return
+        native = {}
+        scaled = {}
+        masks = {}
+        bounds = {}
+        for stt in self.state_patterns.keys():
+            native[stt] = {'derecha': [], 'izquierda': [], 'any': []}
+            scaled[stt] = self._empty_maps()
+            masks[stt] = self._empty_maps()
+            bounds[stt] = self._empty_maps()
+        for stt, dir_key, entry in prepared:
+            try:
+                loaded = finalize_sprite_file(entry)
+            except Exception:
+                loaded = {}
+            frames = loaded.get(NATIVE_HEIGHT, ([], [], []))[0]
+            if not frames:
+                continue
+            native[stt][dir_key].extend(frames)
+            for h_t in self.heights:
+                l_frames, l_masks, l_bounds = loaded.get(h_t, ([], [], []))
+                scaled[stt][dir_key][h_t].extend(l_frames)
+                masks[stt][dir_key][h_t].extend(l_masks)
+                bounds[stt][dir_key][h_t].extend(l_bounds)
+        try:
+            atlas = pack_character_atlas(scaled, masks)
+        except Exception:
+            # atlas is optional: keep the standalone frames
+            atlas = None
+        self.by_character[cname] = native
+        self.cache_by_character[cname] = scaled
+        self.masks_by_character[cname] = masks
+        self.bounds_by_character[cname] = bounds
+        if atlas is not None:
+            self.atlas_by_character[cname] = atlas
+
+    def reconvert(self, convert=None):
+        """Reconvert every loaded character (after `set_mode` changed the display format).
+
+        Atlases are converted and their views rebuilt in the same frame lists
+        (`cache_by_character`), so callers holding those lists see the new
+        frames; characters without an atlas have their frames converted one by one.
+        """
+        convert = convert or reconvert_tree
+        for cname, scaled in self.cache_by_character.items():
+            atlas = self.atlas_by_character.get(cname)
+            if atlas is None:
+                convert(scaled)
+            else:
+                atlas.reconvert(convert)
+                for (stt, dk, h_t) in atlas.keys():
+                    try:
+                        scaled[stt][dk][h_t][:] = atlas.frames((stt, dk, h_t))
+                    except Exception:
+                        pass
+            convert(self.by_character.get(cname))
+
+    def unload(self, character=None):
+        """Drop the loaded frames of `character` (or of every character)."""
+        names = [self.normalize(character)] if character else list(self.by_character.keys())
+        for cname in names:
+            for d in (self.by_character, self.cache_by_character, self.masks_by_character,
+                      self.bounds_by_character, self.atlas_by_character):
+                d.pop(cname, None)
+
+    def invalidate(self, character=None):
+        """Forget `character` (or everything) so it is re-read from disk on next use.
+
+        Unlike `unload`, this also re-lists the sprite folders and discards
+        background prefetches that were started before the call.
+        """
+        self.generation += 1
+        self.unload(character)
+        self.scan()
+
+
+class BackgroundLoader:
+    """Single worker thread that runs loading jobs off the main thread.
+
+    `submit(key, work, on_ready)` queues `work()` on the worker; its result is
+    handed back through a thread-safe queue and `on_ready(result)` runs on the
+    main thread the next time `drain()` (or `wait(key)`) is called. Jobs must
+    not touch the display: decode and scale only, conversion happens in
+    `on_ready`.
+    """
+
+    def __init__(self, name='cpf-loader'):
+        self.name = name
+        self._jobs = queue.Queue()
+        self._done = queue.Queue()
+        # key -> on_ready; only touched from the main thread
+        self._pending = {}
+        self._thread = None
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            key, work = self._jobs.get()
+            try:
+                result = work()
+                error = None
+            except Exception as e:
+                result = None
+                error = e
+            self._done.put((key, result, error))
+
+    def submit(self, key, work, on_ready=None):
+        """Queue `work` under `key`. Returns False if that key is already pending."""
+        if key in self._pending:
+            return False
+        self._pending[key] = on_ready
+        self._ensure_thread()
+        self._jobs.put((key, work))
+        return True
+
+    def is_pending(self, key):
+        return key in self._pending
+
+    def has_pending(self):
+        """True while some submitted job has not been delivered yet."""
+        return bool(self._pending)
+
+    def _deliver(self, key, result, error):
+        on_ready = self._pending.pop(key, None)
+        if error is None and on_ready is not None:
+            try:
+                on_ready(result)
+            except Exception:
+                pass
+
+    def drain(self, max_items=None):
+        """Run `on_ready` for finished jobs (main thread). Returns how many were delivered."""
+        count = 0
+        while max_items is None or count < max_items:
+            try:
+                key, result, error = self._done.get_nowait()
+            except queue.Empty:
+                break
+            self._deliver(key, result, error)
+            count += 1
+        return count
+
+    def wait(self, key, timeout=None):
+        """Block until the job `key` has been delivered (other finished jobs are delivered too)."""
+        while key in self._pending:
+            try:
+                done_key, result, error = self._done.get(timeout=timeout)
+            except queue.Empty:
+                return False
+            self._deliver(done_key, result, error)
+        return True
+
+
+# ---------------------------------------------------------------------------
+# Fondos de mapa
+# ---------------------------------------------------------------------------
+
+MAP_EXTS = ['.jpg', '.jpeg', '.png', '.bmp']
+
+
+def find_map_file(name, maps_dir=os.path.join('images', 'maps'), mapas_dir='mapas', index=None):
+    """Ruta del fondo para el mapa `name` (o None).
+
+    Mismo orden de búsqueda que usaba juego.py: `mapas/<name>*`, luego
+    `images/maps/<name>.<ext>` (que tiene prioridad), `images/maps/<name>*` y
+    por último `images/<name>.<ext>`. Los directorios se consultan en el
+    `AssetIndex` (sin tocar el disco).
+    """
+    index = index or get_asset_index()
+    found = None
+    try:
+        if index.isdir(mapas_dir):
+            for fname in index.listdir(mapas_dir):
+                low = fname.lower()
+                if low.startswith(name.lower()) and any(low.endswith(e) for e in MAP_EXTS):
+                    found = os.path.join(mapas_dir, fname)
+                    break
+    except Exception:
+        pass
+    if index.isdir(maps_dir):
+        for ext in MAP_EXTS:
+            candidate = os.path.join(maps_dir, f"{name}{ext}")
+            if index.exists(candidate):
+                found = candidate
+                break
+        if not found:
+            for fname in index.listdir(maps_dir):
+                if fname.lower().startswith(name.lower()):
+                    if any(fname.lower().endswith(e) for e in MAP_EXTS):
+                        found = os.path.join(maps_dir, fname)
+                        break
+    if not found:
+        for ext in MAP_EXTS:
+            candidate = os.path.join('images', f"{name}{ext}")
+            if index.exists(candidate):
+                found = candidate
+                break
+    return found
+
+
+def fit_surface(surface, target_w, target_h):
+    """Escala preservando aspect ratio y centra sobre negro a (target_w, target_h)."""
+    if surface is None:
+        return None
+    sw, sh = surface.get_size()
+    scale = min(target_w / sw, target_h / sh)
+    new_w = max(1, int(sw * scale))
+    new_h = max(1, int(sh * scale))
+    try:
+        scaled = pygame.transform.smoothscale(surface, (new_w, new_h))
+    except Exception:
+        scaled = pygame.transform.scale(surface, (new_w, new_h))
+    # Opaque result: the black borders cover every pixel, so the background is
+    # blitted as a plain copy (finalize_surface turns it into a convert() surface)
+    final = pygame.Surface((target_w, target_h), 0, 32)
+    # Fill with black background to avoid transparent borders
+    final.fill((0, 0, 0))
+    final.blit(scaled, ((target_w - new_w) // 2, (target_h - new_h) // 2))
+    return final
+
+
+# ---------------------------------------------------------------------------
+# Formato del display
+# ---------------------------------------------------------------------------
+
+def display_format():
+    """`(bitsize, masks)` of the current display surface, or None without a display."""
+    try:
+        screen = pygame.display.get_surface()
+    except Exception:
+        screen = None
+    if screen is None:
+        return None
+    return screen.get_bitsize(), tuple(screen.get_masks())
+
+
+def finalize_surface(surf, alpha=None, rle=False):
+    """Convert `surf` to the display format, the last step before caching it.
+
+    Opaque art gets `convert()` and surfaces with per-pixel alpha
+    `convert_alpha()` (`alpha=None` decides from the surface itself; a
+    colorkey survives `convert()`). Call it *after* scaling, so the scaled
+    pixels are the ones in the display format. `rle=True` adds `RLEACCEL`:
+    much faster blits of sprites with large transparent areas, but SDL blends
+    the semi-transparent edge pixels with a slightly different approximation,
+    so it is opt-in. Never use it on a surface that has subsurfaces (atlases).
+    Without a display the surface is returned unchanged.
+    """
+    if surf is None:
+        return None
+    if alpha is None:
+        alpha = bool(surf.get_flags() & pygame.SRCALPHA)
+    try:
+        out = surf.convert_alpha() if alpha else surf.convert()
+    except Exception:
+        return surf
+    if rle:
+        try:
+            if alpha:
+                out.set_alpha(255, pygame.RLEACCEL)
+            elif out.get_colorkey() is not None:
+                out.set_colorkey(out.get_colorkey(), pygame.RLEACCEL)
+        except Exception:
+            pass
+    return out
+
+
+def reconvert_surface(surf):
+    """`finalize_surface` again with the same alpha/RLE choice (after `set_mode`).
+
+    Subsurfaces are returned as is: their parent (an atlas) is reconverted
+    by its owner and the views rebuilt.
+    """
+    try:
+        if surf.get_parent() is not None:
+            return surf
+    except Exception:
+        return surf
+    flags = surf.get_flags()
+    return finalize_surface(surf, alpha=bool(flags & pygame.SRCALPHA),
+                            rle=bool(flags & (pygame.RLEACCEL | pygame.RLEACCELOK)))
+
+
+def reconvert_tree(value, memo=None):
+    """Reconvert every surface in `value` (nested dicts/lists/tuples, in place where possible).
+
+    Objects with a `reconvert(convert)` method (e.g. `dibujo.FaceOverlay`)
+    are asked to convert their own surfaces. `memo` maps `id(old)` to the new
+    surface so a surface shared by several containers stays shared.
+    """
+    if memo is None:
+        memo = {}
+    if isinstance(value, pygame.Surface):
+        key = id(value)
+        if key not in memo:
+            memo[key] = (value, reconvert_surface(value))
+        return memo[key][1]
+    if isinstance(value, dict):
+        for k in list(value.keys()):
+            value[k] = reconvert_tree(value[k], memo)
+        return value
+    if isinstance(value, list):
+        for i, v in enumerate(value):
+            value[i] = reconvert_tree(v, memo)
+        return value
+    if isinstance(value, tuple):
+        return tuple(reconvert_tree(v, memo) for v in value)
+    reconvert = getattr(value, 'reconvert', None)
+    if callable(reconvert) and not isinstance(value, type):
+        try:
+            reconvert(lambda s: reconvert_tree(s, memo))
+        except Exception:
+            pass
+    return value
+
+
+def prepare_map_background(name, size):
+    """Carga y escala el fondo de `name` a `size` (thread-safe, sin convert).
+
+    Citec se estira a pantalla completa; el resto se ajusta con `fit_surface`.
+    """
+    bundle = get_asset_bundle()
+    if bundle is not None:
+        bundled = bundle.map_background(name, size)
+        if bundled is not None:
+            return bundled
+    path = find_map_file(name)
+    if not path:
+        return None
+    target_w, target_h = size
+    loaded = pygame.image.load(path)
+    # Pasar a 32 bits sin tocar el display (convert() sólo en el hilo principal)
+    bg = pygame.Surface(loaded.get_size(), 0, 32)
+    bg.blit(loaded, (0, 0))
+    if name.lower() == 'citec':
+        try:
+            return pygame.transform.smoothscale(bg, (target_w, target_h))
+        except Exception:
+            return pygame.transform.scale(bg, (target_w, target_h))
+    return fit_surface(bg, target_w, target_h)
+
+
+class MapBackgroundCache:
+    """Fondos de pelea ya escalados, por (nombre de mapa, resolución).
+
+    `prefetch` los prepara en el `BackgroundLoader` mientras el selector de
+    mapas está en pantalla; `get` devuelve el fondo listo (esperando al hilo si
+    todavía está en vuelo, o cargándolo en el momento si nunca se pidió).
+    """
+
+    def __init__(self, loader=None):
+        self.loader = loader
+        self.backgrounds = {}
+
+    def _key(self, name, size):
+        return (str(name).lower(), (int(size[0]), int(size[1])))
+
+    def _install(self, key, surf):
+        if surf is None:
+            self.backgrounds[key] = None
+            return None
+        try:
+            surf = surf.convert()
+        except Exception:
+            pass
+        self.backgrounds[key] = surf
+        return surf
+
+    def prefetch(self, name, size):
+        key = self._key(name, size)
+        if key in self.backgrounds or self.loader is None:
+            return
+        self.loader.submit(('map',) + key, lambda: prepare_map_background(name, size),
+                           lambda surf: self._install(key, surf))
+
+    def get(self, name, size):
+        key = self._key(name, size)
+        if key not in self.backgrounds and self.loader is not None and self.loader.is_pending(('map',) + key):
+            self.loader.wait(('map',) + key)
+        if key not in self.backgrounds:
+            try:
+                self._install(key, prepare_map_background(name, size))
+            except Exception:
+                self.backgrounds[key] = None
+        return self.backgrounds.get(key)
+
+    def clear(self):
+        self.backgrounds.clear()
+
+    def reconvert(self, convert=None):
+        convert = convert or reconvert_surface
+        for key, surf in list(self.backgrounds.items()):
+            if surf is not None:
+                self.backgrounds[key] = convert(surf)
+
+
+# ---------------------------------------------------------------------------
+# Paquete de recursos (cache/assets.bundle)
+# ---------------------------------------------------------------------------
+
+def _bundle_relpath(path):
+    return os.path.normcase(os.path.normpath(os.path.relpath(os.path.abspath(path))))
+
+
+def _source_stamp(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def surface_pixel_format(surf):
+    """'RGBA' if `surf` has transparency (per-pixel alpha or colorkey), else 'RGB'."""
+    if surf.get_flags() & pygame.SRCALPHA or surf.get_colorkey() is not None:
+        return 'RGBA'
+    return 'RGB'
+
+
+def write_asset_bundle(path, entries):
+    """Write `entries` to the bundle file at `path`.
+
+    `entries` maps a bundle key to `(source_path, [(surface, fmt, bounds), ...])`
+    where `bounds` is a dict of named rects (or None). Layout: magic, version,
+    header length, JSON header table and then the raw pixel blobs, each one
+    16-byte aligned so it can be wrapped straight from the memory map.
+    """
+    table = {}
+    blobs = []
+    for key, (src, frames) in entries.items():
+        mtime_ns, size = _source_stamp(src)
+        rows = []
+        for surf, fmt, bounds in frames:
+            w, h = surf.get_size()
+            data = pygame.image.tobytes(surf, fmt)
+            # row[0] = índice del blob; se reemplaza por [offset, largo] al escribir
+            rows.append([len(blobs), w, h, fmt, bounds])
+            blobs.append(data)
+        table[key] = {'src': _bundle_relpath(src), 'mtime': mtime_ns, 'size': size, 'frames': rows}
+
+    def align(n):
+        return (n + 15) & ~15
+
+    # Los offsets dependen del largo del header y viceversa: fijar el header con
+    # offsets provisionales y recalcular hasta que el largo se estabilice.
+    prefix = len(ASSET_BUNDLE_MAGIC) + struct.calcsize('<II')
+    header_len = 0
+    while True:
+        offset = align(prefix + header_len)
+        offsets = []
+        for data in blobs:
+            offsets.append(offset)
+            offset = align(offset + len(data))
+        resolved = {}
+        for key, entry in table.items():
+            rows = [[offsets[r[0]], len(blobs[r[0]])] + r[1:] for r in entry['frames']]
+            resolved[key] = dict(entry, frames=rows)
+        header = json.dumps({'version': ASSET_BUNDLE_VERSION, 'entries': resolved},
+                            separators=(',', ':')).encode('utf-8')
+        if len(header) == header_len:
+            break
+        header_len = len(header)
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(ASSET_BUNDLE_MAGIC)
+        f.write(struct.pack('<II', ASSET_BUNDLE_VERSION, header_len))
+        f.write(header)
+        for data, off in zip(blobs, offsets):
+            f.write(b'\0' * (off - f.tell()))
+            f.write(data)
+    os.replace(tmp_path, path)
+    return len(resolved), offset
+
+
+class AssetBundle:
+    """Read side of the precompiled asset bundle, mapped into memory.
+
+    Surfaces are built directly over the mapped pixels (`frombuffer`), so a
+    lookup does no file I/O beyond a `stat` of the source to make sure the
+    bundled copy is still current; stale or unknown entries return None and
+    the caller falls back to decoding the original file. The file is mapped
+    copy-on-write: drawing on one of these surfaces touches private pages,
+    never the bundle on disk.
+    """
+
+    def __init__(self, path=ASSET_BUNDLE_PATH):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        self._view = memoryview(self._map)
+        magic_len = len(ASSET_BUNDLE_MAGIC)
+        if bytes(self._view[:magic_len]) != ASSET_BUNDLE_MAGIC:
+            raise ValueError(f"{path}: not an asset bundle")
+        version, header_len = struct.unpack_from('<II', self._map, magic_len)
+        if version != ASSET_BUNDLE_VERSION:
+            raise ValueError(f"{path}: bundle version {version}, expected {ASSET_BUNDLE_VERSION}")
+        start = magic_len + struct.calcsize('<II')
+        header = json.loads(bytes(self._view[start:start + header_len]).decode('utf-8'))
+        self.entries = header.get('entries', {})
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _lookup(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        try:
+            if _source_stamp(entry['src']) != (entry['mtime'], entry['size']):
+                self.misses += 1
+                return None
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def _surface(self, row):
+        off, length, w, h, fmt = row[:5]
+        return pygame.image.frombuffer(self._view[off:off + length], (w, h), fmt)
+
+    def sprite_frames(self, path, height, bounds_fn=frame_bounds):
+        """`[(surface, None, bounds), ...]` for (path, height), like `SpriteDiskCache.load`."""
+        entry = self._lookup(f"sprite:{_bundle_relpath(path)}:{int(height)}")
+        if entry is None:
+            return None
+        bounds_name = getattr(bounds_fn, '__name__', 'frame_bounds')
+        out = []
+        for row in entry['frames']:
+            surf = self._surface(row)
+            bounds = (row[5] or {}).get(bounds_name)
+            out.append((surf, None, pygame.Rect(*bounds) if bounds else surf.get_rect()))
+        return out
+
+    def image(self, path):
+        """Decoded (unconverted) image for `path`, or None."""
+        entry = self._lookup(f"image:{_bundle_relpath(path)}")
+        if entry is None or not entry['frames']:
+            return None
+        return self._surface(entry['frames'][0])
+
+    def map_background(self, name, size):
+        """Fight background for map `name` already scaled to `size`, or None."""
+        entry = self._lookup(f"map:{str(name).lower()}:{int(size[0])}x{int(size[1])}")
+        if entry is None or not entry['frames']:
+            return None
+        return self._surface(entry['frames'][0])
+
+
+_asset_bundle = None
+
+
+def open_asset_bundle(path=ASSET_BUNDLE_PATH):
+    """Map the bundle at `path` and make it the active one. Returns None if missing/invalid."""
+    global _asset_bundle
+    try:
+        _asset_bundle = AssetBundle(path) if os.path.exists(path) else None
+    except Exception as e:
+        print(f"[recursos] ignoring asset bundle {path}: {e}")
+        _asset_bundle = None
+    return _asset_bundle
+
+
+def get_asset_bundle():
+    return _asset_bundle
+
+
+def load_image(path):
+    """`pygame.image.load` that serves the decoded image from the asset bundle when possible.
+
+    Bundle surfaces share their pixels with the mapped file (and with every
+    other lookup of the same entry): `convert()`/`copy()` them before drawing
+    on them.
+    """
+    bundle = _asset_bundle
+    if bundle is not None:
+        surf = bundle.image(path)
+        if surf is not None:
+            return surf
+    return pygame.image.load(path)
+
+
+# ---------------------------------------------------------------------------
+# Índice de recursos
+# ---------------------------------------------------------------------------
+
+IMAGE_EXTS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.webp')
+
+
+class AssetIndex:
+    """Listado en memoria de las carpetas de recursos y claves lógicas resueltas.
+
+    Los directorios vigilados (`images/`, `images/logos/`, `images/caras/`,
+    `images/maps/`, `mapas/`, `sprites/`, `Sprites/` y sus subcarpetas) se
+    listan una vez; `refresh()` vuelve a listar sólo los que cambiaron de
+    mtime. `resolve(key)` traduce claves lógicas a rutas:
+
+        cover, selector, map_selector, map:<name>, logo:<base>,
+        winner:<name>, face:<name>, sprite:<char>/<state>/<dir>
+
+    con las mismas reglas de búsqueda que antes estaban repartidas por
+    juego.py. Las resoluciones se memorizan hasta el próximo cambio.
+    """
+
+    WATCHED = ['images', os.path.join('images', 'logos'), os.path.join('images', 'caras'),
+               os.path.join('images', 'maps'), 'mapas', 'sprites', 'Sprites']
+
+    def __init__(self, watched=None, sprites_root='Sprites'):
+        self.watched = list(watched or self.WATCHED)
+        self.sprites_root = sprites_root
+        # dir -> (mtime_ns, [(name, is_dir), ...]) en el orden de os.scandir
+        self._dirs = {}
+        self._resolved = {}
+        self.refresh()
+
+    def _key(self, path):
+        return os.path.normpath(path)
+
+    def _scan_dir(self, d):
+        try:
+            mtime = os.stat(d).st_mtime_ns
+        except OSError:
+            return None
+        cached = self._dirs.get(d)
+        if cached is not None and cached[0] == mtime:
+            return False
+        try:
+            with os.scandir(d) as it:
+                entries = [(e.name, e.is_dir()) for e in it]
+        except OSError:
+            entries = []
+        self._dirs[d] = (mtime, entries)
+        return True
+
+    def refresh(self):
+        """Re-list the watched directories whose mtime changed. Returns True if anything changed."""
+        changed = False
+        dirs = [self._key(d) for d in self.watched]
+        root = self._key(self.sprites_root)
+        seen = set()
+        while dirs:
+            d = dirs.pop(0)
+            if d in seen:
+                continue
+            seen.add(d)
+            result = self._scan_dir(d)
+            if result is None:
+                if self._dirs.pop(d, None) is not None:
+                    changed = True
+                continue
+            changed = changed or result
+            if d == root:
+                dirs.extend(os.path.join(d, name) for name, is_dir in self._dirs[d][1] if is_dir)
+        # subcarpetas de Sprites/ que desaparecieron
+        for d in list(self._dirs.keys()):
+            if d not in seen:
+                del self._dirs[d]
+                changed = True
+        if changed:
+            self._resolved.clear()
+        return changed
+
+    def isdir(self, path):
+        path = self._key(path)
+        if path in self._dirs:
+            return True
+        parent, name = os.path.split(path)
+        return any(n == name and is_dir for n, is_dir in self._dirs.get(parent or '.', (0, []))[1])
+
+    def listdir(self, path):
+        return [name for name, _ in self._dirs.get(self._key(path), (0, []))[1]]
+
+    def exists(self, path):
+        path = self._key(path)
+        if path in self._dirs:
+            return True
+        parent, name = os.path.split(path)
+        if (parent or '.') in self._dirs:
+            return name in self.listdir(parent or '.')
+        return os.path.exists(path)
+
+    def isfile(self, path):
+        path = self._key(path)
+        parent, name = os.path.split(path)
+        if (parent or '.') in self._dirs:
+            return any(n == name and not is_dir for n, is_dir in self._dirs[parent or '.'][1])
+        return os.path.isfile(path)
+
+    def resolve(self, key):
+        """Path (or, for `sprite:` keys, list of paths) for a logical asset key; None if not found."""
+        if key in self._resolved:
+            return self._resolved[key]
+        kind, _, arg = key.partition(':')
+        try:
+            if kind == 'cover':
+                found = self._find_cover()
+            elif kind == 'selector':
+                found = self._find_selector()
+            elif kind == 'map_selector':
+                found = self._find_map_selector()
+            elif kind == 'map':
+                found = find_map_file(arg, index=self)
+            elif kind == 'logo':
+                found = self._find_logo(arg)
+            elif kind == 'winner':
+                found = self._find_winner(arg)
+            elif kind == 'face':
+                found = self._find_face(arg)
+            elif kind == 'sprite':
+                found = self._find_sprites(arg)
+            else:
+                raise KeyError(key)
+        except KeyError:
+            raise
+        except Exception:
+            found = None
+        self._resolved[key] = found
+        return found
+
+    def _find_cover(self, images_dir='images'):
+        # Priorizar archivos que empiecen por 'portada.' (case-insensitive)
+        for name in self.listdir(images_dir):
+            low = name.lower()
+            if low.startswith("portada.") or low == "portada" or low.startswith("portada_"):
+                return os.path.join(images_dir, name)
+        # Si no se encontró, tomar cualquier imagen válida dentro de la carpeta
+        for name in self.listdir(images_dir):
+            if name.lower().endswith(IMAGE_EXTS):
+                return os.path.join(images_dir, name)
+        return None
+
+    def _find_selector(self, images_dir='images'):
+        # Preferir archivos que indiquen claramente que son para personajes
+        for name in self.listdir(images_dir):
+            low = name.lower()
+            if low.startswith("selectordepersonajes") or "personaje" in low or "personajes" in low:
+                return os.path.join(images_dir, name)
+        # Si no, archivos que empiecen por 'selector' pero que no sean de mapas
+        for name in self.listdir(images_dir):
+            low = name.lower()
+            if low.startswith("selector") and not ("map" in low or "mapas" in low or "mapa" in low):
+                return os.path.join(images_dir, name)
+        return None
+
+    def _find_map_selector(self, images_dir='images'):
+        for name in self.listdir(images_dir):
+            low = name.lower()
+            # Only consider image files (avoid matching json/other files)
+            if not low.endswith(IMAGE_EXTS):
+                continue
+            if ('selector_map' in low) or ('selectormap' in low) or ('map_selector' in low) or ('selectordemap' in low) or ('selectordemapas' in low):
+                return os.path.join(images_dir, name)
+        # fallback: images/maps/ (una imagen 'selector' o la primera imagen disponible)
+        maps_dir = os.path.join(images_dir, 'maps')
+        for name in self.listdir(maps_dir):
+            low = name.lower()
+            if low.startswith('selector') or 'selector' in low:
+                return os.path.join(maps_dir, name)
+        for name in self.listdir(maps_dir):
+            if name.lower().endswith(IMAGE_EXTS):
+                return os.path.join(maps_dir, name)
+        return None
+
+    def _find_logo(self, base_name, logos_dir=os.path.join('images', 'logos')):
+        # Primer fichero que empiece con base_name (case-insensitive)
+        for fname in self.listdir(logos_dir):
+            low = fname.lower()
+            if low.startswith(base_name.lower()) and low.endswith(IMAGE_EXTS):
+                return os.path.join(logos_dir, fname)
+        return None
+
+    def _find_winner(self, name, logos_dir=os.path.join('images', 'logos')):
+        lname = name.lower() if name else ''
+        # Prefer files that start with '<name>win' or '<name>wins'
+        for fname in self.listdir(logos_dir):
+            low = fname.lower()
+            if (low.startswith(lname) and ('win' in low)) and low.endswith(IMAGE_EXTS):
+                return os.path.join(logos_dir, fname)
+        # Fallback: any file that contains the name and 'win'
+        for fname in self.listdir(logos_dir):
+            low = fname.lower()
+            if lname in low and 'win' in low and low.endswith(IMAGE_EXTS):
+                return os.path.join(logos_dir, fname)
+        return None
+
+    def _find_face(self, name):
+        path = os.path.join('images', 'caras', f'{name}.png')
+        return path if self.exists(path) else None
+
+    def sprite_files(self, state_patterns=None):
+        """`{character: [(state, dir, path), ...]}` for the per-character sprite folders."""
+        state_patterns = state_patterns or STATE_PATTERNS
+        files = {}
+        root = self.sprites_root
+        for entry in sorted(self.listdir(root)):
+            entry_path = os.path.join(root, entry)
+            if not self.isdir(entry_path):
+                continue
+            lst = files.setdefault(character_from_folder(entry), [])
+            for fname in sorted(self.listdir(entry_path)):
+                fpath = os.path.join(entry_path, fname)
+                if not self.isfile(fpath):
+                    continue
+                found = classify_sprite_file(fname, state_patterns)
+                if found:
+                    lst.append((found[0], found[1], fpath))
+        return files
+
+    def _find_sprites(self, arg):
+        char, _, rest = arg.partition('/')
+        state, _, dir_key = rest.partition('/')
+        out = []
+        for stt, dk, fpath in self.sprite_files().get(char, []):
+            if (not state or stt == state) and (not dir_key or dk == dir_key):
+                out.append(fpath)
+        return out
+
+
+_asset_index = None
+
+
+def get_asset_index():
+    """Process-wide `AssetIndex` (built on first use)."""
+    global _asset_index
+    if _asset_index is None:
+        _asset_index = AssetIndex()
+    return _asset_index
+
+
+# ---------------------------------------------------------------------------
+# Recursos de la sesión
+# ---------------------------------------------------------------------------
+
+class AssetManager:
+    """Decoded/scaled assets kept for the whole session (they survive between matches).
+
+    `Juego` owns one instance: `ejecutar_pelea` asks it for the cover,
+    selectors, logos, fight backgrounds and the sprite registry, and only what
+    is not in memory yet gets loaded. `refresh()` (once per match) re-lists the
+    asset folders and, if any of them changed on disk, drops everything so the
+    new files are picked up.
+
+    Returned surfaces are shared between matches: callers must not draw on them.
+    """
+
+    def __init__(self, index=None, loader=None, cache=None, executor=None):
+        self.index = index or get_asset_index()
+        self.loader = loader
+        self.cache = cache
+        self.executor = executor
+        self.maps = MapBackgroundCache(loader)
+        self.registry = None
+        self._items = {}
+        self.hits = 0
+        self.misses = 0
+        # Formato del display al que están convertidas las superficies cacheadas
+        self.display_format = display_format()
+
+    def refresh(self):
+        """Pick up changes on disk. Returns True if the cached assets were dropped."""
+        if not self.index.refresh():
+            return False
+        self.clear()
+        return True
+
+    def clear(self):
+        self._items.clear()
+        self.maps.clear()
+        self.invalidate_sprites()
+
+    def invalidate_sprites(self, character=None):
+        """Drop the loaded frames of `character` (or of every character) from the registry."""
+        if self.registry is not None:
+            self.registry.invalidate(character)
+
+    def has(self, key):
+        return key in self._items
+
+    def get(self, key, build):
+        """Value stored under `key`, calling `build()` the first time (None results are kept too)."""
+        try:
+            value = self._items[key]
+            self.hits += 1
+            return value
+        except KeyError:
+            pass
+        self.misses += 1
+        try:
+            value = build()
+        except Exception:
+            value = None
+        self._items[key] = value
+        return value
+
+    def put(self, key, value):
+        self._items[key] = value
+
+    def image(self, path, alpha=True):
+        """`load_image(path)` converted to the display format (`convert_alpha` or `convert`)."""
+        if not path:
+            return None
+
+        return self.get(('image', path, alpha), lambda: finalize_surface(load_image(path), alpha))
+
+    def scaled(self, path, size, scale_fn, alpha=True):
+        """`scale_fn(image(path), w, h)` cached per (path, size), converted after scaling."""
+        if not path:
+            return None
+        return self.get(('scaled', path, tuple(size), getattr(scale_fn, '__name__', None), alpha),
+                        lambda: finalize_surface(scale_fn(self.image(path, alpha), size[0], size[1])))
+
+    def reconvert(self, *extra):
+        """Reconvert the session's surfaces if `set_mode` changed the display format.
+
+        Covers everything in the store, the map backgrounds, the sprite
+        registry and the `extra` containers (dicts/lists owned by the caller).
+        Returns True when something had to be converted; with the same format
+        (the usual case for F11) it does nothing.
+        """
+        fmt = display_format()
+        if fmt is None or fmt == self.display_format:
+            return False
+        self.display_format = fmt
+        memo = {}
+        convert = lambda value: reconvert_tree(value, memo)
+        for key in list(self._items.keys()):
+            self._items[key] = convert(self._items[key])
+        self.maps.reconvert(convert)
+        if self.registry is not None:
+            self.registry.reconvert(convert)
+        for value in extra:
+            convert(value)
+        return True
+
+    def sprite_registry(self, state_patterns, heights):
+        """The session's `SpriteRegistry` (created and scanned on first use)."""
+        if self.registry is None:
+            self.registry = SpriteRegistry(state_patterns, root='Sprites', heights=heights, cache=self.cache,
+                                           loader=self.loader, executor=self.executor)
+            self.registry.scan()
+        return self.registry
@@ -0,0 +1,356 @@
+"""
+Detección de regiones (marcos) en las imágenes de selector de CPF Kombat.
+
+Las imágenes de selector de personajes/mapas marcan cada casilla con un marco
+rojo. Recorrer la imagen píxel a píxel desde Python cuesta segundos a
+1366x768, así que aquí todo se hace con arrays de NumPy: una máscara booleana
+por umbral de color y un etiquetado de componentes conexas por tramos
+(runs) de cada fila, que sólo itera en Python sobre los tramos, no sobre los
+píxeles. Lo mismo para el plan B (proyección de píxeles oscuros por columna y
+fila para encontrar los bordes de las casillas).
+"""
+try:
+    import pygame
+except ModuleNotFoundError:
+    print("Error: Pygame no está instalado. Instala con: pip install pygame")
+    raise
+import os
+import json
+import hashlib
+import numpy as np
+
+
+def surface_rgb(surf):
+    """(w, h, 3) array with the RGB of `surf` (a view when possible, a copy otherwise)."""
+    try:
+        return pygame.surfarray.pixels3d(surf)
+    except Exception:
+        return pygame.surfarray.array3d(surf)
+
+
+def red_mask(surf):
+    """Boolean (w, h) mask of the bright red pixels used to draw the selector frames."""
+    rgb = surface_rgb(surf)
+    try:
+        r = rgb[:, :, 0]
+        g = rgb[:, :, 1]
+        b = rgb[:, :, 2]
+        return (r >= 180) & (g <= 80) & (b <= 80)
+    finally:
+        # release the surface lock taken by pixels3d
+        del rgb
+
+
+def mask_runs(mask):
+    """Horizontal runs of True in a (w, h) mask, per row.
+
+    Returns three int arrays `(ys, x0s, x1s)` (inclusive ends), ordered by row
+    and then by column.
+    """
+    rows = np.ascontiguousarray(mask.T, dtype=np.int8)
+    h, w = rows.shape
+    padded = np.zeros((h, w + 2), dtype=np.int8)
+    padded[:, 1:-1] = rows
+    d = np.diff(padded, axis=1)
+    sy, sx = np.nonzero(d == 1)
+    ey, ex = np.nonzero(d == -1)
+    # starts and ends come out in the same (row, col) order, so they pair up
+    return sy, sx, ex - 1
+
+
+def label_runs(ys, x0s, x1s):
+    """4-connected components of the runs from `mask_runs`.
+
+    Two runs belong together when they are on adjacent rows and share at
+    least one column. Returns an array with a component id per run.
+    """
+    n = len(ys)
+    parent = list(range(n))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    if n:
+        # index of the first run of every row
+        row_start = {}
+        for i, y in enumerate(ys.tolist()):
+            row_start.setdefault(y, i)
+        bounds = sorted(row_start.items())
+        row_range = {}
+        for k, (y, i0) in enumerate(bounds):
+            i1 = bounds[k + 1][1] if k + 1 < len(bounds) else n
+            row_range[y] = (i0, i1)
+        x0l = x0s.tolist()
+        x1l = x1s.tolist()
+        for y, (i0, i1) in row_range.items():
+            prev = row_range.get(y - 1)
+            if prev is None:
+                continue
+            j, j1 = prev
+            # both rows are sorted by column: sweep them together
+            i = i0
+            while i < i1 and j < j1:
+                if x1l[j] >= x0l[i] and x1l[i] >= x0l[j]:
+                    ri, rj = find(i), find(j)
+                    if ri != rj:
+                        parent[max(ri, rj)] = min(ri, rj)
+                if x1l[j] < x1l[i]:
+                    j += 1
+                else:
+                    i += 1
+    return np.array([find(i) for i in range(n)], dtype=np.int64)
+
+
+def component_boxes(mask):
+    """Bounding boxes `(minx, miny, maxx, maxy)` of the 4-connected components of `mask`.
+
+    Boxes are ordered like a column-major scan (x outer, y inner) finds their
+    first pixel, i.e. the order the original per-pixel flood fill produced.
+    """
+    ys, x0s, x1s = mask_runs(mask)
+    if len(ys) == 0:
+        return []
+    labels = label_runs(ys, x0s, x1s)
+    uniq, inv = np.unique(labels, return_inverse=True)
+    k = len(uniq)
+    minx = np.full(k, np.iinfo(np.int64).max)
+    maxx = np.full(k, -1)
+    miny = np.full(k, np.iinfo(np.int64).max)
+    maxy = np.full(k, -1)
+    np.minimum.at(minx, inv, x0s)
+    np.maximum.at(maxx, inv, x1s)
+    np.minimum.at(miny, inv, ys)
+    np.maximum.at(maxy, inv, ys)
+    # first pixel in column-major order: leftmost column, topmost row within it
+    first_y = np.full(k, np.iinfo(np.int64).max)
+    at_left = x0s == minx[inv]
+    np.minimum.at(first_y, inv[at_left], ys[at_left])
+    order = np.lexsort((first_y, minx))
+    return [(int(minx[c]), int(miny[c]), int(maxx[c]), int(maxy[c])) for c in order]
+
+
+def detect_red_frames(surf, pad=6, min_size=20):
+    """Rects `[x, y, w, h]` around the red frames drawn on a selector image.
+
+    Each 4-connected group of bright red pixels (r >= 180, g <= 80, b <= 80)
+    becomes its bounding box grown by `pad` pixels (clipped to the image);
+    boxes not larger than `min_size` in both directions are dropped.
+    """
+    w, h = surf.get_size()
+    rects = []
+    for (minx, miny, maxx, maxy) in component_boxes(red_mask(surf)):
+        # añadir padding pequeño para incluir el interior
+        rx = max(0, minx - pad)
+        ry = max(0, miny - pad)
+        rw = min(w, maxx + pad) - rx
+        rh = min(h, maxy + pad) - ry
+        if rw > min_size and rh > min_size:
+            rects.append([rx, ry, rw, rh])
+    return rects
+
+
+def dark_projections(surf, threshold=255 * 3 * 0.9):
+    """Per-column and per-row counts of "dark" pixels (r + g + b < `threshold`).
+
+    Returns `(col_counts, row_counts)` as int arrays of length w and h; the
+    borders of the selector boxes show up as peaks in these projections.
+    """
+    rgb = surface_rgb(surf)
+    try:
+        dark = rgb.sum(axis=2, dtype=np.int32) < threshold
+    finally:
+        del rgb
+    return dark.sum(axis=1), dark.sum(axis=0)
+
+
+def detect_runs(counts, length, min_density=0.05):
+    """Runs `(start, end)` (inclusive) of consecutive entries with `counts >= int(length * min_density)`."""
+    thresh = int(length * min_density)
+    above = np.asarray(counts) >= thresh
+    edges = np.diff(np.concatenate(([0], above.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1) - 1
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+# ---------------------------------------------------------------------------
+# Cache de regiones independiente de la resolución
+# ---------------------------------------------------------------------------
+
+REGION_CACHE_PATH = os.path.join('cache', 'regions.json')
+REGION_CACHE_VERSION = 1
+
+
+def fit_area(src_size, target_size):
+    """Rect that an image of `src_size` occupies once fitted into `target_size`.
+
+    Same arithmetic as `recursos.fit_surface` (aspect preserved, centred).
+    """
+    sw, sh = src_size
+    tw, th = target_size
+    scale = min(tw / sw, th / sh)
+    new_w = max(1, int(sw * scale))
+    new_h = max(1, int(sh * scale))
+    return pygame.Rect((tw - new_w) // 2, (th - new_h) // 2, new_w, new_h)
+
+
+def normalize_rects(rects, area):
+    """Rects in screen pixels -> `[u0, v0, u1, v1]` relative to the image `area`."""
+    out = []
+    for r in rects:
+        r = pygame.Rect(r)
+        out.append([(r.left - area.x) / area.width, (r.top - area.y) / area.height,
+                    (r.right - area.x) / area.width, (r.bottom - area.y) / area.height])
+    return out
+
+
+def denormalize_rects(norm, area):
+    """Inverse of `normalize_rects` for the image placed at `area` (exact round trip)."""
+    out = []
+    for u0, v0, u1, v1 in norm:
+        x0 = area.x + int(round(u0 * area.width))
+        y0 = area.y + int(round(v0 * area.height))
+        x1 = area.x + int(round(u1 * area.width))
+        y1 = area.y + int(round(v1 * area.height))
+        out.append(pygame.Rect(x0, y0, x1 - x0, y1 - y0))
+    return out
+
+
+class SelectorRegionCache:
+    """Detected selector regions in image coordinates, keyed by the image content.
+
+    Detection (red frames / dark edges) runs once per selector image: the
+    result is stored normalized to the image itself (0..1, independent of the
+    window size) under a SHA-1 of the source file, so a resolution change or
+    a new session only maps the cached rects onto the new layout. Entries are
+    kept in `cache/regions.json`; the files in `images/` are never rewritten.
+    """
+
+    def __init__(self, path=REGION_CACHE_PATH):
+        self.path = path
+        self._entries = None
+        # (abspath, mtime_ns, size) -> sha1, to avoid re-hashing on every F11
+        self._hashes = {}
+
+    def _load(self):
+        if self._entries is None:
+            self._entries = {}
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == REGION_CACHE_VERSION:
+                    self._entries = data.get('entries', {})
+            except Exception:
+                pass
+        return self._entries
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': REGION_CACHE_VERSION, 'entries': self._entries}, f, indent=1)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            pass
+
+    def content_hash(self, source_path):
+        st = os.stat(source_path)
+        key = (os.path.abspath(source_path), st.st_mtime_ns, st.st_size)
+        digest = self._hashes.get(key)
+        if digest is None:
+            h = hashlib.sha1()
+            with open(source_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    h.update(chunk)
+            digest = self._hashes[key] = h.hexdigest()
+        return digest
+
+    def _key(self, source_path, kind):
+        return f"{self.content_hash(source_path)}:{kind}"
+
+    def get(self, source_path, src_size, kind, target_size):
+        """Cached regions of `kind` for the image at `source_path`, laid out for `target_size` (or None)."""
+        try:
+            norm = self._load().get(self._key(source_path, kind))
+            if norm is None:
+                return None
+            return denormalize_rects(norm, fit_area(src_size, target_size))
+        except Exception:
+            return None
+
+    def put(self, source_path, src_size, kind, target_size, rects):
+        """Remember `rects` (detected on the image fitted to `target_size`)."""
+        try:
+            self._load()[self._key(source_path, kind)] = normalize_rects(rects, fit_area(src_size, target_size))
+            self._save()
+        except Exception:
+            pass
+
+    def clear(self):
+        self._entries = {}
+        self._save()
+
+
+# ---------------------------------------------------------------------------
+# Hit-test de las casillas del menú
+# ---------------------------------------------------------------------------
+
+def selector_row_hitboxes(mapping, small_w=120, small_h=200, spacing=38, offset_x=40):
+    """Row of fixed-size hitboxes `(rect, name)` for the character selector.
+
+    One `small_w` x `small_h` box per entry of `mapping`, in the same order,
+    laid out left to right from the leftmost detected region (plus
+    `offset_x`), `spacing` pixels apart and vertically centred on the mean
+    centre of the regions.
+    """
+    ordenadas = list(mapping)
+    if not ordenadas:
+        return []
+    current_x = min(r.left for r, _ in ordenadas)
+    avg_cy = int(sum(r.centery for r, _ in ordenadas) / len(ordenadas))
+    boxes = []
+    for rect, name in ordenadas:
+        hb = pygame.Rect(int(current_x + offset_x), int(avg_cy - small_h // 2), small_w, small_h)
+        boxes.append((hb, name))
+        current_x += small_w + spacing
+    return boxes
+
+
+class HitIndex:
+    """Uniform-grid index over a fixed list of `(rect, name)` hitboxes.
+
+    Built once when the hitboxes change; `hit(pos)` only checks the boxes
+    registered in the grid cell under `pos` and returns the first one (in
+    list order) that contains it, exactly like a linear `collidepoint` scan.
+    """
+
+    def __init__(self, boxes, cell=64):
+        self.boxes = [(pygame.Rect(r), name) for r, name in boxes]
+        self.cell = max(1, int(cell))
+        self._grid = {}
+        c = self.cell
+        for i, (r, _) in enumerate(self.boxes):
+            if r.width <= 0 or r.height <= 0:
+                continue
+            for gx in range(r.left // c, (r.right - 1) // c + 1):
+                for gy in range(r.top // c, (r.bottom - 1) // c + 1):
+                    self._grid.setdefault((gx, gy), []).append(i)
+
+    def __iter__(self):
+        return iter(self.boxes)
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def hit(self, pos):
+        """First `(rect, name)` containing `pos`, or None."""
+        x, y = int(pos[0]), int(pos[1])
+        for i in self._grid.get((x // self.cell, y // self.cell), ()):
+            r, name = self.boxes[i]
+            if r.collidepoint(x, y):
+                return self.boxes[i]
+        return None
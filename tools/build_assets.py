@@ -0,0 +1,136 @@
+"""
+Offline asset compiler: decodes and pre-scales the game art into one
+memory-mapped bundle (cache/assets.bundle by default). Run it from the
+project root after adding or editing images:
+  python tools/build_assets.py
+  python tools/build_assets.py --heights 360 220 --resolutions 1366x768 1920x1080
+
+What goes into the bundle:
+  - Sprites/**          every frame at each target height (+ masks' bounds)
+  - mapas/              the fight backgrounds already scaled to each resolution
+  - images/, images/caras/, images/logos/, mapas/
+                        the decoded images (portada, selectores, caras, logos)
+
+At startup juego.py maps the bundle and builds surfaces straight from it, so
+a cold start does not have to open and decode hundreds of small files. Entries
+whose source file changed after the build are ignored (the game decodes the
+original instead), so a stale bundle is never wrong, only slower.
+"""
+import os
+import sys
+import argparse
+import time
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pygame
+from recursos import (ASSET_BUNDLE_PATH, MAP_EXTS, decode_frames, frame_bounds, mask_bounds,
+                      prepare_map_background, scale_to_height, surface_pixel_format,
+                      write_asset_bundle)
+
+SPRITES_DIR = 'Sprites'
+IMAGE_DIRS = ['images', os.path.join('images', 'caras'), os.path.join('images', 'logos'), 'mapas']
+MAPAS_DIR = 'mapas'
+IMAGE_EXTS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.webp')
+SPRITE_EXTS = ('.gif', '.png')
+
+
+def parse_resolution(text):
+    w, h = text.lower().split('x')
+    return int(w), int(h)
+
+
+def rect_list(r):
+    return [int(r.left), int(r.top), int(r.width), int(r.height)]
+
+
+def collect_sprites(heights, entries):
+    count = 0
+    for dirpath, _dirs, files in os.walk(SPRITES_DIR):
+        for fname in sorted(files):
+            if not fname.lower().endswith(SPRITE_EXTS):
+                continue
+            fpath = os.path.join(dirpath, fname)
+            native = decode_frames(fpath)
+            if not native:
+                print(f"  skip {fpath}: no frames")
+                continue
+            for h_t in heights:
+                frames = []
+                for f in native:
+                    f2 = scale_to_height(f, h_t)
+                    m = pygame.mask.from_surface(f2)
+                    bounds = {'frame_bounds': rect_list(frame_bounds(m, f2)),
+                              'mask_bounds': rect_list(mask_bounds(m, f2))}
+                    frames.append((f2, 'RGBA', bounds))
+                entries[f"sprite:{os.path.normcase(os.path.normpath(fpath))}:{int(h_t)}"] = (fpath, frames)
+            count += 1
+    return count
+
+
+def collect_images(entries):
+    count = 0
+    for d in IMAGE_DIRS:
+        if not os.path.isdir(d):
+            continue
+        for fname in sorted(os.listdir(d)):
+            fpath = os.path.join(d, fname)
+            if not os.path.isfile(fpath) or not fname.lower().endswith(IMAGE_EXTS):
+                continue
+            try:
+                surf = pygame.image.load(fpath)
+            except Exception as e:
+                print(f"  skip {fpath}: {e}")
+                continue
+            entries[f"image:{os.path.normcase(os.path.normpath(fpath))}"] = (fpath, [(surf, surface_pixel_format(surf), None)])
+            count += 1
+    return count
+
+
+def collect_maps(resolutions, entries):
+    count = 0
+    if not os.path.isdir(MAPAS_DIR):
+        return count
+    for fname in sorted(os.listdir(MAPAS_DIR)):
+        stem, ext = os.path.splitext(fname)
+        # los selectores viven en mapas/ pero no son fondos de pelea
+        if ext.lower() not in MAP_EXTS or stem.lower().startswith('selector'):
+            continue
+        for size in resolutions:
+            bg = prepare_map_background(stem, size)
+            if bg is None:
+                continue
+            entries[f"map:{stem.lower()}:{size[0]}x{size[1]}"] = (os.path.join(MAPAS_DIR, fname), [(bg, 'RGB', None)])
+        count += 1
+    return count
+
+
+def build(output=ASSET_BUNDLE_PATH, heights=(360, 220), resolutions=((1366, 768),)):
+    if not os.path.isdir(SPRITES_DIR) and not os.path.isdir('images'):
+        print("Run this script from the project root (Sprites/ and images/ not found).")
+        return 1
+    start = time.time()
+    entries = {}
+    n_sprites = collect_sprites(heights, entries)
+    n_images = collect_images(entries)
+    n_maps = collect_maps(resolutions, entries)
+    n_entries, size = write_asset_bundle(output, entries)
+    print(f"{output}: {n_entries} entries ({n_sprites} sprite files, {n_images} images, {n_maps} maps), "
+          f"{size / (1024 * 1024):.1f} MiB in {time.time() - start:.1f}s")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile game assets into a memory-mapped bundle.")
+    parser.add_argument('--output', '-o', default=ASSET_BUNDLE_PATH, help="bundle path (default: %(default)s)")
+    parser.add_argument('--heights', type=int, nargs='+', default=[360, 220], help="sprite target heights")
+    parser.add_argument('--resolutions', type=parse_resolution, nargs='+', default=[(1366, 768)],
+                        help="window sizes for the map backgrounds, e.g. 1366x768")
+    args = parser.parse_args(argv)
+    return build(args.output, args.heights, args.resolutions)
+
+
+if __name__ == '__main__':
+    sys.exit(main())